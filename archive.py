@@ -0,0 +1,225 @@
+"""
+Moves expired content out of the hot tables.
+
+Expired announcements are copied to announcements_archive and deleted from
+announcements in batches, one transaction per batch, so the live table (and every
+feed query on it) only holds current content. Events older than
+EVENT_ARCHIVE_AFTER_DAYS move to events_archive the same way, keeping their like and
+view totals while their per-visitor event_likes/event_views rows are folded into
+event_daily_stats. On
+Postgres events_archive is partitioned by semester and partitions are created here
+on demand. Rows keep their ids and cover image URLs; storage cleanup counts archive
+references, so archived covers are never treated as orphans.
+
+Runs inside the app as a background task every ARCHIVE_SWEEP_INTERVAL seconds, or
+from the command line:
+    python archive.py announcements|events|all [--batch-size 500]
+"""
+
+import os
+import logging
+import datetime
+from typing import Optional
+
+from sqlalchemy import select, delete, insert, literal, text, union_all
+from sqlalchemy.orm import aliased
+from dotenv import load_dotenv
+
+import models
+import outbox
+import stats
+from database import SessionLocal
+from background import PeriodicTask
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_SWEEP_INTERVAL = float(os.getenv("ARCHIVE_SWEEP_INTERVAL", "3600"))
+# past events stay live this long, so last week's events are still one cheap query away
+EVENT_ARCHIVE_AFTER_DAYS = int(os.getenv("EVENT_ARCHIVE_AFTER_DAYS", "30"))
+
+FALL_START_MONTH = 8  # spring semester is Jan-Jul, fall is Aug-Dec
+
+ANNOUNCEMENT_COLUMNS = [
+    "id", "slug", "title", "body", "cover_image", "link", "tags", "category",
+    "is_pinned", "expires_at", "created_at", "updated_at", "club_id",
+]
+
+
+def archive_announcements_batch(db, batch_size: int = ARCHIVE_BATCH_SIZE, today: Optional[datetime.date] = None) -> int:
+    """Move one batch of expired announcements to the archive and commit. Returns rows moved."""
+    today = today or datetime.date.today()
+    live = models.Announcement
+
+    ids = db.execute(
+        select(live.id)
+        .where(live.expires_at < today)
+        .order_by(live.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # several app workers may sweep at once (Postgres)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    now = datetime.datetime.utcnow()
+    columns = [getattr(live, name) for name in ANNOUNCEMENT_COLUMNS]
+    db.execute(
+        insert(models.AnnouncementArchive).from_select(
+            ANNOUNCEMENT_COLUMNS + ["archived_at"],
+            select(*columns, literal(now, models.AnnouncementArchive.archived_at.type)).where(live.id.in_(ids)),
+        )
+    )
+    db.execute(delete(live).where(live.id.in_(ids)).execution_options(synchronize_session=False))
+    outbox.enqueue_revalidation(db, ["announcements"])
+    db.commit()
+    outbox.wake()
+    return len(ids)
+
+
+def archive_expired_announcements(db, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archive every expired announcement, batch by batch. Returns rows moved."""
+    total = 0
+    while True:
+        moved = archive_announcements_batch(db, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+    if total:
+        logger.info(f"Archived {total} expired announcements")
+    return total
+
+
+# --- events ---
+
+EVENT_COLUMNS = [column.name for column in models.Event.__table__.columns]
+
+
+def event_archive_horizon(today: Optional[datetime.date] = None) -> datetime.date:
+    """Events dated before this day are archived (or due to be)."""
+    return (today or datetime.date.today()) - datetime.timedelta(days=EVENT_ARCHIVE_AFTER_DAYS)
+
+
+def semester_of(day: datetime.date) -> tuple[str, datetime.date, datetime.date]:
+    """(name, first day, first day of the next semester) for the semester containing day."""
+    if day.month >= FALL_START_MONTH:
+        return f"{day.year}_fall", datetime.date(day.year, FALL_START_MONTH, 1), datetime.date(day.year + 1, 1, 1)
+    return f"{day.year}_spring", datetime.date(day.year, 1, 1), datetime.date(day.year, FALL_START_MONTH, 1)
+
+
+def ensure_event_partitions(db, days) -> None:
+    """Create the events_archive partitions that rows on these days need (Postgres only)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    table = models.EventArchive.__tablename__
+    for name, start, end in sorted({semester_of(day) for day in days}):
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {table}_{name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+
+
+def archive_events_batch(db, batch_size: int = ARCHIVE_BATCH_SIZE, today: Optional[datetime.date] = None) -> int:
+    """Move one batch of past events to the archive and commit. Returns events moved."""
+    live = models.Event
+
+    rows = db.execute(
+        select(live.id, live.date)
+        .where(live.date < event_archive_horizon(today))
+        .order_by(live.date)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0
+
+    ids = [row.id for row in rows]
+    ensure_event_partitions(db, {row.date for row in rows})
+
+    now = datetime.datetime.utcnow()
+    columns = [getattr(live, name) for name in EVENT_COLUMNS]
+    db.execute(
+        insert(models.EventArchive).from_select(
+            EVENT_COLUMNS + ["archived_at"],
+            select(*columns, literal(now, models.EventArchive.archived_at.type)).where(live.id.in_(ids)),
+        )
+    )
+    # totals live on in likes/view_count and event_daily_stats; the per-visitor rows
+    # only served dedup
+    stats.rollup_events(db, ids)
+    db.execute(delete(live).where(live.id.in_(ids)).execution_options(synchronize_session=False))
+    outbox.enqueue_revalidation(db, ["events"])
+    db.commit()
+    outbox.wake()
+    return len(ids)
+
+
+def archive_past_events(db, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archive every event past the horizon, batch by batch. Returns events moved."""
+    total = 0
+    while True:
+        moved = archive_events_batch(db, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+    if total:
+        logger.info(f"Archived {total} past events")
+    return total
+
+
+def event_source(include_history: bool = False):
+    """
+    What to select events from: the live table, or live + archive as one Event-mapped
+    UNION ALL. Date filters on the union reach each branch, so Postgres still prunes
+    archive partitions. Rows from the union are read-only.
+    """
+    if not include_history:
+        return models.Event
+    archive_columns = [getattr(models.EventArchive, name) for name in EVENT_COLUMNS]
+    union = union_all(
+        select(*[getattr(models.Event, name) for name in EVENT_COLUMNS]),
+        select(*archive_columns),
+    ).subquery("events_with_history")
+    return aliased(models.Event, union)
+
+
+def _sweep() -> bool:
+    db = SessionLocal()
+    try:
+        announcements = archive_announcements_batch(db)
+        if announcements:
+            logger.info(f"Archived {announcements} expired announcements")
+        events = archive_events_batch(db)
+        if events:
+            logger.info(f"Archived {events} past events")
+        # a full batch means there is probably more to move
+        return announcements >= ARCHIVE_BATCH_SIZE or events >= ARCHIVE_BATCH_SIZE
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+sweeper = PeriodicTask("archive-sweeper", _sweep, ARCHIVE_SWEEP_INTERVAL)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Move expired content to the archive tables.")
+    parser.add_argument("what", choices=["announcements", "events", "all"])
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.what in ("announcements", "all"):
+            print(f"Archived {archive_expired_announcements(db, args.batch_size)} announcements")
+        if args.what in ("events", "all"):
+            print(f"Archived {archive_past_events(db, args.batch_size)} events")
+    finally:
+        db.close()
@@ -0,0 +1,50 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs fn every `interval` seconds in a daemon thread until stopped.
+
+    If fn returns something truthy (e.g. "there is more work"), it runs again right away
+    instead of sleeping. wake() cuts the current sleep short.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], object], interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            more = False
+            try:
+                more = self.fn()
+            except Exception as e:
+                logger.error(f"Background task {self.name} failed: {e}")
+
+            if not more:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
@@ -0,0 +1,71 @@
+import time
+import threading
+from typing import Any, Hashable, Iterable, Optional
+
+import revalidation
+
+
+class TagCache:
+    """
+    Small in-process cache for hot read endpoints.
+
+    Entries carry revalidation tags and are dropped as soon as one of those tags is
+    scheduled or purged in this process (writes go through the outbox, which purges
+    after commit). Other worker processes only see the purge if it runs there, so
+    entries also expire after ttl seconds.
+
+    To avoid caching a result read before a concurrent write committed, take
+    version(tags) before querying and pass it to set(); the value is dropped if one
+    of its tags was invalidated in between.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, tuple[float, frozenset, Any]] = {}
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, tags: Iterable[str]) -> tuple:
+        return tuple(self._versions.get(tag, 0) for tag in sorted(tags))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str], version: Optional[tuple] = None):
+        tags = frozenset(tags)
+        with self._lock:
+            if version is not None and version != self.version(tags):
+                return
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # drop the entry closest to expiry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic() + self.ttl, tags, value)
+
+    def invalidate(self, tags: Iterable[str]):
+        tags = set(tags)
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+            for key in [k for k, entry in self._entries.items() if entry[1] & tags]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def tag_cache(ttl: float = 30.0, max_entries: int = 64) -> TagCache:
+    """A TagCache wired to the revalidation dispatcher."""
+    cache = TagCache(ttl, max_entries)
+    revalidation.dispatcher.add_listener(cache.invalidate)
+    return cache
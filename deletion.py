@@ -0,0 +1,133 @@
+"""
+Deleting a club and everything it owns.
+
+Foreign keys cascade in the database (ON DELETE CASCADE, passive_deletes on the
+relationships), so deleting one event is a single DELETE whatever its likes and views.
+Deleting a club row directly would still cascade through all of its events, likes,
+views and announcements in one long transaction, so clubs are deleted by an outbox job
+instead: the club is marked pending deletion (club_deletions) right away, which hides
+it and everything it owns from every read and freezes its status, then its content
+goes in batches of CLUB_DELETE_BATCH_SIZE rows, one commit each, and the club row
+itself goes last.
+Every step is idempotent, so a failed job simply resumes on retry.
+
+    python deletion.py club CLUB_ID
+"""
+
+import os
+import logging
+
+from sqlalchemy import select, delete
+from dotenv import load_dotenv
+
+import models
+import outbox
+import stats
+from database import SessionLocal
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CLUB_DELETE_BATCH_SIZE = int(os.getenv("CLUB_DELETE_BATCH_SIZE", "200"))
+
+# owned tables, emptied before the club row; (model, revalidation tag)
+CLUB_CONTENT = (
+    (models.Event, "events"),
+    (models.EventArchive, "events"),
+    (models.Announcement, "announcements"),
+    (models.AnnouncementArchive, "announcements"),
+)
+
+
+def not_deleted(club_id_column):
+    """Criterion for reads: the owning club is not being deleted."""
+    return club_id_column.not_in(select(models.ClubDeletion.club_id))
+
+
+def is_pending_deletion(db, club_id: str) -> bool:
+    return db.get(models.ClubDeletion, club_id) is not None
+
+
+def enqueue_club_delete(db, club: models.User):
+    """Mark the club pending deletion and schedule the actual deletion. The caller commits and wakes the outbox."""
+    if is_pending_deletion(db, club.id):
+        return
+    db.add(models.ClubDeletion(club_id=club.id))
+    outbox.enqueue(db, "delete_club", {"club_id": club.id})
+    outbox.enqueue_revalidation(db, ["clubs", "events", "announcements"])
+
+
+def delete_club_content_batch(db, model, club_id: str, batch_size: int = CLUB_DELETE_BATCH_SIZE) -> int:
+    """Delete up to batch_size rows of model owned by the club (and what cascades from them), and commit."""
+    rows = db.execute(
+        select(model.id, model.cover_image).where(model.club_id == club_id).limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    ids = [row.id for row in rows]
+    for row in rows:
+        outbox.enqueue_image_delete(db, row.cover_image)
+    if model in (models.Event, models.EventArchive):
+        stats.delete_event_stats(db, ids)
+    db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    return len(rows)
+
+
+def delete_club(db, club_id: str, batch_size: int = CLUB_DELETE_BATCH_SIZE) -> int:
+    """Delete the club's content batch by batch, then the club. Returns rows deleted."""
+    deleted = 0
+    tags = {"clubs"}
+    for model, tag in CLUB_CONTENT:
+        while True:
+            n = delete_club_content_batch(db, model, club_id, batch_size)
+            if n:
+                tags.add(tag)
+            deleted += n
+            if n < batch_size:
+                break
+
+    club = db.get(models.User, club_id)
+    if club is not None:
+        outbox.enqueue_image_delete(db, club.logo_url)
+        outbox.enqueue_image_delete(db, club.banner_url)
+        db.delete(club)  # club subscriptions go by cascade
+        deleted += 1
+    outbox.enqueue_revalidation(db, sorted(tags))
+    db.commit()
+    outbox.wake()
+    logger.info(f"Deleted club {club_id} ({deleted} rows)")
+    return deleted
+
+
+@outbox.handler("delete_club")
+def handle_delete_club(payloads: list[dict]):
+    db = SessionLocal()
+    try:
+        for p in payloads:
+            delete_club(db, p["club_id"])
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Delete a club and everything it owns, in batches.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    club = sub.add_parser("club")
+    club.add_argument("club_id")
+    club.add_argument("--batch-size", type=int, default=CLUB_DELETE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Deleted {delete_club(db, args.club_id, args.batch_size)} rows")
+    finally:
+        db.close()
@@ -0,0 +1,148 @@
+"""
+Benchmarks for the weekly digest. Nothing here touches real mail servers or the database.
+
+    python digest_bench.py smtp --messages 2000 --pool-size 4
+    python digest_bench.py match --subscribers 100000 --events 2000
+"""
+
+import time
+import random
+import argparse
+import threading
+from types import SimpleNamespace
+
+import weekly_digest
+from smtp_sink import SMTPSink
+
+
+def bench_smtp(args):
+    html = weekly_digest.build_email_html([], "bench-token")
+    message = weekly_digest.build_message("student@example.com", "Benchmark", html)
+
+    with SMTPSink() as sink:
+        sender = weekly_digest.SMTPSenderPool(
+            host=sink.host, port=sink.port, user="", password="",
+            from_email="digest@example.com", size=args.pool_size,
+            max_per_second=args.rate, use_tls=False,
+        )
+        failures = []
+        lock = threading.Lock()
+
+        def on_result(to_email, tag, error):
+            if error is not None:
+                with lock:
+                    failures.append(error)
+
+        jobs = ((f"student{i}@example.com", message, i) for i in range(args.messages))
+        start = time.perf_counter()
+        with sender:
+            sender.send_many(jobs, on_result)
+        elapsed = time.perf_counter() - start
+
+        print(f"pooled: {args.messages} messages in {elapsed:.2f}s = {args.messages / elapsed:.0f} msg/s "
+              f"({sink.connections} connections, {len(failures)} failures)")
+
+        if args.compare:
+            # old behaviour: a fresh connection + handshake per message
+            before = sink.connections
+            n = min(args.messages, 500)
+            start = time.perf_counter()
+            for i in range(n):
+                single = weekly_digest.SMTPSenderPool(
+                    host=sink.host, port=sink.port, user="", password="",
+                    from_email="digest@example.com", size=1, max_per_second=0, use_tls=False,
+                )
+                with single:
+                    single.send(f"student{i}@example.com", message)
+            elapsed = time.perf_counter() - start
+            print(f"one connection per message: {n} messages in {elapsed:.2f}s = {n / elapsed:.0f} msg/s "
+                  f"({sink.connections - before} connections)")
+
+
+def make_events(n_events, n_clubs, tags, rng):
+    events = []
+    for i in range(n_events):
+        picked = rng.sample(tags, rng.randint(0, 4))
+        events.append(SimpleNamespace(
+            id=f"evt-{i}",
+            club_id=f"club-{rng.randrange(n_clubs)}",
+            # mixed case and stray spaces, like real input
+            tags=", ".join(t.upper() if rng.random() < 0.3 else t for t in picked),
+        ))
+    return events
+
+
+def make_subscribers(n_subscribers, n_clubs, categories, rng):
+    subscribers = []
+    for _ in range(n_subscribers):
+        clubs = [
+            SimpleNamespace(club_id=f"club-{rng.randrange(n_clubs)}", is_active=rng.random() > 0.1)
+            for _ in range(rng.choice((0, 0, 1, 2, 3, 5)))
+        ]
+        cats = [
+            SimpleNamespace(category=c, is_active=rng.random() > 0.1)
+            for c in rng.sample(categories, rng.choice((0, 0, 1, 2, 3)))
+        ]
+        subscribers.append(SimpleNamespace(club_subscriptions=clubs, category_subscriptions=cats))
+    return subscribers
+
+
+def bench_match(args):
+    rng = random.Random(args.seed)
+    categories = [c.value for c in weekly_digest.models.AnnouncementCategory]
+    tags = categories + ["free food", "music", "sports", "networking", "online", "hands-on"]
+
+    events = make_events(args.events, args.clubs, tags, rng)
+    subscribers = make_subscribers(args.subscribers, args.clubs, categories, rng)
+    print(f"{args.subscribers} subscribers x {args.events} events, {args.clubs} clubs")
+
+    start = time.perf_counter()
+    index = weekly_digest.EventIndex(events)
+    masks = [index.mask_for_subscriber(sub) for sub in subscribers]
+    elapsed = time.perf_counter() - start
+    print(f"indexed, masks only: {elapsed:.2f}s ({args.subscribers / elapsed:.0f} subscribers/s, "
+          f"{len(set(masks))} distinct event sets)")
+
+    start = time.perf_counter()
+    indexed = [index.events_for_mask(mask) for mask in masks]
+    elapsed = time.perf_counter() - start
+    matched = sum(len(e) for e in indexed)
+    print(f"indexed, expanding to event lists: +{elapsed:.2f}s ({matched} matches)")
+
+    # the per-subscriber scan is far slower, so time it on a sample and extrapolate
+    sample = subscribers[:args.baseline_sample]
+    start = time.perf_counter()
+    baseline = [weekly_digest.filter_events_for_subscriber(events, sub) for sub in sample]
+    elapsed = time.perf_counter() - start
+    projected = elapsed * len(subscribers) / max(len(sample), 1)
+    print(f"baseline: {elapsed:.2f}s for {len(sample)} subscribers, ~{projected:.0f}s projected for all")
+
+    mismatches = sum(1 for a, b in zip(baseline, indexed) if [e.id for e in a] != [e.id for e in b])
+    print(f"identical output on sample: {mismatches == 0} ({mismatches} mismatches)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weekly digest benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    smtp = sub.add_parser("smtp", help="SMTP send throughput against a local sink")
+    smtp.add_argument("--messages", type=int, default=2000)
+    smtp.add_argument("--pool-size", type=int, default=weekly_digest.SMTP_POOL_SIZE)
+    smtp.add_argument("--rate", type=float, default=0, help="messages/second cap, 0 = unlimited")
+    smtp.add_argument("--compare", action="store_true", help="also time one connection per message")
+    smtp.set_defaults(func=bench_smtp)
+
+    match = sub.add_parser("match", help="subscriber/event matching, indexed vs per-subscriber scan")
+    match.add_argument("--subscribers", type=int, default=100_000)
+    match.add_argument("--events", type=int, default=2000)
+    match.add_argument("--clubs", type=int, default=150)
+    match.add_argument("--baseline-sample", type=int, default=1000)
+    match.add_argument("--seed", type=int, default=42)
+    match.set_defaults(func=bench_match)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
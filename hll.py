@@ -0,0 +1,101 @@
+"""
+HyperLogLog sketch for approximate distinct counts.
+
+2^p one-byte registers (p=13: 8 KB raw, ~1.15% standard error; far smaller once
+zlib-compressed while the sketch is sparse). Items are hashed with 64-bit BLAKE2b.
+Sketches merge by taking the register-wise maximum, so partial sketches built in
+different processes can be combined in any order, any number of times.
+
+The estimate uses Ertl's improved raw estimator ("New cardinality estimation
+algorithms for HyperLogLog sketches", 2017), which needs no empirical bias tables
+and stays accurate from a handful of items up to billions.
+"""
+
+import math
+import zlib
+import hashlib
+from typing import Optional
+
+DEFAULT_PRECISION = 13
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == previous:
+            return z / 3.0
+
+
+class HyperLogLog:
+    def __init__(self, p: int = DEFAULT_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= p <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.p = p
+        self.m = 1 << p
+        self.q = 64 - p  # hash bits left after the register index
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    @staticmethod
+    def hash(item: str) -> int:
+        return int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+
+    def add(self, item: str):
+        x = self.hash(item)
+        index = x >> self.q
+        w = x & ((1 << self.q) - 1)
+        rank = self.q - w.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        histogram = [0] * (self.q + 2)
+        for value in self.registers:
+            histogram[value] += 1
+
+        m = self.m
+        z = m * _tau(1.0 - histogram[self.q + 1] / m)
+        for k in range(self.q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        if math.isinf(z):
+            return 0
+        return round(m * m / (2 * math.log(2)) / z)
+
+    def __len__(self):
+        return self.count()
+
+    def to_bytes(self) -> bytes:
+        """Precision byte + zlib-compressed registers."""
+        return bytes([self.p]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        p = data[0]
+        registers = bytearray(zlib.decompress(data[1:]))
+        if len(registers) != 1 << p:
+            raise ValueError("corrupt sketch")
+        return cls(p, registers)
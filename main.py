@@ -2,21 +2,27 @@ import uuid
 import requests
 import os
 from pathlib import Path
+from urllib.parse import urlparse
 import secrets
 from dotenv import load_dotenv
 import shutil
 import uvicorn
 import fastapi
 import logging
+import io
+import csv
+import base64
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import HTTPException, Query, FastAPI, File, UploadFile, status, Depends, Header, Request, Response, BackgroundTasks
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import datetime as dt
-from sqlalchemy.orm import Session, joinedload, contains_eager
-from sqlalchemy import select, asc, desc, or_, insert, func
+from sqlalchemy.orm import Session, joinedload, contains_eager, selectinload
+from sqlalchemy import select, update, delete, asc, desc, or_, case, insert, func, tuple_, literal
 import math
 import time
 from typing import Dict, List, Optional, Tuple
@@ -26,17 +32,16 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from data import club_data, event_data
-import database, models, schemas, utils, storage
+import database, models, schemas, utils, storage, revalidation, outbox, subscriptions, cache, archive, stats, unique_views, deletion
 
 models.Base.metadata.create_all(bind=database.engine)
+database.ensure_indexes(models.Base.metadata)
 
 load_dotenv()
 
 # trigger deploy again :( and againn last time
 
 VALID_API_KEY = os.getenv("API_SECRET_KEY")
-NEXTJS_URL = os.getenv("NEXTJS_APP_URL", "http://localhost:3000")
-REVALIDATION_TOKEN = os.getenv("REVALIDATION_TOKEN")
 
 logging.basicConfig(
     level=logging.INFO,
@@ -69,10 +74,46 @@ api.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=[database.READ_YOUR_WRITES_HEADER],
 )
 
 
+# read-your-writes: after a successful write, this client's reads go to the primary
+# for a few seconds (see database.get_read_db)
+@api.middleware("http")
+async def mark_recent_writes(request: Request, call_next):
+    response = await call_next(request)
+    if database.ReadSessionLocals and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        until = database.read_primary_deadline()
+        response.headers[database.READ_YOUR_WRITES_HEADER] = until
+        response.set_cookie(
+            database.READ_YOUR_WRITES_COOKIE, until,
+            max_age=math.ceil(database.READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax",
+        )
+    return response
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for uploaded images. Upload names are random and never reused, so cache forever."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+# Serve images from disk when using the local storage backend.
+# In production nginx can serve LOCAL_STORAGE_DIR directly (sendfile on) under the same path.
+if storage.STORAGE_BACKEND == "local":
+    os.makedirs(storage.LOCAL_STORAGE_DIR, exist_ok=True)
+    api.mount(
+        urlparse(storage.LOCAL_STORAGE_URL).path or "/media",
+        ImmutableStaticFiles(directory=storage.LOCAL_STORAGE_DIR),
+        name="media",
+    )
+
+
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
 ALLOWED_CONTENT_TYPES = {
     "image/jpeg": "jpg",
@@ -101,33 +142,6 @@ async def verify_api_key(x_api_key: str = Header(None)):
     if x_api_key != VALID_API_KEY:
         raise HTTPException(status_code=403, detail="Invalid API Key")
     
-# helper
-def revalidate_frontend(tags: list[str]):
-    """
-    Tells Next.js to purge cache for a list of tags.
-    Usage: revalidate_frontend(["events", "clubs"])
-    """
-    if not tags: 
-        return
-
-    # Join tags into a comma-separated string: "events,clubs"
-    tag_str = ",".join(tags)
-    
-    try:
-        # We send the list of tags as a query param
-        url = f"{NEXTJS_URL}/api/revalidate?tags={tag_str}&secret={REVALIDATION_TOKEN}"
-        
-        # 1. Fire and Forget (don't wait too long)
-        response = requests.post(url, timeout=2) 
-        
-        if response.status_code == 200:
-            logger.info(f"✅ Revalidation triggered for: {tags}")
-        else:
-            logger.info(f"⚠️ Revalidation failed: {response.text}")
-            
-    except Exception as e:
-        logger.info(f"❌ Error triggering revalidation: {e}")
-
 # helper — extract visitor ID from X-Visitor-Id header (no IP fallback)
 def get_visitor_id(request: Request) -> Optional[str]:
     visitor = request.headers.get("x-visitor-id")
@@ -187,6 +201,26 @@ def paginate(page: int, page_size: int, total: Optional[int]) -> schemas.Paginat
     )
 
 
+@api.on_event("startup")
+def start_background_workers():
+    outbox.worker.start()
+    archive.sweeper.start()
+    stats.worker.start()
+    if unique_views.approximate():
+        unique_views.worker.start()
+
+
+@api.on_event("shutdown")
+def stop_background_workers():
+    unique_views.worker.stop()
+    if unique_views.approximate():
+        unique_views.flush_pending()  # don't lose views buffered since the last flush
+    stats.worker.stop()
+    archive.sweeper.stop()
+    outbox.worker.stop()
+    revalidation.dispatcher.stop()
+
+
 @api.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -200,26 +234,30 @@ async def weekly_events(
     date: str = Query(..., description="Any date within the desired week (YYYY-MM-DD)"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_read_db),
     token: str = Depends(verify_api_key),
 ):
 
     try:
         week_beginning, week_end = get_week_range(date)
 
+        # weeks that reach past the archive horizon need the archived events too
+        ev = archive.event_source(include_history=week_beginning.date() < archive.event_archive_horizon())
+
         base_filter = (
-            select(models.Event)
-            .where(models.Event.date >= week_beginning.date())
-            .where(models.Event.date < week_end.date())
+            select(ev)
+            .where(ev.date >= week_beginning.date())
+            .where(ev.date < week_end.date())
+            .where(deletion.not_deleted(ev.club_id))
         )
 
         total = db.execute(select(func.count()).select_from(base_filter.subquery())).scalar()
 
         query = (
             base_filter
-            .join(models.Event.owner)
-            .options(contains_eager(models.Event.owner))
-            .order_by(models.Event.date.asc())
+            .join(ev.owner)
+            .options(contains_eager(ev.owner))
+            .order_by(ev.date.asc())
             .offset((page - 1) * page_size)
             .limit(page_size)
         )
@@ -267,41 +305,43 @@ async def browse_events(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     sort_order: str = Query("desc"),
-    db: Session = Depends(database.get_db),
+    include_history: bool = Query(False, description="Also search archived past events"),
+    db: database.LazySession = Depends(database.get_read_db),
     token: str = Depends(verify_api_key),
 ):
     try:
-        base_query = select(models.Event)
+        ev = archive.event_source(include_history)
+        base_query = select(ev).where(deletion.not_deleted(ev.club_id))
 
         if search:
             search_fmt = f"%{search}%"
             base_query = base_query.where(
                 or_(
-                    models.Event.title.ilike(search_fmt),
-                    models.Event.description.ilike(search_fmt),
+                    ev.title.ilike(search_fmt),
+                    ev.description.ilike(search_fmt),
                 )
             )
         if tag:
-            base_query = base_query.where(models.Event.tags.ilike(f"%{tag}%"))
+            base_query = base_query.where(ev.tags.ilike(f"%{tag}%"))
         if location_type:
-            base_query = base_query.where(models.Event.location_type == location_type)
+            base_query = base_query.where(ev.location_type == location_type)
         if club_id:
-            base_query = base_query.where(models.Event.club_id == club_id)
+            base_query = base_query.where(ev.club_id == club_id)
         if date_from:
-            base_query = base_query.where(models.Event.date >= date_from)
+            base_query = base_query.where(ev.date >= date_from)
         if date_to:
-            base_query = base_query.where(models.Event.date <= date_to)
+            base_query = base_query.where(ev.date <= date_to)
 
         total = db.execute(select(func.count()).select_from(base_query.subquery())).scalar()
 
-        order_clause = models.Event.date.asc() if sort_order == "asc" else models.Event.date.desc()
+        order_clause = ev.date.asc() if sort_order == "asc" else ev.date.desc()
 
         query = (
             base_query
-            .join(models.Event.owner)
-            .options(contains_eager(models.Event.owner))
+            .join(ev.owner)
+            .options(contains_eager(ev.owner))
             .order_by(order_clause)
-            .order_by(models.Event.date.desc())
+            .order_by(ev.date.desc())
             .offset((page - 1) * page_size)
             .limit(page_size)
         )
@@ -336,20 +376,34 @@ async def browse_events(
 
 # get single event
 @api.get("/events/{event_id}", response_model=schemas.SingleEventResponse)
-async def handle_events(event_id: str, request: Request, db: Session = Depends(database.get_db), token: str = Depends(verify_api_key),):
+async def handle_events(event_id: str, request: Request, db: database.LazySession = Depends(database.get_db), token: str = Depends(verify_api_key),):
+    """
+    One event. A request with x-visitor-id counts a view once per visitor; for events
+    more than STATS_ROLLUP_AFTER_DAYS in the past, only since the last stats rollup
+    (stats.py), so a returning visitor can be counted again.
+    """
 
     try:
 
         query = (
             select(models.Event)
             .options(joinedload(models.Event.owner))
-            .where(models.Event.id == event_id)
+            .where(models.Event.id == event_id, deletion.not_deleted(models.Event.club_id))
         )
 
         res = db.execute(query)
         event = res.scalars().first()
 
         if not event:
+            # past events live in the archive; they are read-only, so no view tracking
+            archived = db.execute(
+                select(models.EventArchive)
+                .options(joinedload(models.EventArchive.owner))
+                .where(models.EventArchive.id == event_id, deletion.not_deleted(models.EventArchive.club_id))
+            ).scalars().first()
+            if archived:
+                return schemas.SingleEventResponse(success=True, data=map_event_to_response(archived))
+
             raise HTTPException(404, detail="Event not found")
 
         visitor_id = get_visitor_id(request)
@@ -357,16 +411,20 @@ async def handle_events(event_id: str, request: Request, db: Session = Depends(d
 
         if visitor_id:
             # Deduplicated view count — only track when visitor is identified
-            already_viewed = db.execute(
-                select(models.EventView).where(
-                    models.EventView.event_id == event_id,
-                    models.EventView.visitor_id == visitor_id,
-                )
-            ).scalar()
-            if not already_viewed:
-                db.add(models.EventView(event_id=event_id, visitor_id=visitor_id))
-                event.view_count += 1
-                db.commit()
+            if unique_views.approximate():
+                # counted in a HyperLogLog sketch; view_count catches up on the next flush
+                unique_views.buffer.add(event.id, visitor_id)
+            else:
+                already_viewed = db.execute(
+                    select(models.EventView).where(
+                        models.EventView.event_id == event_id,
+                        models.EventView.visitor_id == visitor_id,
+                    )
+                ).scalar()
+                if not already_viewed:
+                    db.add(models.EventView(event_id=event_id, visitor_id=visitor_id))
+                    event.view_count += 1
+                    db.commit()
 
             # Check if this visitor has liked the event
             has_liked = db.execute(
@@ -389,14 +447,53 @@ async def handle_events(event_id: str, request: Request, db: Session = Depends(d
         raise HTTPException(500, detail="Internal server error")
     
 
+# likes/views per day for one event
+@api.get("/events/{event_id}/stats", response_model=schemas.EventStatsResponse)
+async def get_event_stats(
+    event_id: str,
+    db: database.LazySession = Depends(database.get_read_db),
+    token: str = Depends(verify_api_key),
+):
+    """
+    Likes and views per day. Views of events more than STATS_ROLLUP_AFTER_DAYS in the
+    past are unique per visitor only between stats rollups (see GET /events/{event_id}).
+    """
+    exists = db.execute(
+        select(models.Event.id).where(models.Event.id == event_id, deletion.not_deleted(models.Event.club_id))
+    ).scalar() or db.execute(
+        select(models.EventArchive.id).where(
+            models.EventArchive.id == event_id, deletion.not_deleted(models.EventArchive.club_id)
+        )
+    ).scalar()
+    if not exists:
+        raise HTTPException(404, detail="Event not found")
+
+    return schemas.EventStatsResponse(success=True, data=stats.daily_stats(db, event_id))
+
+
+# translate an id from before the compact-ids migration (e.g. "club-1") to the uuid it became
+@api.get("/legacy-ids/{legacy_id}")
+async def resolve_legacy_id(
+    legacy_id: str,
+    db: database.LazySession = Depends(database.get_read_db),
+    token: str = Depends(verify_api_key),
+):
+    rows = db.execute(
+        select(models.LegacyId.table_name, models.LegacyId.new_id).where(models.LegacyId.legacy_id == legacy_id)
+    ).all()
+    if not rows:
+        raise HTTPException(404, detail=f"No legacy id {legacy_id}")
+    return {"success": True, "legacy_id": legacy_id, "ids": {table: new_id for table, new_id in rows}}
+
+
 # get single club
 @api.get("/clubs/{club_id}", response_model=schemas.ClubApiResponse)
-async def handle_club(club_id: str, db: Session = Depends(database.get_db), token: str = Depends(verify_api_key),):
+async def handle_club(club_id: str, db: database.LazySession = Depends(database.get_read_db), token: str = Depends(verify_api_key),):
 
     try:
         query = (
             select(models.User)
-            .where(models.User.id == club_id)
+            .where(models.User.id == club_id, deletion.not_deleted(models.User.id))
         )
     
         club = db.execute(query).scalars().first()
@@ -423,17 +520,20 @@ async def handle_club_events(
     request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(database.get_db),
+    include_history: bool = True,
+    db: database.LazySession = Depends(database.get_read_db),
 ):
 
     try:
-        base_filter = select(models.Event).where(models.Event.club_id == club_id)
+        # a club's page lists its past events too, archived or not
+        ev = archive.event_source(include_history)
+        base_filter = select(ev).where(ev.club_id == club_id, deletion.not_deleted(ev.club_id))
         total = db.execute(select(func.count()).select_from(base_filter.subquery())).scalar()
 
         query = (
             base_filter
-            .options(joinedload(models.Event.owner))
-            .order_by(models.Event.date.desc())
+            .options(joinedload(ev.owner))
+            .order_by(ev.date.desc())
             .offset((page - 1) * page_size)
             .limit(page_size)
         )
@@ -472,8 +572,12 @@ async def upload_image(
     request: Request,
     file: UploadFile = File(...),
     current_user: models.User = Depends(utils.get_current_user),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
+    # the session only served authentication; don't pin a connection through PIL and the upload
+    db.release()
+
     try:
         if current_user.role not in ["club", "admin"]:
             raise HTTPException(status_code=403, detail="Uploading image is not allowed for the user")
@@ -497,9 +601,9 @@ async def upload_image(
         # 3. Compress and resize (converts to WebP)
         compressed_bytes, ext = storage.compress_image(content)
 
-        # 4. Upload to Supabase Storage
+        # 4. Upload to the storage backend (Supabase or local disk)
         safe_filename = f"{secrets.token_urlsafe(16)}.{ext}"
-        public_url = storage.upload_to_supabase(compressed_bytes, safe_filename, f"image/{ext}")
+        public_url = await storage.upload_file_async(compressed_bytes, safe_filename, f"image/{ext}")
 
         logger.info(f"Image uploaded: {safe_filename} ({len(content)} -> {len(compressed_bytes)} bytes)")
 
@@ -515,7 +619,7 @@ async def upload_image(
 
 @api.post("/signup", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit("5/minute")
-async def create_user(request: Request, user: schemas.UserCreate, db: Session = Depends(database.get_db), token: str = Depends(verify_api_key),):
+async def create_user(request: Request, user: schemas.UserCreate, db: database.LazySession = Depends(database.get_db), token: str = Depends(verify_api_key),):
     
     try:
 
@@ -524,6 +628,7 @@ async def create_user(request: Request, user: schemas.UserCreate, db: Session =
         existing_user = db.query(models.User).filter_by(email=user.email).first()
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
+        db.release()  # don't hold a connection while argon2 hashes; the insert opens a new session
         
         # 2. Hash the password
         hashed_pwd = utils.hash_password(user.password)
@@ -556,7 +661,7 @@ async def create_user(request: Request, user: schemas.UserCreate, db: Session =
 async def login_for_access_token(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     try:
@@ -564,6 +669,7 @@ async def login_for_access_token(
         # 1. Find the user
         # Note: OAuth2PasswordRequestForm expects 'username', but we treat it as 'email'
         user = db.query(models.User).filter_by(email = form_data.username).first()
+        db.release()  # argon2 below is slow; give the connection back first
         
         # 2. Verify User and Password
         if not user or not utils.verify_password(form_data.password, user.hashed_password):
@@ -600,9 +706,8 @@ async def read_users_me(current_user: models.User = Depends(utils.get_current_us
 @api.post("/events", response_model=schemas.SingleEventResponse)
 async def create_event(
     event_in: schemas.EventCreate, 
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     logger.info(f"Current user's role: {current_user.role}")
@@ -615,9 +720,11 @@ async def create_event(
             raise HTTPException(status_code=403, detail="You cannot post events for other clubs")
 
 
-    # 1. Fetch the Club trying to post
-    # (In a real app, this comes from the JWT Token. Here we look up the ID sent in the body)
-    club = db.query(models.User).filter(models.User.id == event_in.club_id).first()
+    # 1. Fetch the Club trying to post (usually the current user, already loaded)
+    if current_user.id == event_in.club_id:
+        club = current_user
+    else:
+        club = db.query(models.User).filter(models.User.id == event_in.club_id).first()
     
     if not club:
         raise HTTPException(status_code=404, detail="Club not found")
@@ -634,13 +741,13 @@ async def create_event(
     raw_slug = f"{event_in.title} {event_in.date}"
     slug = models.generate_slug(raw_slug)
 
-    # 2. Create the DB Object
+    # 2. Build the row
     # We unpack (**dict) the Pydantic model, but we need to exclude 
     # fields that don't match the DB column names exactly if we mapped them differently
 
     tags_string = ",".join(event_in.tags) if event_in.tags else ""
     
-    db_event = models.Event(
+    event_values = dict(
         slug=slug,
         title=event_in.title,
         description=event_in.description,
@@ -661,15 +768,15 @@ async def create_event(
     )
     
     try:
-        db.add(db_event)
-        db.commit()
-        db.refresh(db_event)
-        
-        # 3. Return the complex response (fetches club name automatically via relationship)
-        # We re-query or just construct it manually to match the response schema
+        # 3. INSERT ... RETURNING gives back the full row, so the response is built
+        # before commit with the club we already have — no refresh, no owner lookup
+        db_event = database.insert_returning(db, models.Event, event_values)
+        database.attach(db_event, owner=club)
         created_event = map_event_to_response(db_event)
 
-        bg_tasks.add_task(revalidate_frontend, ["events"])
+        outbox.enqueue_revalidation(db, ["events"])
+        db.commit()
+        outbox.wake()
 
         return schemas.SingleEventResponse(success=True, data=created_event)
         
@@ -683,15 +790,16 @@ async def create_event(
 async def get_all_clubs(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_read_db),
     token: str = Depends(verify_api_key),
 ):
 
     try:
-        total = db.execute(select(func.count()).select_from(models.User)).scalar()
+        base_query = select(models.User).where(deletion.not_deleted(models.User.id))
+        total = db.execute(select(func.count()).select_from(base_query.subquery())).scalar()
 
         result = db.execute(
-            select(models.User).offset((page - 1) * page_size).limit(page_size)
+            base_query.offset((page - 1) * page_size).limit(page_size)
         ).scalars().all()
 
         clubs_to_return = [map_club_to_response(club) for club in result]
@@ -709,59 +817,64 @@ async def get_all_clubs(
 async def update_club(
     club_id: str, 
     club_update: schemas.ClubUpdate, 
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     
     if current_user.role not in ["club", "admin"]:
         raise HTTPException(status_code=403, detail="Updating a club is not allowed for the user")
     
-    # 1. Fetch the existing Club (User)
-    query = select(models.User).where(models.User.id == club_id)
-    club = db.execute(query).scalars().first()
-
-    if not club:
-        raise HTTPException(status_code=404, detail="Club not found")
-    
-    if not bool(club.is_verified) and str(club.role) != "admin":
-        raise HTTPException(
-            status_code=403, 
-            detail="Unverified clubs cannot edit their public profile. Contact admin."
-        )
-
-    # 2. Update fields if they are provided in the request
+    # 1. Collect fields that are provided in the request
     # We check if value is not None so we don't accidentally erase data
-    if club_update.club_name is not None:
-        club.club_name = club_update.club_name
-        
-    if club_update.email is not None:
-        club.email = club_update.email
-        
-    if club_update.description is not None:
-        club.description = club_update.description
-        
-    if club_update.logo_url is not None:
-        club.logo_url = club_update.logo_url
-        
-    if club_update.banner_url is not None:
-        club.banner_url = club_update.banner_url
+    changes = {
+        field: value
+        for field, value in (
+            ("club_name", club_update.club_name),
+            ("email", club_update.email),
+            ("description", club_update.description),
+            ("logo_url", club_update.logo_url),
+            ("banner_url", club_update.banner_url),
+        )
+        if value is not None
+    }
 
-    # 3. Commit to Database
+    # 2. One UPDATE ... RETURNING; unverified clubs are filtered out in the WHERE clause
     try:
-        db.commit()
-        db.refresh(club) # Reloads the object with new data from DB
+        club = database.update_returning(
+            db, models.User,
+            [
+                models.User.id == club_id,
+                or_(models.User.is_verified == True, models.User.role == "admin"),
+                deletion.not_deleted(models.User.id),
+            ],
+            changes,
+        )
+        if club is None:
+            db.rollback()
+            if db.query(models.User.id).filter(models.User.id == club_id).first() is None:
+                raise HTTPException(status_code=404, detail="Club not found")
+            if deletion.is_pending_deletion(db, club_id):
+                raise HTTPException(status_code=409, detail="Club is being deleted")
+            raise HTTPException(
+                status_code=403, 
+                detail="Unverified clubs cannot edit their public profile. Contact admin."
+            )
 
-        bg_tasks.add_task(revalidate_frontend, ["clubs", "events"])
+        club_response = map_club_to_response(club)
+        outbox.enqueue_revalidation(db, ["clubs", "events"])
+        db.commit()
+        outbox.wake()
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to update club")
 
-    # 4. Return the updated club (formatted for the response schema)
+    # 3. Return the updated club (formatted for the response schema)
     return schemas.ClubApiResponse(
         success=True,
-        data=map_club_to_response(club)
+        data=club_response
     )
 
 # get all clubs for admin
@@ -771,7 +884,7 @@ async def get_all_clubs_admin(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     """
@@ -783,7 +896,7 @@ async def get_all_clubs_admin(
 
     try:
 
-        base_query = select(models.User).where(models.User.role == "club")
+        base_query = select(models.User).where(models.User.role == "club", deletion.not_deleted(models.User.id))
 
         if status == 'verified':
             base_query = base_query.where(models.User.is_verified == True)
@@ -815,9 +928,8 @@ async def get_all_clubs_admin(
 async def set_club_verification(
     club_id: str,
     status_update: schemas.ClubStatusUpdate,
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     """
@@ -826,26 +938,31 @@ async def set_club_verification(
 
     if current_user.role != "admin":
         raise HTTPException(status_code=401, detail="Changing club status is not allowed for the user")
-    club = db.query(models.User).filter(models.User.id == club_id).first()
-    if not club:
-        raise HTTPException(status_code=404, detail="Club not found")
-        
-    # Update Status
-    club.is_verified = status_update.is_verified
-    
-    # Handle Rejection Reason
-    if status_update.is_verified:
-        # CLEANUP: If approved, clear any old rejection reasons (set to None or empty string)
-        club.rejection_reason = None 
-    else:
-        # If rejected, require/store the reason
-        club.rejection_reason = status_update.rejection_reason
+
+    # Approving clears any old rejection reason; rejecting stores the new one
+    changes = {
+        "is_verified": status_update.is_verified,
+        "rejection_reason": None if status_update.is_verified else status_update.rejection_reason,
+    }
 
     try:
+        # clubs being deleted keep their status until the row is gone
+        club = database.update_returning(
+            db, models.User, [models.User.id == club_id, deletion.not_deleted(models.User.id)], changes
+        )
+        if club is None:
+            db.rollback()
+            if deletion.is_pending_deletion(db, club_id):
+                raise HTTPException(status_code=409, detail="Club is being deleted")
+            raise HTTPException(status_code=404, detail="Club not found")
+
+        club_response = map_club_to_response(club)
+        outbox.enqueue_revalidation(db, ["clubs"])
         db.commit()
-        db.refresh(club)
-        bg_tasks.add_task(revalidate_frontend, ["clubs"])
+        outbox.wake()
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to update verification status.")
@@ -853,92 +970,127 @@ async def set_club_verification(
     # Return using the Wrapper (ClubApiResponse) -> Data (ClubResponse)
     return schemas.ClubApiResponse(
         success=True,
-        data=map_club_to_response(club)
+        data=club_response
     )
 
 
+# ADMIN: DELETE CLUB (pending deletion now, content removed in batches by the outbox)
+@api.delete("/admin/clubs/{club_id}", response_model=schemas.ClubApiResponse, status_code=202)
+async def delete_club(
+    club_id: str,
+    current_user: models.User = Depends(utils.get_current_user),
+    db: database.LazySession = Depends(database.get_db),
+    token: str = Depends(verify_api_key),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=401, detail="Deleting clubs is not allowed for the user")
+    club = db.query(models.User).filter(models.User.id == club_id).first()
+    if not club:
+        raise HTTPException(status_code=404, detail="Club not found")
+    if club.role == "admin":
+        raise HTTPException(status_code=400, detail="Admin accounts cannot be deleted here")
+
+    try:
+        deletion.enqueue_club_delete(db, club)
+        db.commit()
+        outbox.wake()
+    except Exception as e:
+        db.rollback()
+        logger.info(f"Error scheduling club deletion: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete club")
+
+    return schemas.ClubApiResponse(success=True, data=map_club_to_response(club))
+
+
 # 2. CLUB: UPDATE EVENT
 @api.patch("/events/{event_id}", response_model=schemas.SingleEventResponse)
 async def update_event(
     event_id: str,
     event_update: schemas.EventUpdate,
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     
     if current_user.role not in ["club", "admin"]:
         raise HTTPException(status_code=403, detail="Updating event is not allowed for user")
 
-    # 1. Find Event
-    db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not db_event:
-        raise HTTPException(status_code=404, detail="Event not found")
-
-    # 2. Ownership check — clubs can only update their own events
-    if current_user.role == "club" and db_event.club_id != current_user.id:
-        raise HTTPException(status_code=403, detail="You can only update your own events")
-
-    # 3. Get the Club (Owner)
-    club = db.query(models.User).filter(models.User.id == db_event.club_id).first()
-
-    if not club:
-        raise HTTPException(status_code=500, detail="Event owner not found.")
-
-    # 4. Permission Check
-    if not club.is_verified and club.role != "admin":
-         raise HTTPException(status_code=403, detail="Unverified clubs cannot edit events.")
-
-    # 4. Update Fields
+    # 1. Collect the fields to update
     # Only update what is sent (Pydantic models exclude_unset=True is handled manually here for safety)
-    
-    if event_update.title is not None: db_event.title = event_update.title
-    if event_update.description is not None: db_event.description = event_update.description
-    if event_update.location is not None: db_event.location = event_update.location
-    if event_update.location_type is not None: db_event.location_type = event_update.location_type
-    if event_update.cover_image is not None: db_event.cover_image = event_update.cover_image
-    
-    # Time Logic
-    if event_update.date is not None:
-         # No need for strptime! Pydantic 'EventUpdate' schema already parsed this into a date object.
-         db_event.date = event_update.date 
-    
-    if event_update.start_time is not None: db_event.start_time = event_update.start_time
-    if event_update.end_time is not None: db_event.end_time = event_update.end_time
-    if event_update.duration is not None: db_event.duration = event_update.duration
-
-    # Registration Logic (Update these too!)
-    if event_update.is_registration_open is not None: 
-        db_event.is_registration_open = event_update.is_registration_open
-    if event_update.registration_link is not None: 
-        db_event.registration_link = event_update.registration_link
-    if event_update.capacity is not None: 
-        db_event.capacity = event_update.capacity
+    # (date needs no strptime: Pydantic 'EventUpdate' schema already parsed it into a date object)
+    changes = {
+        field: getattr(event_update, field)
+        for field in (
+            "title", "description", "location", "location_type", "cover_image",
+            "date", "start_time", "end_time", "duration",
+            "is_registration_open", "registration_link", "capacity",
+        )
+        if getattr(event_update, field) is not None
+    }
+
+    # 2. One UPDATE ... RETURNING. The WHERE clause does the permission checks — clubs
+    # can only update their own events, and only while the owner is verified — so the
+    # happy path never loads the event first
+    verified_owners = select(models.User.id).where(or_(models.User.is_verified == True, models.User.role == "admin"))
+    criteria = [models.Event.id == event_id, models.Event.club_id.in_(verified_owners)]
+    if current_user.role == "club":
+        criteria.append(models.Event.club_id == current_user.id)
 
     try:
-        db.commit()
-        db.refresh(db_event)
+        db_event = database.update_returning(db, models.Event, criteria, changes)
+        if db_event is None:
+            db.rollback()
+            raise_event_update_error(db, event_id, current_user)
 
-        bg_tasks.add_task(revalidate_frontend, ["events"])
+        # the owner is almost always the current user, which is already loaded
+        owner = current_user if db_event.club_id == current_user.id else db.get(models.User, db_event.club_id)
+        database.attach(db_event, owner=owner)
+        event_response = map_event_to_response(db_event)
 
+        outbox.enqueue_revalidation(db, ["events"])
+        db.commit()
+        outbox.wake()
+
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to update event")
 
-    # 5. Return (Map to Schema)
+    # 3. Return (Map to Schema)
     return schemas.SingleEventResponse(
         success=True,
-        data=map_event_to_response(db_event)
+        data=event_response
     )
 
+
+def raise_event_update_error(db: Session, event_id: str, current_user: models.User):
+    """The UPDATE matched nothing: work out why, with the same errors as before."""
+    db_event = (
+        db.query(models.Event)
+        .options(joinedload(models.Event.owner))
+        .filter(models.Event.id == event_id)
+        .first()
+    )
+    if not db_event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    # Ownership check — clubs can only update their own events
+    if current_user.role == "club" and db_event.club_id != current_user.id:
+        raise HTTPException(status_code=403, detail="You can only update your own events")
+
+    if not db_event.owner:
+        raise HTTPException(status_code=500, detail="Event owner not found.")
+
+    # Unverified clubs cannot edit
+    raise HTTPException(status_code=403, detail="Unverified clubs cannot edit events.")
+
 # DELETE EVENT
 @api.delete("/events/{event_id}", response_model=schemas.SingleEventResponse)
 async def delete_event(
     event_id: str,
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     if current_user.role not in ["club", "admin"]:
@@ -961,18 +1113,16 @@ async def delete_event(
     # 3. Build response before deletion (relationship data still available)
     event_response = map_event_to_response(db_event)
 
-    # 4. Clean up cover image from Supabase Storage
-    if db_event.cover_image:
-        try:
-            storage.delete_from_supabase(db_event.cover_image)
-        except Exception:
-            logger.info(f"Failed to delete image from storage: {db_event.cover_image}")
-
-    # 5. Delete from DB
+    # 4. Delete from DB; the cover image and cache purge go through the outbox after commit
     try:
+        outbox.enqueue_image_delete(db, db_event.cover_image)
+        outbox.enqueue_revalidation(db, ["events"])
+        # one DELETE: likes, views and sketches go by ON DELETE CASCADE (passive_deletes);
+        # daily stats have no FK (they outlive archiving), so they go explicitly
+        stats.delete_event_stats(db, [db_event.id])
         db.delete(db_event)
         db.commit()
-        bg_tasks.add_task(revalidate_frontend, ["events"])
+        outbox.wake()
     except Exception as e:
         db.rollback()
         logger.info(f"Error deleting event: {e}")
@@ -986,7 +1136,7 @@ async def get_all_clubs_user(
     search: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_read_db),
     token: str = Depends(verify_api_key),
 ):
     """
@@ -997,7 +1147,8 @@ async def get_all_clubs_user(
 
         base_query = select(models.User).where(
             models.User.role == "club",
-            models.User.is_verified == True
+            models.User.is_verified == True,
+            deletion.not_deleted(models.User.id),
         )
 
         if search:
@@ -1029,8 +1180,7 @@ async def get_all_clubs_user(
 async def handle_event_like(
     event_id: str,
     request: Request,
-    bg_tasks: BackgroundTasks,
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     try:
@@ -1038,43 +1188,58 @@ async def handle_event_like(
         if not visitor_id:
             raise HTTPException(status_code=400, detail="Visitor ID required")
 
-        event = db.execute(
-            select(models.Event).where(models.Event.id == event_id)
+        found = db.execute(
+            select(models.Event.id).where(models.Event.id == event_id, deletion.not_deleted(models.Event.club_id))
         ).scalar()
 
-        if not event:
+        if found is None:
             raise HTTPException(status_code=404, detail="Event not found")
 
-        # Check if this visitor already liked this event
-        existing_like = db.execute(
-            select(models.EventLike).where(
+        # Toggle with RETURNING: deleting an existing like means unlike, otherwise like.
+        # The counter moves in SQL (likes = likes ± 1), so concurrent toggles don't
+        # overwrite each other, and the new total comes back from the same UPDATE.
+        unliked = db.execute(
+            delete(models.EventLike)
+            .where(
                 models.EventLike.event_id == event_id,
                 models.EventLike.visitor_id == visitor_id,
             )
-        ).scalar()
+            .returning(models.EventLike.id)
+        ).first() is not None
 
-        if existing_like:
-            # Unlike — remove the row and decrement
-            db.delete(existing_like)
-            event.likes = max(0, event.likes - 1)
+        if unliked:
+            delta = case((models.Event.likes > 0, models.Event.likes - 1), else_=0)
             has_liked = False
         else:
-            # Like — insert row and increment
-            new_like = models.EventLike(event_id=event_id, visitor_id=visitor_id)
-            db.add(new_like)
-            event.likes += 1
+            # a concurrent like from the same visitor wins the unique constraint; count it once
+            liked = db.execute(
+                database.dialect_insert(db, models.EventLike)
+                .values(id=models.generate_uuid(), event_id=event_id, visitor_id=visitor_id)
+                .on_conflict_do_nothing(index_elements=["event_id", "visitor_id"])
+                .returning(models.EventLike.id)
+            ).first() is not None
+            delta = models.Event.likes + 1 if liked else models.Event.likes
             has_liked = True
 
+        likes = db.execute(
+            update(models.Event)
+            .where(models.Event.id == event_id)
+            .values(likes=delta)
+            .returning(models.Event.likes)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+
         db.commit()
-        db.refresh(event)
-        logger.info(f"like toggle: event={event_id} visitor={visitor_id} liked={has_liked} total={event.likes}")
+        logger.info(f"like toggle: event={event_id} visitor={visitor_id} liked={has_liked} total={likes}")
 
-        bg_tasks.add_task(revalidate_frontend, ["events"])
+        # Likes skip the outbox: losing one purge only leaves a like count briefly stale,
+        # and a row per toggle would double the write load of the hottest endpoint
+        revalidation.schedule(["events"], low_priority=True)
 
         return schemas.EventLikeResponse(
             success=True, 
             data=schemas.EventLikeData(
-                likes=int(event.likes), 
+                likes=int(likes), 
                 has_liked=has_liked
             )
             )
@@ -1107,6 +1272,28 @@ def map_announcement_to_response(a: models.Announcement) -> schemas.Announcement
     )
 
 
+ANNOUNCEMENTS_PAGE_SIZE = 20
+
+# Default feed (no filters, first page) is what nearly every visitor loads.
+# Cleared when "announcements" (or "clubs", for club names) is revalidated.
+announcement_feed_cache = cache.tag_cache(ttl=30)
+ANNOUNCEMENT_FEED_TAGS = ("announcements", "clubs")
+
+
+def encode_announcement_cursor(a: models.Announcement) -> str:
+    raw = f"{int(bool(a.is_pinned))}|{a.created_at.isoformat()}|{a.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_announcement_cursor(cursor: str) -> Tuple[bool, datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        pinned, created_at, announcement_id = raw.split("|", 2)
+        return pinned == "1", datetime.fromisoformat(created_at), announcement_id
+    except Exception:
+        raise HTTPException(400, detail="Invalid cursor")
+
+
 @api.get("/announcements", response_model=schemas.MultiAnnouncementResponse)
 async def get_announcements(
     category: Optional[List[str]] = Query(None),
@@ -1114,50 +1301,96 @@ async def get_announcements(
     tag: Optional[str] = None,
     search: Optional[str] = None,
     include_expired: bool = False,
-    db: Session = Depends(database.get_db),
+    limit: int = Query(ANNOUNCEMENTS_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: database.LazySession = Depends(database.get_read_db),
     token: str = Depends(verify_api_key),
 ):
+    """
+    Pinned first, then newest, keyset-paginated: pass the returned nextCursor to get
+    the following page. include_expired also reads the announcements archive.
+    """
+    today = datetime.now().date()
+    is_default_feed = not (category or club_id or tag or search or include_expired or cursor)
+    cache_key = ("feed", today, limit)
+    if is_default_feed:
+        cached = announcement_feed_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        cache_version = announcement_feed_cache.version(ANNOUNCEMENT_FEED_TAGS)
+
     try:
-        query = (
-            select(models.Announcement)
-            .join(models.Announcement.owner)
-            .options(contains_eager(models.Announcement.owner))
-        )
+        def feed_query(model, *criteria):
+            query = (
+                select(model)
+                .join(model.owner)
+                .options(contains_eager(model.owner))
+                .where(deletion.not_deleted(model.club_id), *criteria)
+            )
 
-        if category:
-            query = query.where(models.Announcement.category.in_(category))
-        if club_id:
-            query = query.where(models.Announcement.club_id == club_id)
-        if tag:
-            query = query.where(models.Announcement.tags.ilike(f"%{tag}%"))
-        if search:
-            search_fmt = f"%{search}%"
-            query = query.where(
-                or_(
-                    models.Announcement.title.ilike(search_fmt),
-                    models.Announcement.body.ilike(search_fmt),
+            if category:
+                query = query.where(model.category.in_(category))
+            if club_id:
+                query = query.where(model.club_id == club_id)
+            if tag:
+                query = query.where(model.tags.ilike(f"%{tag}%"))
+            if search:
+                search_fmt = f"%{search}%"
+                query = query.where(
+                    or_(
+                        model.title.ilike(search_fmt),
+                        model.body.ilike(search_fmt),
+                    )
                 )
-            )
+            if cursor:
+                # every key sorts descending, so "after the cursor" is a single row comparison;
+                # the cursor values are bound with the columns' types (the id as a CompactUUID)
+                pinned, created_at, announcement_id = decode_announcement_cursor(cursor)
+                query = query.where(
+                    tuple_(model.is_pinned, model.created_at, model.id) < tuple_(
+                        literal(pinned, model.is_pinned.type),
+                        literal(created_at, model.created_at.type),
+                        literal(announcement_id, model.id.type),
+                    )
+                )
+
+            # Pinned first, then newest (matches the feed index on both tables)
+            return query.order_by(
+                model.is_pinned.desc(),
+                model.created_at.desc(),
+                model.id.desc(),
+            ).limit(limit + 1)
+
+        live_criteria = []
         if not include_expired:
-            query = query.where(
+            # expired rows the sweeper hasn't archived yet
+            live_criteria.append(
                 or_(
                     models.Announcement.expires_at.is_(None),
-                    models.Announcement.expires_at >= datetime.now().date(),
+                    models.Announcement.expires_at >= today,
                 )
             )
+        result = db.execute(feed_query(models.Announcement, *live_criteria)).scalars().unique().all()
 
-        # Pinned first, then newest
-        query = query.order_by(
-            models.Announcement.is_pinned.desc(),
-            models.Announcement.created_at.desc(),
-        )
+        if include_expired:
+            # both sides are keyset-filtered and sorted, so merging their first pages is exact
+            archived = db.execute(feed_query(models.AnnouncementArchive)).scalars().unique().all()
+            result = sorted(
+                [*result, *archived],
+                key=lambda a: (a.is_pinned, a.created_at, a.id),
+                reverse=True,
+            )[:limit + 1]
 
-        result = db.execute(query).scalars().unique().all()
+        page, has_more = result[:limit], len(result) > limit
 
-        return schemas.MultiAnnouncementResponse(
+        response = schemas.MultiAnnouncementResponse(
             success=True,
-            data=[map_announcement_to_response(a) for a in result],
+            data=[map_announcement_to_response(a) for a in page],
+            next_cursor=encode_announcement_cursor(page[-1]) if has_more else None,
         )
+        if is_default_feed:
+            announcement_feed_cache.set(cache_key, response, ANNOUNCEMENT_FEED_TAGS, version=cache_version)
+        return response
 
     except HTTPException as he:
         raise he
@@ -1214,50 +1447,25 @@ def map_subscription_to_response(sub: models.Subscription) -> schemas.Subscripti
 async def subscribe(
     request: Request,
     sub_in: schemas.SubscribeRequest,
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     """
     Public endpoint. Students subscribe with just their email.
     Optionally pass club_ids and/or categories.
     """
-    import secrets as sec
-    try:
-        sub = _get_or_create_subscription(db, sub_in.email)
-
-        # Create CategorySubscription rows for any requested categories
-        for category in sub_in.categories:
-            existing_cat = db.query(models.CategorySubscription).filter(
-                models.CategorySubscription.subscription_id == sub.id,
-                models.CategorySubscription.category == category,
-            ).first()
-            if not existing_cat:
-                db.add(models.CategorySubscription(
-                    subscription_id=sub.id,
-                    category=category,
-                ))
-            elif not existing_cat.is_active:
-                existing_cat.is_active = True
-
-        sub.is_active = True
-
-        # Create ClubSubscription rows for any requested club_ids
-        for club_id in sub_in.club_ids:
-            existing_cs = db.query(models.ClubSubscription).filter(
-                models.ClubSubscription.subscription_id == sub.id,
-                models.ClubSubscription.club_id == club_id,
-            ).first()
-            if not existing_cs:
-                db.add(models.ClubSubscription(
-                    subscription_id=sub.id,
-                    club_id=club_id,
-                    token=sec.token_urlsafe(32),
-                ))
-            elif not existing_cs.is_active:
-                existing_cs.is_active = True
+    categories = [subscriptions.parse_category(c) for c in sub_in.categories]
+    if None in categories:
+        raise HTTPException(400, detail="Unknown category")
 
+    try:
+        # one upsert per table, however many clubs/categories were picked
+        sub_id = subscriptions.upsert_subscription(db, sub_in.email)
+        subscriptions.upsert_category_subscriptions(db, sub_id, categories)
+        subscriptions.upsert_club_subscriptions(db, sub_id, sub_in.club_ids)
         db.commit()
-        db.refresh(sub)
+
+        sub = subscriptions.load_subscription(db, sub_id)
 
         return schemas.SingleSubscriptionResponse(
             success=True, data=map_subscription_to_response(sub)
@@ -1275,7 +1483,7 @@ async def subscribe(
 async def toggle_club_subscription(
     club_id: str,
     req: schemas.ClubSubscribeRequest,
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
 ):
     """Toggle subscription to a specific club by email."""
     import secrets as sec
@@ -1320,29 +1528,19 @@ async def toggle_club_subscription(
 @api.delete("/unsubscribe/{token}")
 async def unsubscribe(
     token: str,
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
 ):
     """
     Public endpoint. Unsubscribe via token (from email link).
     Works for both master tokens (deactivates everything) and per-club tokens.
     """
     # Check master token first
-    sub = db.query(models.Subscription).filter(
-        models.Subscription.token == token
-    ).first()
-    if sub:
-        sub.is_active = False
-        for cs in sub.club_subscriptions:
-            cs.is_active = False
+    if subscriptions.deactivate_by_token(db, token):
         db.commit()
         return {"success": True, "message": "Unsubscribed from all"}
 
     # Check per-club token
-    cs = db.query(models.ClubSubscription).filter(
-        models.ClubSubscription.token == token
-    ).first()
-    if cs:
-        cs.is_active = False
+    if subscriptions.deactivate_club_by_token(db, token):
         db.commit()
         return {"success": True, "message": "Unsubscribed from club"}
 
@@ -1354,7 +1552,7 @@ async def get_subscriptions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     """Admin-only: view all active subscriptions."""
@@ -1366,7 +1564,11 @@ async def get_subscriptions(
         total = db.execute(select(func.count()).select_from(base_query.subquery())).scalar()
 
         subs = db.execute(
-            base_query.order_by(models.Subscription.created_at.desc())
+            base_query.options(
+                selectinload(models.Subscription.club_subscriptions).joinedload(models.ClubSubscription.club),
+                selectinload(models.Subscription.category_subscriptions),
+            )
+            .order_by(models.Subscription.created_at.desc())
             .offset((page - 1) * page_size).limit(page_size)
         ).scalars().all()
 
@@ -1384,34 +1586,229 @@ async def get_subscriptions(
         raise HTTPException(500, detail="Internal server error")
 
 
+@api.get("/admin/subscriptions/export")
+async def export_subscriptions(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    include_inactive: bool = False,
+    current_user: models.User = Depends(utils.get_current_user),
+    token: str = Depends(verify_api_key),
+):
+    """
+    Admin-only: every subscription with its active preferences, as CSV or NDJSON.
+    Streamed from a server-side cursor, so memory stays flat however many rows there are.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    filename = f"subscriptions-{dt.date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        subscriptions.stream_export(format, include_inactive),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api.post("/admin/subscriptions/import", response_model=schemas.SubscriptionImportResponse)
+async def import_subscriptions(
+    file: UploadFile = File(...),
+    batch_size: int = Query(subscriptions.IMPORT_BATCH_SIZE, ge=1, le=10000),
+    current_user: models.User = Depends(utils.get_current_user),
+    db: database.LazySession = Depends(database.get_db),
+    token: str = Depends(verify_api_key),
+):
+    """
+    Admin-only: bulk subscribe from a CSV (email, club_ids, categories columns).
+    The upload is read line by line and upserted in batches, never loaded whole.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        # blocking DB work, keep it off the event loop
+        result = await asyncio.to_thread(subscriptions.import_csv, db, lines, batch_size)
+    except (ValueError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(400, detail=f"Invalid CSV: {e}")
+    finally:
+        lines.detach()
+
+    logger.info(
+        f"Subscription import: {result['created']} created, {result['reactivated']} reactivated, "
+        f"{result['invalid']} invalid, {result['failed']} failed of {result['rows']} rows"
+    )
+    return schemas.SubscriptionImportResponse(success=True, data=result)
+
+
 @api.post("/admin/cleanup-storage")
 async def cleanup_storage(
+    bg_tasks: BackgroundTasks,
+    dry_run: bool = False,
+    db: database.LazySession = Depends(database.get_db),
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
-    """Admin-only: delete orphaned images from Supabase Storage."""
+    """Admin-only: delete orphaned images from storage in a background job."""
     if current_user.role != "admin":
         raise HTTPException(403, detail="Admin only")
 
-    result = storage.cleanup_orphaned_images(db)
-    return {"success": True, **result}
+    job_id = storage.create_cleanup_job(db, dry_run=dry_run)
+    bg_tasks.add_task(storage.run_cleanup_job, job_id)
+    return {"success": True, "job_id": job_id, "status": "queued", "dry_run": dry_run}
+
+
+@api.get("/admin/cleanup-storage/{job_id}")
+async def cleanup_storage_status(
+    job_id: str,
+    db: database.LazySession = Depends(database.get_db),
+    current_user: models.User = Depends(utils.get_current_user),
+    token: str = Depends(verify_api_key),
+):
+    """Admin-only: poll a storage cleanup job."""
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    job = storage.get_cleanup_job(db, job_id)
+    if not job:
+        raise HTTPException(404, detail="Cleanup job not found")
+    return {"success": True, **job}
+
+
+@api.get("/admin/revalidation-stats")
+async def revalidation_stats(
+    current_user: models.User = Depends(utils.get_current_user),
+    token: str = Depends(verify_api_key),
+):
+    """Admin-only: frontend purges requested vs. actually sent."""
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    return {"success": True, **revalidation.dispatcher.stats()}
+
+
+@api.get("/admin/pool-stats")
+async def pool_stats(
+    reset: bool = False,
+    current_user: models.User = Depends(utils.get_current_user),
+    token: str = Depends(verify_api_key),
+):
+    """Admin-only: DB connection pool usage and wait/hold/connect times (reset=true starts a new window)."""
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    return {"success": True, "pools": database.pool_stats(reset=reset)}
+
+
+# ==================== DIGEST RUNS ====================
+
+def map_digest_runs_to_progress(db: Session, runs: List[models.DigestRun]) -> List[schemas.DigestRunProgress]:
+    """Attach sent/failed counts to runs with a single grouped query."""
+    counts: Dict[Tuple[str, str], int] = {}
+    if runs:
+        rows = db.execute(
+            select(
+                models.DigestDelivery.run_id,
+                models.DigestDelivery.status,
+                func.count(),
+            )
+            .where(models.DigestDelivery.run_id.in_([r.id for r in runs]))
+            .group_by(models.DigestDelivery.run_id, models.DigestDelivery.status)
+        ).all()
+        counts = {(run_id, status): n for run_id, status, n in rows}
+
+    progress = []
+    for r in runs:
+        sent = counts.get((r.id, models.DeliveryStatus.SENT), 0)
+        failed = counts.get((r.id, models.DeliveryStatus.FAILED), 0)
+        progress.append(schemas.DigestRunProgress(
+            week=r.week,
+            total=r.total,
+            sent=sent,
+            failed=failed,
+            remaining=max(0, r.total - sent),
+            started_at=r.started_at,
+            finished_at=r.finished_at,
+        ))
+    return progress
+
+
+@api.get("/admin/digest-runs", response_model=schemas.MultiDigestRunResponse)
+async def get_digest_runs(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(utils.get_current_user),
+    db: database.LazySession = Depends(database.get_db),
+    token: str = Depends(verify_api_key),
+):
+    """Admin-only: weekly digest runs with send progress, newest first."""
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    try:
+        total = db.execute(select(func.count()).select_from(models.DigestRun)).scalar()
+        runs = db.execute(
+            select(models.DigestRun)
+            .order_by(models.DigestRun.week.desc())
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        ).scalars().all()
+
+        return schemas.MultiDigestRunResponse(
+            success=True,
+            data=map_digest_runs_to_progress(db, runs),
+            pagination=paginate(page, page_size, total),
+        )
+
+    except Exception as e:
+        logger.info(f"Error fetching digest runs: {e}")
+        db.rollback()
+        raise HTTPException(500, detail="Internal server error")
+
+
+@api.get("/admin/digest-runs/{week}", response_model=schemas.SingleDigestRunResponse)
+async def get_digest_run(
+    week: str,
+    current_user: models.User = Depends(utils.get_current_user),
+    db: database.LazySession = Depends(database.get_db),
+    token: str = Depends(verify_api_key),
+):
+    """Admin-only: progress of one digest run, by ISO week (e.g. 2026-W42)."""
+    if current_user.role != "admin":
+        raise HTTPException(403, detail="Admin only")
+
+    run = db.execute(select(models.DigestRun).where(models.DigestRun.week == week)).scalar()
+    if not run:
+        raise HTTPException(404, detail="Digest run not found")
+
+    return schemas.SingleDigestRunResponse(success=True, data=map_digest_runs_to_progress(db, [run])[0])
 
 
 @api.get("/announcements/{announcement_id}", response_model=schemas.SingleAnnouncementResponse)
 async def get_announcement(
     announcement_id: str,
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_read_db),
     token: str = Depends(verify_api_key),
 ):
     try:
         query = (
             select(models.Announcement)
             .options(joinedload(models.Announcement.owner))
-            .where(models.Announcement.id == announcement_id)
+            .where(models.Announcement.id == announcement_id, deletion.not_deleted(models.Announcement.club_id))
         )
         a = db.execute(query).scalars().first()
 
+        if not a:
+            # expired ones live in the archive
+            a = db.execute(
+                select(models.AnnouncementArchive)
+                .options(joinedload(models.AnnouncementArchive.owner))
+                .where(
+                    models.AnnouncementArchive.id == announcement_id,
+                    deletion.not_deleted(models.AnnouncementArchive.club_id),
+                )
+            ).scalars().first()
+
         if not a:
             raise HTTPException(404, detail="Announcement not found")
 
@@ -1430,9 +1827,8 @@ async def get_announcement(
 @api.post("/announcements", response_model=schemas.SingleAnnouncementResponse)
 async def create_announcement(
     announcement_in: schemas.AnnouncementCreate,
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     if current_user.role not in ["club", "admin"]:
@@ -1441,7 +1837,10 @@ async def create_announcement(
     if current_user.role == "club" and current_user.id != announcement_in.club_id:
         raise HTTPException(403, detail="You cannot post announcements for other clubs")
 
-    club = db.query(models.User).filter(models.User.id == announcement_in.club_id).first()
+    if current_user.id == announcement_in.club_id:
+        club = current_user
+    else:
+        club = db.query(models.User).filter(models.User.id == announcement_in.club_id).first()
     if not club:
         raise HTTPException(404, detail="Club not found")
 
@@ -1468,7 +1867,7 @@ async def create_announcement(
         final_expires_at = (datetime.utcnow() + timedelta(days=7)).date()
     # ----------------------------------------------
 
-    db_announcement = models.Announcement(
+    announcement_values = dict(
         slug=slug,
         title=announcement_in.title,
         body=announcement_in.body,
@@ -1482,15 +1881,16 @@ async def create_announcement(
     )
 
     try:
-        db.add(db_announcement)
-        db.commit()
-        db.refresh(db_announcement)
+        # INSERT ... RETURNING: respond from the returned row and the club already loaded
+        db_announcement = database.insert_returning(db, models.Announcement, announcement_values)
+        database.attach(db_announcement, owner=club)
+        response = map_announcement_to_response(db_announcement)
 
-        bg_tasks.add_task(revalidate_frontend, ["announcements"])
+        outbox.enqueue_revalidation(db, ["announcements"])
+        db.commit()
+        outbox.wake()
 
-        return schemas.SingleAnnouncementResponse(
-            success=True, data=map_announcement_to_response(db_announcement)
-        )
+        return schemas.SingleAnnouncementResponse(success=True, data=response)
 
     except Exception as e:
         db.rollback()
@@ -1502,9 +1902,8 @@ async def create_announcement(
 async def update_announcement(
     announcement_id: str,
     update: schemas.AnnouncementUpdate,
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     if current_user.role not in ["club", "admin"]:
@@ -1536,9 +1935,10 @@ async def update_announcement(
         db_a.is_pinned = update.is_pinned
 
     try:
+        outbox.enqueue_revalidation(db, ["announcements"])
         db.commit()
+        outbox.wake()
         db.refresh(db_a)
-        bg_tasks.add_task(revalidate_frontend, ["announcements"])
     except Exception as e:
         db.rollback()
         raise HTTPException(500, detail="Failed to update announcement")
@@ -1551,9 +1951,8 @@ async def update_announcement(
 @api.delete("/announcements/{announcement_id}", response_model=schemas.SingleAnnouncementResponse)
 async def delete_announcement(
     announcement_id: str,
-    bg_tasks: BackgroundTasks,
     current_user: models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     if current_user.role not in ["club", "admin"]:
@@ -1573,17 +1972,13 @@ async def delete_announcement(
 
     response = map_announcement_to_response(db_a)
 
-    # Clean up cover image from Supabase Storage
-    if db_a.cover_image:
-        try:
-            storage.delete_from_supabase(db_a.cover_image)
-        except Exception:
-            logger.info(f"Failed to delete announcement image: {db_a.cover_image}")
-
+    # Cover image cleanup and cache purge go through the outbox after commit
     try:
+        outbox.enqueue_image_delete(db, db_a.cover_image)
+        outbox.enqueue_revalidation(db, ["announcements"])
         db.delete(db_a)
         db.commit()
-        bg_tasks.add_task(revalidate_frontend, ["announcements"])
+        outbox.wake()
     except Exception as e:
         db.rollback()
         logger.info(f"Error deleting announcement: {e}")
@@ -1600,7 +1995,7 @@ async def handle_contact(
     request: Request,
     response: Response,
     contact_data: schemas.ContactRequest,
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     #token: str = Depends(verify_api_key),
 ):
     try:
@@ -1620,7 +2015,7 @@ async def handle_contact(
 @api.get("/get_contacts")
 async def get_contacts(
     user : models.User = Depends(utils.get_current_user),
-    db: Session = Depends(database.get_db),
+    db: database.LazySession = Depends(database.get_db),
     token: str = Depends(verify_api_key),
 ):
     try:
@@ -1,11 +1,14 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, Float, Text, Date, Integer, DateTime, UniqueConstraint
+from sqlalchemy import Column, String, Boolean, ForeignKey, Float, Text, Date, Integer, DateTime, UniqueConstraint, Index, LargeBinary
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from database import Base
+from database import Base, CompactUUID
 from typing import Optional
 import datetime
 import uuid
 import re
+import time
+import secrets
+import threading
 from enum import Enum
 
 class LocationType(str, Enum):
@@ -26,8 +29,45 @@ class UserRole(str, Enum):
     CLUB = "club"
     ADMIN = "admin"
 
+class DeliveryStatus(str, Enum):
+    SENT = "sent"
+    FAILED = "failed"
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    FAILED = "failed"  # gave up after max attempts, kept for inspection
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)  # (unix ms, counter)
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 v7): 48-bit unix ms, a 12-bit counter that keeps ids
+    from this process monotonic within a millisecond, then 62 random bits. New rows
+    land at the right edge of the primary key index instead of at random pages.
+    """
+    global _uuid7_last
+    with _uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        last_ms, counter = _uuid7_last
+        if ms > last_ms:
+            counter = secrets.randbits(11)  # random start, half the range left to count up
+        else:
+            ms, counter = last_ms, counter + 1
+            if counter > 0xFFF:
+                ms, counter = ms + 1, 0
+        _uuid7_last = (ms, counter)
+    value = (ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | secrets.randbits(62)
+    return uuid.UUID(int=value)
+
 def generate_uuid():
-    return str(uuid.uuid4())
+    return str(uuid7())
 
 def generate_slug(text: str) -> str:
     # Basic slugify: lowercase, remove special chars, replace space with dash
@@ -39,15 +79,15 @@ def generate_slug(text: str) -> str:
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String)
     
     # Profile
     club_name: Mapped[str] = mapped_column(String, index=True)
     description: Mapped[str] = mapped_column(Text, nullable=True)
-    logo_url: Mapped[str] = mapped_column(String, nullable=True)
-    banner_url: Mapped[str] = mapped_column(String, nullable=True)
+    logo_url: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    banner_url: Mapped[str] = mapped_column(String, nullable=True, index=True)
 
     # Status / Access Control
     role: Mapped[str] = mapped_column(
@@ -58,20 +98,21 @@ class User(Base):
     is_verified: Mapped[bool] = mapped_column(Boolean, default=False)
     rejection_reason: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
     
-    # Relationships
-    events = relationship("Event", back_populates="owner", cascade="all, delete-orphan")
-    announcements = relationship("Announcement", back_populates="owner", cascade="all, delete-orphan")
+    # Relationships — children go with ON DELETE CASCADE in the database, not loaded and
+    # deleted one by one (passive_deletes); big clubs are deleted in batches (deletion.py)
+    events = relationship("Event", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+    announcements = relationship("Announcement", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
 
 class Event(Base):
     __tablename__ = "events"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
     slug: Mapped[str] = mapped_column(String, unique=True, index=True)
     
     # Content
     title: Mapped[str] = mapped_column(String, index=True)
     description: Mapped[str] = mapped_column(Text)
-    cover_image: Mapped[str] = mapped_column(String, nullable=True)
+    cover_image: Mapped[str] = mapped_column(String, nullable=True, index=True)
     tags: Mapped[str] = mapped_column(String, default="") # Stored as comma-separated or JSON string usually
     
     # Time
@@ -93,14 +134,58 @@ class Event(Base):
     capacity: Mapped[Optional[int]] = mapped_column(Integer, nullable=True) # or Integer
 
     # Relationships
-    club_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"))
+    club_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     owner = relationship("User", back_populates="events")
 
     likes: Mapped[int] = mapped_column(Integer, default=0)
     view_count: Mapped[int] = mapped_column(Integer, default=0)
 
     # Relationships
-    event_likes = relationship("EventLike", back_populates="event", cascade="all, delete-orphan")
+    event_likes = relationship("EventLike", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class EventArchive(Base):
+    """
+    Past events, moved out of the hot events table by the archive sweeper with their
+    like/view totals. On Postgres this is range-partitioned by date, one partition per
+    semester (created by the sweeper on demand), so history searches only scan the
+    semesters they ask for; the partition key has to be part of the primary key there.
+    On SQLite it is a plain table.
+    """
+    __tablename__ = "events_archive"
+    __table_args__ = (
+        Index("ix_events_archive_date", "date"),
+        Index("ix_events_archive_club_date", "club_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True)
+    date: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    slug: Mapped[str] = mapped_column(String, index=True)
+
+    title: Mapped[str] = mapped_column(String)
+    description: Mapped[str] = mapped_column(Text)
+    cover_image: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    tags: Mapped[str] = mapped_column(String, default="")
+
+    start_time: Mapped[str] = mapped_column(String)
+    end_time: Mapped[str] = mapped_column(String)
+    duration: Mapped[float] = mapped_column(Float)
+
+    location_type: Mapped[str] = mapped_column(SQLEnum(LocationType), nullable=False)
+    location: Mapped[str] = mapped_column(String)
+
+    is_registration_open: Mapped[bool] = mapped_column(Boolean, default=False)
+    registration_link: Mapped[str] = mapped_column(String, nullable=True)
+    capacity: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    club_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("users.id", ondelete="CASCADE"))
+    owner = relationship("User")
+
+    likes: Mapped[int] = mapped_column(Integer, default=0)
+    view_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    archived_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
 
 
 class EventLike(Base):
@@ -109,8 +194,8 @@ class EventLike(Base):
         UniqueConstraint("event_id", "visitor_id", name="uq_event_visitor"),
     )
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
-    event_id: Mapped[str] = mapped_column(String, ForeignKey("events.id", ondelete="CASCADE"))
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    event_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("events.id", ondelete="CASCADE"))
     visitor_id: Mapped[str] = mapped_column(String, index=True)
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
 
@@ -123,18 +208,46 @@ class EventView(Base):
         UniqueConstraint("event_id", "visitor_id", name="uq_event_view_visitor"),
     )
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
-    event_id: Mapped[str] = mapped_column(String, ForeignKey("events.id", ondelete="CASCADE"))
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    event_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("events.id", ondelete="CASCADE"))
     visitor_id: Mapped[str] = mapped_column(String, index=True)
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
 
     event = relationship("Event")
 
 
+class EventDailyStat(Base):
+    """
+    Per-event, per-day like and view counts folded from event_likes/event_views by
+    the stats rollup, after which the raw rows are deleted. Event.likes/view_count
+    keep the running totals either way.
+    """
+    __tablename__ = "event_daily_stats"
+
+    event_id: Mapped[str] = mapped_column(CompactUUID, primary_key=True)  # no FK: rows outlive archiving
+    day: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    likes: Mapped[int] = mapped_column(Integer, default=0)
+    views: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class EventViewSketch(Base):
+    """
+    HyperLogLog sketch of an event's unique viewers, used instead of event_views
+    when VIEW_COUNTING=hll (see unique_views.py). view_count = base_count + estimate.
+    """
+    __tablename__ = "event_view_sketches"
+
+    event_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    sketch: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)  # precision byte + zlib registers
+    base_count: Mapped[int] = mapped_column(Integer, default=0)  # exact view_count when the sketch started
+    estimate: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     token: Mapped[str] = mapped_column(String, unique=True, index=True)  # master unsubscribe
     categories: Mapped[str] = mapped_column(Text, default="")  # comma-separated: "workshop,social,career"
@@ -142,8 +255,8 @@ class Subscription(Base):
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, index=True)
 
     # Relationships
-    club_subscriptions = relationship("ClubSubscription", back_populates="subscription", cascade="all, delete-orphan")
-    category_subscriptions = relationship("CategorySubscription", back_populates="subscription", cascade="all, delete-orphan")
+    club_subscriptions = relationship("ClubSubscription", back_populates="subscription", cascade="all, delete-orphan", passive_deletes=True)
+    category_subscriptions = relationship("CategorySubscription", back_populates="subscription", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class ClubSubscription(Base):
@@ -152,9 +265,9 @@ class ClubSubscription(Base):
         UniqueConstraint("subscription_id", "club_id", name="uix_subscription_club"),
     )
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
-    subscription_id: Mapped[str] = mapped_column(String, ForeignKey("subscriptions.id", ondelete="CASCADE"), index=True)
-    club_id: Mapped[str] = mapped_column(String, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    subscription_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("subscriptions.id", ondelete="CASCADE"), index=True)
+    club_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     token: Mapped[str] = mapped_column(String, unique=True, index=True)  # per-club unsubscribe
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
@@ -169,8 +282,8 @@ class CategorySubscription(Base):
         UniqueConstraint("subscription_id", "category", name="uix_subscription_category"),
     )
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
-    subscription_id: Mapped[str] = mapped_column(String, ForeignKey("subscriptions.id", ondelete="CASCADE"), index=True)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    subscription_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("subscriptions.id", ondelete="CASCADE"), index=True)
     category: Mapped[str] = mapped_column(
         SQLEnum(AnnouncementCategory),
         nullable=False,
@@ -184,14 +297,18 @@ class CategorySubscription(Base):
 
 class Announcement(Base):
     __tablename__ = "announcements"
+    __table_args__ = (
+        # feed order and keyset pagination: is_pinned DESC, created_at DESC, id DESC
+        Index("ix_announcements_feed", "is_pinned", "created_at", "id"),
+    )
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
     slug: Mapped[str] = mapped_column(String, unique=True, index=True)
 
     # Content
     title: Mapped[str] = mapped_column(String, index=True)
     body: Mapped[str] = mapped_column(Text)
-    cover_image: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    cover_image: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
     link: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     tags: Mapped[str] = mapped_column(String, default="")
     category: Mapped[str] = mapped_column(
@@ -209,14 +326,56 @@ class Announcement(Base):
     updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     # Relationships
-    club_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"))
+    club_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     owner = relationship("User", back_populates="announcements")
 
 
+class AnnouncementArchive(Base):
+    """
+    Expired announcements, moved out of the hot table by the archive sweeper.
+    Same columns (and ids) as Announcement, plus when the row was archived.
+    """
+    __tablename__ = "announcements_archive"
+    __table_args__ = (
+        Index("ix_announcements_archive_feed", "is_pinned", "created_at", "id"),
+    )
+
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True)
+    slug: Mapped[str] = mapped_column(String, unique=True, index=True)
+
+    title: Mapped[str] = mapped_column(String)
+    body: Mapped[str] = mapped_column(Text)
+    cover_image: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    link: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    tags: Mapped[str] = mapped_column(String, default="")
+    category: Mapped[str] = mapped_column(SQLEnum(AnnouncementCategory), nullable=False)
+
+    is_pinned: Mapped[bool] = mapped_column(Boolean, default=False)
+    expires_at: Mapped[Optional[datetime.date]] = mapped_column(Date, nullable=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+
+    club_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    owner = relationship("User")
+
+
+class ClubDeletion(Base):
+    """
+    A club whose deletion is under way (deletion.py). Its content is hidden from every
+    read and its status frozen until the outbox job deletes the club, which cascades here.
+    """
+    __tablename__ = "club_deletions"
+
+    club_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    requested_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+
+
 class Contact(Base):
     __tablename__ = "contact"
 
-    id: Mapped[str] = mapped_column(String, primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
 
     email: Mapped[str] = mapped_column(String)
     message: Mapped[str] = mapped_column(String)
@@ -224,4 +383,92 @@ class Contact(Base):
     date : Mapped[datetime.datetime] = mapped_column(DateTime, index=True)
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class OutboxMessage(Base):
+    """A side effect (image delete, revalidation, ...) written in the same transaction as the change."""
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_status_available", "status", "available_at"),
+    )
+
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    kind: Mapped[str] = mapped_column(String)
+    payload: Mapped[str] = mapped_column(Text, default="{}")  # JSON
+
+    status: Mapped[str] = mapped_column(
+        SQLEnum(OutboxStatus),
+        nullable=False,
+        default=OutboxStatus.PENDING
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    available_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+
+
+class LegacyId(Base):
+    """
+    An id from before CompactUUID columns that was not a canonical uuid (e.g. "club-1"),
+    and the uuid it became. Recorded by migrations.py compact-ids, so clients holding
+    old ids can translate them (GET /legacy-ids/{legacy_id}).
+    """
+    __tablename__ = "legacy_ids"
+
+    table_name: Mapped[str] = mapped_column(String, primary_key=True)
+    legacy_id: Mapped[str] = mapped_column(String, primary_key=True)
+    new_id: Mapped[str] = mapped_column(CompactUUID, index=True)
+
+
+class CleanupJob(Base):
+    """A storage cleanup started from the admin endpoint; kept CLEANUP_JOB_RETENTION_DAYS."""
+    __tablename__ = "cleanup_jobs"
+
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    status: Mapped[str] = mapped_column(
+        SQLEnum(JobStatus),
+        nullable=False,
+        default=JobStatus.QUEUED
+    )
+    dry_run: Mapped[bool] = mapped_column(Boolean, default=False)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow, index=True)
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class DigestRun(Base):
+    """One weekly digest send, keyed by ISO week. Reruns in the same week resume it."""
+    __tablename__ = "digest_runs"
+
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    week: Mapped[str] = mapped_column(String, unique=True, index=True)  # e.g. "2026-W42"
+    total: Mapped[int] = mapped_column(Integer, default=0)  # sent + active subscribers still to send
+    started_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+    finished_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+
+    deliveries = relationship("DigestDelivery", back_populates="run", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class DigestDelivery(Base):
+    """Send state of one subscriber within a digest run."""
+    __tablename__ = "digest_deliveries"
+    __table_args__ = (
+        UniqueConstraint("run_id", "subscription_id", name="uq_digest_run_subscription"),
+    )
+
+    id: Mapped[str] = mapped_column(CompactUUID, primary_key=True, default=generate_uuid)
+    run_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("digest_runs.id", ondelete="CASCADE"), index=True)
+    subscription_id: Mapped[str] = mapped_column(CompactUUID, ForeignKey("subscriptions.id", ondelete="CASCADE"))
+    email: Mapped[str] = mapped_column(String)
+    status: Mapped[str] = mapped_column(
+        SQLEnum(DeliveryStatus),
+        nullable=False,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=1)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.utcnow)
+
+    run = relationship("DigestRun", back_populates="deliveries")
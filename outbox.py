@@ -0,0 +1,208 @@
+"""
+Transactional outbox.
+
+Endpoints call enqueue() inside the same DB transaction as the change they make, so a
+side effect is recorded if and only if the change commits. A background worker drains
+the table in batches, groups messages by kind and hands each group to the registered
+handler. Messages are claimed in their own short transaction before handlers run, so
+several workers can drain side by side. Failed groups are retried with exponential
+backoff; after OUTBOX_MAX_ATTEMPTS the messages are marked failed and left in the table
+for inspection. Handlers may see a message more than once and must be idempotent.
+
+New side effects (e.g. notifications) only need a handler registered with @handler("kind").
+"""
+
+import os
+import json
+import logging
+import datetime
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import select, update, delete
+from dotenv import load_dotenv
+
+import models
+from database import SessionLocal
+from background import PeriodicTask
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE = 2.0  # seconds, doubled per attempt
+OUTBOX_RETRY_MAX = 600.0
+# how long a claimed batch is reserved for its worker; handlers must finish well within it
+OUTBOX_CLAIM_TIMEOUT = float(os.getenv("OUTBOX_CLAIM_TIMEOUT", "900"))
+
+HANDLERS: dict[str, Callable[[list[dict]], None]] = {}
+
+
+def handler(kind: str):
+    """Register a batch handler: fn(payloads) must raise if the batch should be retried."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db, kind: str, payload: dict):
+    """Add a message to the caller's transaction. Nothing happens until it commits."""
+    db.add(models.OutboxMessage(kind=kind, payload=json.dumps(payload)))
+
+
+def enqueue_revalidation(db, tags: list[str]):
+    enqueue(db, "revalidate", {"tags": tags})
+
+
+def enqueue_image_delete(db, file_url: str):
+    if file_url:
+        enqueue(db, "delete_image", {"url": file_url})
+
+
+# --- handlers ---
+
+@handler("revalidate")
+def handle_revalidate(payloads: list[dict]):
+    # hand the tags to the dispatcher, which coalesces purges across drains (a burst of
+    # commits wakes the worker once per commit) and sends them after its window
+    import revalidation
+
+    revalidation.dispatcher.schedule({tag for p in payloads for tag in p.get("tags", [])})
+
+
+@handler("delete_image")
+def handle_delete_image(payloads: list[dict]):
+    import storage
+
+    backend = storage.get_backend()
+    if not backend.is_configured:
+        return
+
+    filenames = []
+    for p in payloads:
+        filename = backend.filename_from_url(p.get("url", ""))
+        if filename is None:
+            logger.info(f"Not a {backend.name} storage URL, skipping: {p.get('url')}")
+        else:
+            filenames.append(filename)
+
+    if filenames and not backend.delete(filenames):
+        raise RuntimeError(f"Failed to delete {len(filenames)} image(s)")
+
+
+# --- worker ---
+
+def retry_delay(attempts: int) -> float:
+    return min(OUTBOX_RETRY_BASE * (2 ** (attempts - 1)), OUTBOX_RETRY_MAX)
+
+
+def claim(db, batch_size: int = OUTBOX_BATCH_SIZE) -> tuple[datetime.datetime, list]:
+    """
+    Lease up to batch_size due messages to this worker and commit. The lease is
+    available_at moved OUTBOX_CLAIM_TIMEOUT ahead, so other workers skip the rows until
+    it runs out; the UPDATE re-checks available_at, so two workers never claim the same
+    row even without SKIP LOCKED (SQLite). Returns (lease, claimed rows).
+    """
+    now = datetime.datetime.utcnow()
+    lease = now + datetime.timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)
+    due = (
+        models.OutboxMessage.status == models.OutboxStatus.PENDING,
+        models.OutboxMessage.available_at <= now,
+    )
+    ids = (
+        select(models.OutboxMessage.id)
+        .where(*due)
+        .order_by(models.OutboxMessage.available_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # lets several workers claim side by side (Postgres)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        update(models.OutboxMessage)
+        .where(models.OutboxMessage.id.in_(ids), *due)
+        .values(available_at=lease, attempts=models.OutboxMessage.attempts + 1)
+        .returning(models.OutboxMessage.id, models.OutboxMessage.kind, models.OutboxMessage.payload, models.OutboxMessage.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return lease, rows
+
+
+def record_failure(db, lease: datetime.datetime, group: list, error: str):
+    """Schedule a retry (or give up) for messages still under this worker's lease."""
+    now = datetime.datetime.utcnow()
+    table = models.OutboxMessage
+    for m in group:
+        values = {"last_error": error}
+        if m.attempts >= OUTBOX_MAX_ATTEMPTS:
+            values["status"] = models.OutboxStatus.FAILED
+        else:
+            values["available_at"] = now + datetime.timedelta(seconds=retry_delay(m.attempts))
+        db.execute(
+            update(table)
+            .where(table.id == m.id, table.available_at == lease)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def drain_once(batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Process one batch of due messages. Returns how many were picked up.
+
+    Three steps, so no transaction stays open while handlers talk to the network:
+    claim and commit, run the handlers, then record the results in a second transaction.
+    A worker that dies mid-batch leaves its messages to be retried once the lease expires.
+    """
+    db = SessionLocal()
+    try:
+        lease, messages = claim(db, batch_size)
+        if not messages:
+            return 0
+
+        by_kind = defaultdict(list)
+        for m in messages:
+            by_kind[m.kind].append(m)
+
+        done_ids = []
+        failed = []
+        for kind, group in by_kind.items():
+            fn = HANDLERS.get(kind)
+            try:
+                if fn is None:
+                    raise RuntimeError(f"No outbox handler for kind '{kind}'")
+                fn([json.loads(m.payload or "{}") for m in group])
+                done_ids.extend(m.id for m in group)
+            except Exception as e:
+                logger.error(f"Outbox {kind} batch of {len(group)} failed: {e}")
+                failed.append((group, str(e)))
+
+        if done_ids:
+            db.execute(delete(models.OutboxMessage).where(models.OutboxMessage.id.in_(done_ids)))
+        for group, error in failed:
+            record_failure(db, lease, group, error)
+        db.commit()
+        return len(messages)
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _drain() -> bool:
+    # a full batch means there is probably more waiting
+    return drain_once() >= OUTBOX_BATCH_SIZE
+
+
+worker = PeriodicTask("outbox-worker", _drain, OUTBOX_POLL_INTERVAL)
+
+
+def wake():
+    """Nudge the worker after a commit so side effects don't wait for the next poll."""
+    worker.wake()
@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+NEXTJS_URL = os.getenv("NEXTJS_APP_URL", "http://localhost:3000")
+REVALIDATION_TOKEN = os.getenv("REVALIDATION_TOKEN")
+
+# How long a tag may wait for other tags to join it before the purge is sent (seconds)
+REVALIDATION_WINDOW = float(os.getenv("REVALIDATION_WINDOW", "1.0"))
+# Likes only move a counter on the page, so they can wait longer
+REVALIDATION_LOW_PRIORITY_WINDOW = float(os.getenv("REVALIDATION_LOW_PRIORITY_WINDOW", "10.0"))
+
+
+class RevalidationDispatcher:
+    """
+    Coalesces Next.js cache purges.
+
+    schedule() only records tags with a deadline and returns immediately. A single
+    background thread wakes at the earliest deadline and sends every pending tag in
+    one request, so a burst of writes inside a window costs one purge. A tag that is
+    already pending keeps the earlier of the two deadlines, so a normal write pulls
+    a waiting low-priority (like) purge forward instead of sending a second one.
+    """
+
+    def __init__(
+        self,
+        base_url: str = NEXTJS_URL,
+        token: Optional[str] = REVALIDATION_TOKEN,
+        window: float = REVALIDATION_WINDOW,
+        low_priority_window: float = REVALIDATION_LOW_PRIORITY_WINDOW,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.window = window
+        self.low_priority_window = low_priority_window
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._pending: dict[str, float] = {}  # tag -> deadline (monotonic)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        # requested: purges asked for (each used to be its own HTTP request)
+        # sent: purge requests actually made; saved = requested - sent - still pending
+        self._counters = {"requested": 0, "sent": 0, "failed": 0, "tags_sent": 0}
+        self._pending_calls = 0
+
+        # in-process caches that must drop entries when their tags are purged
+        self._listeners: list[Callable[[list[str]], None]] = []
+
+    def add_listener(self, callback: Callable[[list[str]], None]):
+        """Call callback(tags) whenever tags are scheduled or purged from this process."""
+        self._listeners.append(callback)
+
+    def _notify(self, tags: list[str]):
+        for callback in self._listeners:
+            try:
+                callback(tags)
+            except Exception as e:
+                logger.error(f"Revalidation listener failed for {tags}: {e}")
+
+    def schedule(self, tags: Iterable[str], low_priority: bool = False):
+        """Queue tags for purging. Never blocks on the network."""
+        tags = [t for t in tags if t]
+        if not tags:
+            return
+        self._notify(tags)
+
+        deadline = time.monotonic() + (self.low_priority_window if low_priority else self.window)
+        with self._cond:
+            self._counters["requested"] += 1
+            self._pending_calls += 1
+            for tag in tags:
+                self._pending[tag] = min(deadline, self._pending.get(tag, deadline))
+            self._ensure_thread()
+            self._cond.notify()
+
+    def purge(self, tags: Iterable[str]) -> bool:
+        """Send one purge request for the given tags right now."""
+        tags = [t for t in tags if t]
+        self._notify(tags)
+        with self._cond:
+            self._counters["requested"] += 1
+        return self._send(tags)
+
+    def _send(self, tags: Iterable[str]) -> bool:
+        tags = sorted(set(tags))
+        if not tags:
+            return True
+
+        url = f"{self.base_url}/api/revalidate"
+        params = {"tags": ",".join(tags), "secret": self.token}
+        try:
+            response = self.session.post(url, params=params, timeout=2)
+            ok = response.status_code == 200
+            if ok:
+                logger.info(f"✅ Revalidation triggered for: {tags}")
+            else:
+                logger.info(f"⚠️ Revalidation failed: {response.text}")
+        except Exception as e:
+            ok = False
+            logger.info(f"❌ Error triggering revalidation: {e}")
+
+        with self._cond:
+            self._counters["sent"] += 1
+            self._counters["tags_sent"] += len(tags)
+            if not ok:
+                self._counters["failed"] += 1
+        return ok
+
+    def flush(self):
+        """Send everything that is pending now (used at shutdown)."""
+        with self._cond:
+            tags = self._take_pending()
+        if tags:
+            self._send(tags)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            counters = dict(self._counters)
+            counters["pending_tags"] = len(self._pending)
+            counters["saved"] = counters["requested"] - counters["sent"] - self._pending_calls
+        return counters
+
+    def _take_pending(self) -> list[str]:
+        tags = list(self._pending)
+        self._pending.clear()
+        self._pending_calls = 0
+        return tags
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="revalidation-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+
+                timeout = min(self._pending.values()) - time.monotonic()
+                if timeout > 0:
+                    # new tags may arrive with an earlier deadline, so re-check after waking
+                    self._cond.wait(timeout)
+                    continue
+
+                # one request per window: take every pending tag, due or not
+                tags = self._take_pending()
+
+            self._send(tags)
+
+
+dispatcher = RevalidationDispatcher()
+
+
+def schedule(tags: Iterable[str], low_priority: bool = False):
+    """
+    Tells Next.js to purge cache for a list of tags, coalesced with other writes.
+    Usage: revalidation.schedule(["events", "clubs"])
+    """
+    dispatcher.schedule(tags, low_priority=low_priority)
@@ -126,7 +126,13 @@ class EventBase(CamelModel):
     registration_link: Optional[str] = None
     capacity: Optional[int] = Field(None, ge=0)
     likes: int = 0
-    view_count: int = 0
+    view_count: int = Field(
+        0,
+        description=(
+            "Views, once per visitor. For events more than STATS_ROLLUP_AFTER_DAYS in the past "
+            "(7 by default) a visitor seen before the last stats rollup is counted again."
+        ),
+    )
 
     @field_validator("start_time", "end_time")
     @classmethod
@@ -192,6 +198,14 @@ class MultiEventResponse(ApiResponse):
     data: List[EventResponse]
     pagination: Optional[PaginationMeta] = None
 
+class EventDailyStatResponse(CamelModel):
+    day: datetime.date
+    likes: int
+    views: int = Field(..., description="Views that day; see EventBase.view_count for how repeat visitors count")
+
+class EventStatsResponse(ApiResponse):
+    data: List[EventDailyStatResponse]
+
 class EventLikeData(CamelModel):
     likes: int
     has_liked: bool
@@ -237,6 +251,7 @@ class SingleAnnouncementResponse(ApiResponse):
 
 class MultiAnnouncementResponse(ApiResponse):
     data: List[AnnouncementResponse]
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page
 
 # --- CONTACT ---
 
@@ -287,7 +302,40 @@ class MultiSubscriptionResponse(ApiResponse):
     data: List[SubscriptionResponse]
     pagination: Optional[PaginationMeta] = None
 
+class ImportRowError(CamelModel):
+    line: int
+    error: str
+
+class SubscriptionImportResult(CamelModel):
+    rows: int
+    created: int
+    reactivated: int
+    unchanged: int
+    invalid: int
+    failed: int  # valid rows in batches the database rejected
+    errors: List[ImportRowError] = []  # first MAX_REPORTED_ERRORS only
+
+class SubscriptionImportResponse(ApiResponse):
+    data: Optional[SubscriptionImportResult] = None
+
 class ClubSubscriptionToggleResponse(CamelModel):
     success: bool
     message: str
-    is_subscribed: bool
\ No newline at end of file
+    is_subscribed: bool
+# --- DIGEST RUNS ---
+
+class DigestRunProgress(CamelModel):
+    week: str
+    total: int
+    sent: int
+    failed: int
+    remaining: int
+    started_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+
+class SingleDigestRunResponse(ApiResponse):
+    data: Optional[DigestRunProgress] = None
+
+class MultiDigestRunResponse(ApiResponse):
+    data: List[DigestRunProgress]
+    pagination: Optional[PaginationMeta] = None
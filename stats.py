@@ -0,0 +1,187 @@
+"""
+Daily rollups for event likes and views.
+
+event_likes/event_views hold one row per (event, visitor) only so likes can be
+toggled and views counted once per visitor. Views are by far the bigger table, so
+once an event is STATS_ROLLUP_AFTER_DAYS in the past the rollup folds its raw views
+into event_daily_stats (one row per event and day) and deletes them in batches.
+Likes are few and needed for toggling, so they stay raw until the event is archived
+(rollup_events). The running totals on Event are never touched.
+
+Past events keep counting likes and views. A view of a rolled-up event is counted
+once per visitor since the last rollup: visitors whose raw rows were already folded
+can be counted again. With VIEW_COUNTING=hll the sketches keep deduplicating until
+the event is archived.
+
+Runs inside the app every STATS_ROLLUP_INTERVAL seconds, or once from the command line:
+    python stats.py [--batch-size 5000]
+"""
+
+import os
+import logging
+import datetime
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import select, delete, func
+from dotenv import load_dotenv
+
+import models
+from database import SessionLocal, dialect_insert
+from background import PeriodicTask
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STATS_ROLLUP_AFTER_DAYS = int(os.getenv("STATS_ROLLUP_AFTER_DAYS", "7"))
+STATS_ROLLUP_BATCH_SIZE = int(os.getenv("STATS_ROLLUP_BATCH_SIZE", "5000"))
+STATS_ROLLUP_INTERVAL = float(os.getenv("STATS_ROLLUP_INTERVAL", "3600"))
+
+# raw table -> column it feeds in event_daily_stats
+RAW_TABLES = ((models.EventView, "views"), (models.EventLike, "likes"))
+# folded by the periodic rollup; likes wait for archiving
+ROLLUP_TABLES = ((models.EventView, "views"),)
+
+
+def rollup_horizon(today: Optional[datetime.date] = None) -> datetime.date:
+    """Events dated before this day have their raw likes/views rolled up."""
+    return (today or datetime.date.today()) - datetime.timedelta(days=STATS_ROLLUP_AFTER_DAYS)
+
+
+def _add_daily_counts(db, counts: Counter, column: str):
+    """Upsert {(event_id, day): n} into event_daily_stats, adding to existing rows."""
+    if not counts:
+        return
+    rows = [
+        {"event_id": event_id, "day": day, "likes": 0, "views": 0, column: n}
+        for (event_id, day), n in counts.items()
+    ]
+    for start in range(0, len(rows), 1000):
+        stmt = dialect_insert(db, models.EventDailyStat).values(rows[start:start + 1000])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["event_id", "day"],
+            set_={column: getattr(models.EventDailyStat, column) + getattr(stmt.excluded, column)},
+        )
+        db.execute(stmt)
+
+
+def rollup_rows(db, raw_model, column: str, criteria, limit: Optional[int] = None) -> int:
+    """
+    Fold raw rows matching criteria into daily counts and delete them, without
+    committing. With a limit only that many rows are taken (and deleted by id);
+    without one everything matching goes. Returns how many raw rows were folded.
+    """
+    query = select(raw_model.id, raw_model.event_id, raw_model.created_at).where(criteria)
+    if limit:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+
+    counts = Counter((row.event_id, row.created_at.date()) for row in rows)
+    _add_daily_counts(db, counts, column)
+    if limit:
+        db.execute(delete(raw_model).where(raw_model.id.in_([row.id for row in rows])))
+    else:
+        db.execute(delete(raw_model).where(criteria))
+    return len(rows)
+
+
+def drop_view_sketches(db, criteria):
+    """View sketches (VIEW_COUNTING=hll) only serve dedup too; archived events don't need them."""
+    db.execute(delete(models.EventViewSketch).where(criteria))
+
+
+def rollup_events(db, event_ids: list[str]) -> int:
+    """Fold all raw likes/views of these events (used right before archiving them)."""
+    if not event_ids:
+        return 0
+    drop_view_sketches(db, models.EventViewSketch.event_id.in_(event_ids))
+    return sum(
+        rollup_rows(db, raw_model, column, raw_model.event_id.in_(event_ids))
+        for raw_model, column in RAW_TABLES
+    )
+
+
+def rollup_batch(db, batch_size: int = STATS_ROLLUP_BATCH_SIZE, today: Optional[datetime.date] = None) -> int:
+    """Fold up to batch_size raw views of events past the horizon, and commit."""
+    past_events = select(models.Event.id).where(models.Event.date < rollup_horizon(today))
+    folded = 0
+    for raw_model, column in ROLLUP_TABLES:
+        folded += rollup_rows(db, raw_model, column, raw_model.event_id.in_(past_events), limit=batch_size)
+    db.commit()
+    return folded
+
+
+def rollup_all(db, batch_size: int = STATS_ROLLUP_BATCH_SIZE) -> int:
+    total = 0
+    while True:
+        folded = rollup_batch(db, batch_size)
+        total += folded
+        if folded == 0:
+            break
+    if total:
+        logger.info(f"Rolled up {total} raw like/view rows")
+    return total
+
+
+def delete_event_stats(db, event_ids: list[str]):
+    """Drop the daily stats of deleted events; event_daily_stats has no FK to cascade from."""
+    if event_ids:
+        db.execute(delete(models.EventDailyStat).where(models.EventDailyStat.event_id.in_(event_ids)))
+
+
+def daily_stats(db, event_id: str) -> list[dict]:
+    """Likes and views per day for one event: rolled-up days plus raw rows not folded yet."""
+    per_day: dict[datetime.date, dict] = {}
+
+    for row in db.execute(
+        select(models.EventDailyStat).where(models.EventDailyStat.event_id == event_id)
+    ).scalars():
+        per_day[row.day] = {"day": row.day, "likes": row.likes, "views": row.views}
+
+    for raw_model, column in RAW_TABLES:
+        day = func.date(raw_model.created_at)
+        for raw_day, n in db.execute(
+            select(day, func.count()).where(raw_model.event_id == event_id).group_by(day)
+        ).all():
+            raw_day = raw_day if isinstance(raw_day, datetime.date) else datetime.date.fromisoformat(raw_day)
+            entry = per_day.setdefault(raw_day, {"day": raw_day, "likes": 0, "views": 0})
+            entry[column] += n
+
+    return [per_day[d] for d in sorted(per_day)]
+
+
+def _rollup() -> bool:
+    db = SessionLocal()
+    try:
+        folded = rollup_batch(db)
+        if folded:
+            logger.info(f"Rolled up {folded} raw like/view rows")
+        # a full batch means there is probably more
+        return folded >= STATS_ROLLUP_BATCH_SIZE
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+worker = PeriodicTask("stats-rollup", _rollup, STATS_ROLLUP_INTERVAL)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Fold raw views of past events into daily stats.")
+    parser.add_argument("--batch-size", type=int, default=STATS_ROLLUP_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Rolled up {rollup_all(db, args.batch_size)} raw rows")
+    finally:
+        db.close()
@@ -1,23 +1,38 @@
 import io
 import os
+import json
+import asyncio
+import hashlib
 import logging
-from typing import Optional
+import datetime
+import tempfile
+import itertools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
 
-import requests
 from PIL import Image
 from dotenv import load_dotenv
 
+from storage_client import StorageClient, StorageError, get_storage_client
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
-STORAGE_BUCKET = os.getenv("STORAGE_BUCKET", "event-images")
+# "supabase" (default) or "local"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "media")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "http://localhost:4444/media")
 
 MAX_IMAGE_WIDTH = 1920
 IMAGE_QUALITY = 85
 
+CLEANUP_PAGE_SIZE = 1000
+CLEANUP_DELETE_BATCH = 100
+CLEANUP_CONCURRENCY = 4
+CLEANUP_JOB_RETENTION_DAYS = int(os.getenv("CLEANUP_JOB_RETENTION_DAYS", "7"))
+
 
 def compress_image(content: bytes, max_width: int = MAX_IMAGE_WIDTH, quality: int = IMAGE_QUALITY) -> tuple[bytes, str]:
     """Compress and resize image to WebP format. Returns (bytes, extension)."""
@@ -40,108 +55,382 @@ def compress_image(content: bytes, max_width: int = MAX_IMAGE_WIDTH, quality: in
     return buffer.getvalue(), "webp"
 
 
-def upload_to_supabase(file_bytes: bytes, filename: str, content_type: str) -> str:
-    """Upload file to Supabase Storage and return public URL."""
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+class StorageBackend(ABC):
+    """
+    Where uploaded images live. Implementations work with object names (the part of
+    the public URL after the backend's prefix) and must be safe to call from threads.
+    """
 
-    url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{filename}"
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Content-Type": content_type,
-        "x-upsert": "true",
-    }
+    name = "base"
 
-    response = requests.post(url, headers=headers, data=file_bytes, timeout=30)
+    @property
+    def is_configured(self) -> bool:
+        return True
 
-    if response.status_code not in (200, 201):
-        logger.error(f"Supabase Storage upload failed: {response.text}")
-        raise Exception(f"Storage upload failed with status {response.status_code}")
+    @abstractmethod
+    def upload(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        """Store an object and return its public URL."""
 
-    return f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/{filename}"
+    @abstractmethod
+    def delete(self, filenames: list[str]) -> bool:
+        """Delete objects by name."""
 
+    @abstractmethod
+    def list_objects(self, prefix: str = "", limit: int = 1000, offset: int = 0) -> list[dict]:
+        """One page of objects sorted by name, as [{"name": ..., "id": ...}]."""
 
-def delete_from_supabase(file_url: str) -> bool:
-    """Delete file from Supabase Storage given its public URL."""
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+    @abstractmethod
+    def public_url(self, filename: str) -> str:
+        """Public URL of an object."""
+
+    @abstractmethod
+    def filename_from_url(self, file_url: str) -> Optional[str]:
+        """Object name for one of our public URLs, or None for foreign URLs."""
+
+    def iter_objects(self, prefix: str = "", page_size: int = CLEANUP_PAGE_SIZE) -> Iterator[str]:
+        """Every object name, sorted, fetched one list_objects page at a time."""
+        offset = 0
+        while True:
+            page = self.list_objects(prefix, page_size, offset)
+            for f in page:
+                # folder placeholders come back without an id
+                if f.get("name") and f.get("id") is not None:
+                    yield f["name"]
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+    async def upload_async(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        return await asyncio.to_thread(self.upload, file_bytes, filename, content_type)
+
+    async def delete_async(self, filenames: list[str]) -> bool:
+        return await asyncio.to_thread(self.delete, filenames)
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage bucket, accessed through the pooled StorageClient."""
+
+    name = "supabase"
+
+    def __init__(self, client: Optional[StorageClient] = None):
+        self.client = client or get_storage_client()
+
+    @property
+    def is_configured(self) -> bool:
+        return self.client.is_configured
+
+    def upload(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        if not self.is_configured:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+        return self.client.upload(file_bytes, filename, content_type)
+
+    def delete(self, filenames: list[str]) -> bool:
+        return self.client.delete(filenames)
+
+    def list_objects(self, prefix: str = "", limit: int = 1000, offset: int = 0) -> list[dict]:
+        return self.client.list_objects(prefix, limit, offset)
+
+    def public_url(self, filename: str) -> str:
+        return self.client.public_url(filename)
+
+    def filename_from_url(self, file_url: str) -> Optional[str]:
+        return self.client.filename_from_url(file_url)
+
+    async def upload_async(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        if not self.is_configured:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+        return await self.client.upload_async(file_bytes, filename, content_type)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Images on local disk, served by the app (see ImmutableStaticFiles in main.py) or
+    by nginx straight from LOCAL_STORAGE_DIR with sendfile.
+
+    Files are sharded two levels deep by a hash of the name (ab/cd/<name>) so no
+    directory grows huge, and written to a temp file + os.replace so readers never
+    see a partial image. Names are random and never reused, so they can be cached
+    forever.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_DIR, base_url: str = LOCAL_STORAGE_URL):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    @staticmethod
+    def shard_path(filename: str) -> str:
+        digest = hashlib.sha1(filename.encode()).hexdigest()
+        return f"{digest[:2]}/{digest[2:4]}/{filename}"
+
+    def _full_path(self, name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage path: {name}")
+        return path
+
+    def upload(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        name = self.shard_path(filename)
+        path = self._full_path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(file_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return self.public_url(name)
+
+    def delete(self, filenames: list[str]) -> bool:
+        ok = True
+        for name in filenames:
+            try:
+                os.unlink(self._full_path(name))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to delete local file {name}: {e}")
+                ok = False
+        return ok
+
+    def _walk(self, directory: str, rel: str, prefix: str) -> Iterator[str]:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        # sort as full names would sort: a directory "ab" holds names starting "ab/"
+        entries.sort(key=lambda e: e.name + "/" if e.is_dir() else e.name)
+        for entry in entries:
+            name = f"{rel}{entry.name}"
+            if entry.is_dir():
+                # only descend where names can still match the prefix
+                if name.startswith(prefix) or prefix.startswith(name + "/"):
+                    yield from self._walk(entry.path, name + "/", prefix)
+            elif not entry.name.startswith(".upload-") and name.startswith(prefix):
+                yield name
+
+    def iter_objects(self, prefix: str = "", page_size: int = CLEANUP_PAGE_SIZE) -> Iterator[str]:
+        """Every object name, sorted, from a single walk of the tree."""
+        return self._walk(self.root, "", prefix)
+
+    def list_objects(self, prefix: str = "", limit: int = 1000, offset: int = 0) -> list[dict]:
+        names = itertools.islice(self.iter_objects(prefix), offset, offset + limit)
+        return [{"name": n, "id": n} for n in names]
+
+    def public_url(self, filename: str) -> str:
+        return f"{self.base_url}/{filename}"
+
+    def filename_from_url(self, file_url: str) -> Optional[str]:
+        prefix = f"{self.base_url}/"
+        if not file_url or not file_url.startswith(prefix):
+            return None
+        return file_url[len(prefix):]
+
+
+_backend: Optional[StorageBackend] = None
+
+
+def get_backend() -> StorageBackend:
+    """The storage backend selected by STORAGE_BACKEND ("supabase" or "local")."""
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "local":
+            _backend = LocalStorage()
+        elif STORAGE_BACKEND == "supabase":
+            _backend = SupabaseStorage()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _backend
+
+
+def upload_file(file_bytes: bytes, filename: str, content_type: str) -> str:
+    """Upload file to the configured storage backend and return public URL."""
+    return get_backend().upload(file_bytes, filename, content_type)
+
+
+async def upload_file_async(file_bytes: bytes, filename: str, content_type: str) -> str:
+    """Non-blocking upload_file for use inside async endpoints."""
+    return await get_backend().upload_async(file_bytes, filename, content_type)
+
+
+def delete_file(file_url: str) -> bool:
+    """Delete file from the configured storage backend given its public URL."""
+    backend = get_backend()
+    if not backend.is_configured:
         return False
 
-    # Extract filename from public URL
-    prefix = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/"
-    if not file_url.startswith(prefix):
-        logger.info(f"Not a Supabase Storage URL, skipping: {file_url}")
+    filename = backend.filename_from_url(file_url)
+    if filename is None:
+        logger.info(f"Not a {backend.name} storage URL, skipping: {file_url}")
         return False
 
-    filename = file_url[len(prefix):]
+    return backend.delete([filename])
 
-    url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}"
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Content-Type": "application/json",
-    }
 
-    response = requests.delete(url, headers=headers, json={"prefixes": [filename]}, timeout=10)
-
-    if response.status_code in (200, 201):
-        logger.info(f"Deleted from Supabase Storage: {filename}")
-        return True
-
-    logger.error(f"Failed to delete from storage: {response.text}")
-    return False
+async def delete_file_async(file_url: str) -> bool:
+    """Non-blocking delete_file for use inside async endpoints."""
+    return await asyncio.to_thread(delete_file, file_url)
 
 
 def list_storage_files(prefix: str = "", limit: int = 1000, offset: int = 0) -> list[dict]:
-    """List files in the Supabase Storage bucket."""
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+    """List files in the storage bucket."""
+    backend = get_backend()
+    if not backend.is_configured:
         return []
 
-    url = f"{SUPABASE_URL}/storage/v1/object/list/{STORAGE_BUCKET}"
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Content-Type": "application/json",
-    }
-    body = {"prefix": prefix, "limit": limit, "offset": offset}
-
-    response = requests.post(url, headers=headers, json=body, timeout=30)
-    if response.status_code == 200:
-        return response.json()
-    logger.error(f"Failed to list storage files: {response.text}")
-    return []
-
-
-def cleanup_orphaned_images(db_session) -> dict:
-    """Delete images from storage that aren't referenced by any event, announcement, or user."""
-    from models import Event, Announcement, User
+    try:
+        return backend.list_objects(prefix, limit, offset)
+    except StorageError:
+        return []
 
-    # Collect all referenced image URLs from the database
-    referenced_urls = set()
 
-    for url, in db_session.query(Event.cover_image).filter(Event.cover_image.isnot(None)).all():
-        referenced_urls.add(url)
-    for url, in db_session.query(Announcement.cover_image).filter(Announcement.cover_image.isnot(None)).all():
-        referenced_urls.add(url)
-    for url, in db_session.query(User.logo_url).filter(User.logo_url.isnot(None)).all():
-        referenced_urls.add(url)
+def iter_storage_files(prefix: str = "", page_size: int = CLEANUP_PAGE_SIZE) -> Iterator[str]:
+    """Yield every object name in the bucket."""
+    backend = get_backend()
+    if not backend.is_configured:
+        return
+    yield from backend.iter_objects(prefix, page_size)
+
+
+def referenced_filenames(db_session, filenames: list[str]) -> set[str]:
+    """Which of these object names are referenced from the database (one indexed IN query per column)."""
+    from sqlalchemy import select
+    from models import Event, EventArchive, Announcement, AnnouncementArchive, User
+
+    backend = get_backend()
+    by_url = {backend.public_url(name): name for name in filenames}
+    columns = (
+        Event.cover_image,
+        EventArchive.cover_image,
+        Announcement.cover_image,
+        AnnouncementArchive.cover_image,  # archived rows keep their covers
+        User.logo_url,
+        User.banner_url,
+    )
+
+    found = set()
+    for column in columns:
+        found.update(db_session.execute(select(column).where(column.in_(list(by_url)))).scalars())
+    return {by_url[url] for url in found}
+
+
+def cleanup_orphaned_images(
+    db_session,
+    dry_run: bool = False,
+    page_size: int = CLEANUP_PAGE_SIZE,
+    batch_size: int = CLEANUP_DELETE_BATCH,
+    concurrency: int = CLEANUP_CONCURRENCY,
+) -> dict:
+    """
+    Delete images from storage that aren't referenced by any event, announcement, or user.
+
+    References are looked up per listing page (referenced_filenames) rather than
+    streamed from the tables with yield_per: the URL columns are indexed, so each page
+    costs a few index probes, and memory stays bounded by the page however many rows
+    reference images.
+    """
+    backend = get_backend()
+
+    # Check references one listing page at a time, and list the whole bucket before
+    # deleting anything, otherwise the offsets shift under us
+    total_in_storage = 0
+    orphans = []
+    page = []
+    for filename in iter_storage_files(page_size=page_size):
+        total_in_storage += 1
+        page.append(filename)
+        if len(page) == page_size:
+            in_use = referenced_filenames(db_session, page)
+            orphans.extend(name for name in page if name not in in_use)
+            page = []
+    if page:
+        in_use = referenced_filenames(db_session, page)
+        orphans.extend(name for name in page if name not in in_use)
+    db_session.rollback()  # don't hold the read transaction open while deleting
 
-    # Extract just the filenames from referenced URLs
-    public_prefix = f"{SUPABASE_URL}/storage/v1/object/public/{STORAGE_BUCKET}/"
-    referenced_filenames = set()
-    for url in referenced_urls:
-        if url.startswith(public_prefix):
-            referenced_filenames.add(url[len(public_prefix):])
+    deleted = 0
+    if not dry_run and orphans:
+        batches = [orphans[i:i + batch_size] for i in range(0, len(orphans), batch_size)]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for batch, ok in zip(batches, pool.map(backend.delete, batches)):
+                if ok:
+                    deleted += len(batch)
+
+    logger.info(
+        f"Storage cleanup{' (dry run)' if dry_run else ''}: {deleted}/{len(orphans)} orphaned images deleted, "
+        f"{total_in_storage - len(orphans)} in use"
+    )
+    return {
+        "total_in_storage": total_in_storage,
+        "orphans_found": len(orphans),
+        "deleted": deleted,
+        "dry_run": dry_run,
+    }
 
-    # List all files in storage
-    storage_files = list_storage_files()
-    filenames_in_storage = [f["name"] for f in storage_files if f.get("name")]
 
-    # Find orphans
-    orphans = [f for f in filenames_in_storage if f not in referenced_filenames]
+def create_cleanup_job(db_session, dry_run: bool = False) -> str:
+    """Record a queued cleanup job, and drop jobs older than CLEANUP_JOB_RETENTION_DAYS."""
+    from sqlalchemy import delete
+    from models import CleanupJob
+
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=CLEANUP_JOB_RETENTION_DAYS)
+    db_session.execute(delete(CleanupJob).where(CleanupJob.created_at < cutoff))
+    job = CleanupJob(dry_run=dry_run)
+    db_session.add(job)
+    db_session.commit()
+    return job.id
+
+
+def get_cleanup_job(db_session, job_id: str) -> Optional[dict]:
+    from models import CleanupJob
+
+    job = db_session.get(CleanupJob, job_id)
+    if job is None:
+        return None
+    return {
+        "id": job.id,
+        "status": job.status.value,
+        "dry_run": job.dry_run,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
 
-    deleted = 0
-    for filename in orphans:
-        full_url = f"{public_prefix}{filename}"
-        if delete_from_supabase(full_url):
-            deleted += 1
 
-    logger.info(f"Storage cleanup: {deleted}/{len(orphans)} orphaned images deleted, {len(filenames_in_storage) - len(orphans)} in use")
-    return {"total_in_storage": len(filenames_in_storage), "orphans_found": len(orphans), "deleted": deleted}
+def run_cleanup_job(job_id: str):
+    """Run a queued cleanup job with its own DB session (meant for BackgroundTasks)."""
+    from database import SessionLocal
+    from models import CleanupJob, JobStatus
+
+    db = SessionLocal()
+    try:
+        job = db.get(CleanupJob, job_id)
+        if job is None:
+            logger.warning(f"Storage cleanup job {job_id} not found, skipping")
+            return
+        job.status = JobStatus.RUNNING
+        db.commit()
+        try:
+            result = cleanup_orphaned_images(db, dry_run=job.dry_run)
+            job.result = json.dumps(result)
+            job.status = JobStatus.DONE
+        except Exception as e:
+            logger.error(f"Storage cleanup job {job_id} failed: {e}")
+            db.rollback()
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        job.finished_at = datetime.datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,187 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
+STORAGE_BUCKET = os.getenv("STORAGE_BUCKET", "event-images")
+
+STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "10"))
+STORAGE_MAX_RETRIES = int(os.getenv("STORAGE_MAX_RETRIES", "3"))
+STORAGE_RETRY_BACKOFF = float(os.getenv("STORAGE_RETRY_BACKOFF", "0.5"))
+
+# (connect, read) timeouts in seconds, per operation
+DEFAULT_TIMEOUTS = {
+    "upload": (3.05, 30),
+    "delete": (3.05, 10),
+    "list": (3.05, 30),
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class StorageError(Exception):
+    """Raised when the storage API returns an unexpected response."""
+
+    def __init__(self, operation: str, status_code: int, body: str = ""):
+        super().__init__(f"Storage {operation} failed with status {status_code}")
+        self.operation = operation
+        self.status_code = status_code
+        self.body = body
+
+
+class StorageClient:
+    """
+    Supabase Storage client backed by one keep-alive connection pool.
+
+    All calls share a single requests.Session, so TCP/TLS handshakes are paid once
+    per pooled connection instead of once per call. Transient failures (connection
+    errors, 429 and 5xx) are retried with exponential backoff. Every blocking method
+    has an async twin that runs it in a worker thread, so endpoints don't block the
+    event loop while waiting on the network.
+
+    base_url/service_key/bucket default to the env config, and can be pointed at a
+    local stand-in server that mimics the /storage/v1 endpoints.
+    """
+
+    def __init__(
+        self,
+        base_url: str = SUPABASE_URL,
+        service_key: str = SUPABASE_SERVICE_KEY,
+        bucket: str = STORAGE_BUCKET,
+        pool_size: int = STORAGE_POOL_SIZE,
+        max_retries: int = STORAGE_MAX_RETRIES,
+        backoff_factor: float = STORAGE_RETRY_BACKOFF,
+        timeouts: Optional[dict] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.service_key = service_key
+        self.bucket = bucket
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            # uploads use x-upsert and deletes are by name, so every call is safe to repeat
+            allowed_methods=frozenset({"GET", "POST", "DELETE"}),
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+        })
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.base_url and self.service_key)
+
+    @property
+    def public_prefix(self) -> str:
+        return f"{self.base_url}/storage/v1/object/public/{self.bucket}/"
+
+    def public_url(self, filename: str) -> str:
+        return f"{self.public_prefix}{filename}"
+
+    def filename_from_url(self, file_url: str) -> Optional[str]:
+        """Return the object name for one of our public URLs, or None for foreign URLs."""
+        if not file_url or not file_url.startswith(self.public_prefix):
+            return None
+        return file_url[len(self.public_prefix):]
+
+    # --- blocking API ---
+
+    def upload(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        """Upload an object and return its public URL."""
+        url = f"{self.base_url}/storage/v1/object/{self.bucket}/{filename}"
+        headers = {"Content-Type": content_type, "x-upsert": "true"}
+
+        response = self.session.post(url, headers=headers, data=file_bytes, timeout=self.timeouts["upload"])
+        if response.status_code not in (200, 201):
+            logger.error(f"Supabase Storage upload failed: {response.text}")
+            raise StorageError("upload", response.status_code, response.text)
+
+        return self.public_url(filename)
+
+    def delete(self, filenames: list[str]) -> bool:
+        """Delete objects by name. One request covers the whole list. False if it failed, even after retries."""
+        if not filenames:
+            return True
+
+        url = f"{self.base_url}/storage/v1/object/{self.bucket}"
+        try:
+            response = self.session.delete(url, json={"prefixes": filenames}, timeout=self.timeouts["delete"])
+        except requests.RequestException as e:
+            logger.error(f"Failed to delete from storage: {e}")
+            return False
+
+        if response.status_code in (200, 201):
+            logger.info(f"Deleted {len(filenames)} object(s) from Supabase Storage")
+            return True
+
+        logger.error(f"Failed to delete from storage: {response.text}")
+        return False
+
+    def list_objects(self, prefix: str = "", limit: int = 1000, offset: int = 0) -> list[dict]:
+        """List one page of objects in the bucket, sorted by name."""
+        url = f"{self.base_url}/storage/v1/object/list/{self.bucket}"
+        body = {
+            "prefix": prefix,
+            "limit": limit,
+            "offset": offset,
+            "sortBy": {"column": "name", "order": "asc"},
+        }
+
+        response = self.session.post(url, json=body, timeout=self.timeouts["list"])
+        if response.status_code != 200:
+            logger.error(f"Failed to list storage files: {response.text}")
+            raise StorageError("list", response.status_code, response.text)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+    # --- async API ---
+
+    async def upload_async(self, file_bytes: bytes, filename: str, content_type: str) -> str:
+        return await asyncio.to_thread(self.upload, file_bytes, filename, content_type)
+
+    async def delete_async(self, filenames: list[str]) -> bool:
+        return await asyncio.to_thread(self.delete, filenames)
+
+    async def list_objects_async(self, prefix: str = "", limit: int = 1000, offset: int = 0) -> list[dict]:
+        return await asyncio.to_thread(self.list_objects, prefix, limit, offset)
+
+
+_client: Optional[StorageClient] = None
+_client_lock = threading.Lock()
+
+
+def get_storage_client() -> StorageClient:
+    """Process-wide client, created on first use so the pool is shared by every caller."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = StorageClient()
+    return _client
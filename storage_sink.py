@@ -0,0 +1,178 @@
+"""
+Minimal in-process stand-in for the Supabase Storage API, for tests and dry runs.
+
+Implements the /storage/v1 endpoints StorageClient uses: upload (POST object),
+delete (DELETE with {"prefixes": [...]}), list (POST object/list) and public GETs.
+Objects live in memory. Speaks HTTP/1.1 keep-alive, so connection reuse shows up in
+the connection counter, and can inject failures: statuses to answer with before
+handling a request normally (fail_with), and a delay before every response.
+
+    with StorageSink() as sink:
+        client = StorageClient(sink.url, sink.service_key)
+        ...
+        print(sink.requests, sink.connections)
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "/storage/v1/object/"
+
+
+class _StorageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.sink.lock:
+            self.server.sink.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _prepare(self) -> bool:
+        """Count the request, apply delay and injected failures. False if already answered."""
+        sink = self.server.sink
+        body = self._body()  # always drain the body so the connection stays usable
+        with sink.lock:
+            sink.requests += 1
+            status = sink.fail_with.pop(0) if sink.fail_with else None
+        if sink.delay:
+            time.sleep(sink.delay)
+        if status is not None:
+            self._reply(status, {"error": "injected failure"})
+            return False
+        if not self.path.startswith(f"{PREFIX}public/") and self.headers.get("Authorization") != f"Bearer {sink.service_key}":
+            self._reply(401, {"error": "unauthorized"})
+            return False
+        self.request_body = body
+        return True
+
+    def do_POST(self):
+        if not self._prepare():
+            return
+        sink = self.server.sink
+        path = self.path[len(PREFIX):] if self.path.startswith(PREFIX) else ""
+
+        if path.startswith(f"list/{sink.bucket}"):
+            query = json.loads(self.request_body or b"{}")
+            prefix = query.get("prefix", "")
+            offset, limit = int(query.get("offset", 0)), int(query.get("limit", 100))
+            with sink.lock:
+                names = sorted(n for n in sink.objects if n.startswith(prefix))
+            self._reply(200, [{"name": n} for n in names[offset:offset + limit]])
+        elif path.startswith(f"{sink.bucket}/"):
+            name = path[len(sink.bucket) + 1:]
+            with sink.lock:
+                if name in sink.objects and self.headers.get("x-upsert") != "true":
+                    self._reply(409, {"error": "Duplicate"})
+                    return
+                sink.objects[name] = (self.request_body, self.headers.get("Content-Type", ""))
+            self._reply(200, {"Key": f"{sink.bucket}/{name}"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        if not self._prepare():
+            return
+        sink = self.server.sink
+        if self.path != f"{PREFIX}{sink.bucket}":
+            self._reply(404, {"error": "not found"})
+            return
+        names = json.loads(self.request_body or b"{}").get("prefixes", [])
+        with sink.lock:
+            deleted = [{"name": n} for n in names if sink.objects.pop(n, None) is not None]
+        self._reply(200, deleted)
+
+    def do_GET(self):
+        if not self._prepare():
+            return
+        sink = self.server.sink
+        public = f"{PREFIX}public/{sink.bucket}/"
+        with sink.lock:
+            obj = sink.objects.get(self.path[len(public):]) if self.path.startswith(public) else None
+        if obj is None:
+            self._reply(404, {"error": "not found"})
+        else:
+            self._reply(200, obj[0], obj[1])
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # clients that time out hang up before the (delayed) reply; that's expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StorageSink:
+    """Threaded fake storage server counting requests and connections."""
+
+    def __init__(self, host="127.0.0.1", port=0, bucket="event-images", service_key="test-key"):
+        self.lock = threading.Lock()
+        self.bucket = bucket
+        self.service_key = service_key
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self.requests = 0
+        self.connections = 0
+        self.fail_with: list[int] = []  # statuses for the next requests, one each
+        self.delay = 0.0
+        self._server = _Server((host, port), _StorageHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="storage-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local stand-in for Supabase Storage")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--bucket", default="event-images")
+    parser.add_argument("--service-key", default="test-key")
+    args = parser.parse_args()
+
+    with StorageSink(args.host, args.port, args.bucket, args.service_key) as sink:
+        print(f"Storage sink listening on {sink.url} (SUPABASE_URL={sink.url}, Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{len(sink.objects)} objects, {sink.requests} requests over {sink.connections} connections")
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,405 @@
+"""
+Set-based writes for digest subscriptions.
+
+Writes are set-based: one INSERT ... ON CONFLICT or UPDATE per table, however many
+rows it touches, so a subscriber picking 20 clubs costs the same round trips as one
+picking a single club. The write helpers never commit; callers own the transaction,
+except import_csv, which commits once per batch.
+"""
+
+import io
+import re
+import csv
+import json
+import secrets
+import datetime
+from typing import Iterable, Iterator, Optional
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, selectinload
+
+from database import SessionLocal, dialect_insert
+import models
+
+# Rows per INSERT statement, well under the bind-parameter limits of SQLite and Postgres
+UPSERT_CHUNK_SIZE = 1000
+
+
+def parse_category(value: str) -> Optional[models.AnnouncementCategory]:
+    """Category enum for a value like "workshop", or None if unknown."""
+    try:
+        return models.AnnouncementCategory(value.strip().lower())
+    except ValueError:
+        return None
+
+
+def upsert_subscription(db: Session, email: str) -> str:
+    """Create the subscription for email, or reactivate the existing one. Returns its id."""
+    stmt = dialect_insert(db, models.Subscription).values(
+        id=models.generate_uuid(),
+        email=email,
+        token=secrets.token_urlsafe(32),
+        is_active=True,
+        created_at=datetime.datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Subscription.email],
+        set_={"is_active": True},
+    ).returning(models.Subscription.id)
+    return db.execute(stmt).scalar_one()
+
+
+def _chunks(rows: list, size: int = UPSERT_CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def upsert_club_pairs(db: Session, pairs: Iterable[tuple[str, str]]):
+    """Subscribe each (subscription_id, club_id) pair, reactivating rows that were turned off."""
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "id": models.generate_uuid(),
+            "subscription_id": subscription_id,
+            "club_id": club_id,
+            "token": secrets.token_urlsafe(32),
+            "is_active": True,
+            "created_at": now,
+        }
+        for subscription_id, club_id in dict.fromkeys(pairs)
+    ]
+    for chunk in _chunks(rows):
+        stmt = dialect_insert(db, models.ClubSubscription).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.ClubSubscription.subscription_id, models.ClubSubscription.club_id],
+            set_={"is_active": True},
+        )
+        db.execute(stmt)
+
+
+def upsert_category_pairs(db: Session, pairs: Iterable[tuple[str, models.AnnouncementCategory]]):
+    """Subscribe each (subscription_id, category) pair, reactivating rows that were turned off."""
+    now = datetime.datetime.utcnow()
+    rows = [
+        {
+            "id": models.generate_uuid(),
+            "subscription_id": subscription_id,
+            "category": category,
+            "is_active": True,
+            "created_at": now,
+        }
+        for subscription_id, category in dict.fromkeys(pairs)
+    ]
+    for chunk in _chunks(rows):
+        stmt = dialect_insert(db, models.CategorySubscription).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.CategorySubscription.subscription_id, models.CategorySubscription.category],
+            set_={"is_active": True},
+        )
+        db.execute(stmt)
+
+
+def upsert_club_subscriptions(db: Session, subscription_id: str, club_ids: Iterable[str]):
+    """Subscribe to every club in club_ids, reactivating rows that were turned off."""
+    upsert_club_pairs(db, [(subscription_id, club_id) for club_id in club_ids])
+
+
+def upsert_category_subscriptions(
+    db: Session, subscription_id: str, categories: Iterable[models.AnnouncementCategory]
+):
+    """Subscribe to every category, reactivating rows that were turned off."""
+    upsert_category_pairs(db, [(subscription_id, category) for category in categories])
+
+
+def deactivate_by_token(db: Session, token: str) -> Optional[str]:
+    """
+    Turn off the subscription with this master token and all of its club subscriptions.
+    Returns the subscription id, or None if the token is unknown.
+    """
+    subscription_id = db.execute(
+        update(models.Subscription)
+        .where(models.Subscription.token == token)
+        .values(is_active=False)
+        .returning(models.Subscription.id)
+    ).scalar()
+    if subscription_id is None:
+        return None
+
+    db.execute(
+        update(models.ClubSubscription)
+        .where(models.ClubSubscription.subscription_id == subscription_id)
+        .values(is_active=False)
+    )
+    return subscription_id
+
+
+def deactivate_club_by_token(db: Session, token: str) -> bool:
+    """Turn off the single club subscription with this per-club token."""
+    result = db.execute(
+        update(models.ClubSubscription)
+        .where(models.ClubSubscription.token == token)
+        .values(is_active=False)
+    )
+    return result.rowcount > 0
+
+
+def load_subscription(db: Session, subscription_id: str) -> models.Subscription:
+    """Subscription with its club (and club name) and category preferences loaded."""
+    return db.execute(
+        select(models.Subscription)
+        .where(models.Subscription.id == subscription_id)
+        .options(
+            selectinload(models.Subscription.club_subscriptions).joinedload(models.ClubSubscription.club),
+            selectinload(models.Subscription.category_subscriptions),
+        )
+        .execution_options(populate_existing=True)
+    ).scalar_one()
+
+
+# --- bulk import ---
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+_email_adapter = TypeAdapter(EmailStr)
+
+
+def split_list(value: Optional[str]) -> list[str]:
+    """Split a CSV cell like "a;b", "a|b" or "a, b" into its non-empty items."""
+    return [item for item in re.split(r"[;,|\s]+", value or "") if item]
+
+
+def new_import_result() -> dict:
+    return {"rows": 0, "created": 0, "reactivated": 0, "unchanged": 0, "invalid": 0, "failed": 0, "errors": []}
+
+
+def _add_error(result: dict, line: int, error: str):
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append({"line": line, "error": error})
+
+
+def parse_import_row(row: dict, known_club_ids: set[str]):
+    """Validate one CSV row. Returns ((email, club_ids, categories), None) or (None, error)."""
+    try:
+        email = _email_adapter.validate_python((row.get("email") or "").strip())
+    except ValidationError:
+        return None, "invalid email"
+
+    club_ids = split_list(row.get("club_ids"))
+    for club_id in club_ids:
+        if club_id not in known_club_ids:
+            return None, f"unknown club id: {club_id}"
+
+    categories = []
+    for value in split_list(row.get("categories")):
+        category = parse_category(value)
+        if category is None:
+            return None, f"unknown category: {value}"
+        categories.append(category)
+
+    return (email, club_ids, categories), None
+
+
+def import_batch(db: Session, batch: list[tuple], result: dict):
+    """Upsert one batch of parsed rows (line, email, club_ids, categories) and commit it."""
+    # the same email twice in one statement would hit ON CONFLICT twice, so merge first
+    merged: dict[str, tuple[dict, dict]] = {}
+    for _, email, club_ids, categories in batch:
+        clubs, cats = merged.setdefault(email, ({}, {}))
+        clubs.update(dict.fromkeys(club_ids))
+        cats.update(dict.fromkeys(categories))
+
+    try:
+        existing = dict(db.execute(
+            select(models.Subscription.email, models.Subscription.is_active)
+            .where(models.Subscription.email.in_(list(merged)))
+        ).all())
+
+        now = datetime.datetime.utcnow()
+        rows = [
+            {
+                "id": models.generate_uuid(),
+                "email": email,
+                "token": secrets.token_urlsafe(32),
+                "is_active": True,
+                "created_at": now,
+            }
+            for email in merged
+        ]
+        ids = {}
+        for chunk in _chunks(rows):
+            stmt = dialect_insert(db, models.Subscription).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[models.Subscription.email],
+                set_={"is_active": True},
+            ).returning(models.Subscription.email, models.Subscription.id)
+            ids.update(db.execute(stmt).all())
+
+        upsert_club_pairs(db, [(ids[email], c) for email, (clubs, _) in merged.items() for c in clubs])
+        upsert_category_pairs(db, [(ids[email], c) for email, (_, cats) in merged.items() for c in cats])
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        result["failed"] += len(batch)
+        _add_error(result, batch[0][0], f"batch of {len(batch)} rows failed: {e}")
+        return
+
+    for email in merged:
+        if email not in existing:
+            result["created"] += 1
+        elif not existing[email]:
+            result["reactivated"] += 1
+        else:
+            result["unchanged"] += 1
+    result["unchanged"] += len(batch) - len(merged)
+
+
+def import_csv(db: Session, lines: Iterable[str], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Stream a CSV with an email column and optional club_ids and categories columns
+    (lists separated by ";", "|", "," or spaces) into subscriptions.
+
+    Rows are validated as they are read and upserted batch_size at a time, one
+    transaction per batch, so only one batch is ever in memory. Existing subscribers
+    are reactivated and gain the listed preferences; nothing is removed.
+    Raises ValueError if there is no email column.
+    """
+    result = new_import_result()
+    known_club_ids = set(db.execute(select(models.User.id).where(models.User.role == "club")).scalars())
+
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return result
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    if "email" not in reader.fieldnames:
+        raise ValueError("CSV must have an email column")
+
+    batch = []
+    for row in reader:
+        result["rows"] += 1
+        parsed, error = parse_import_row(row, known_club_ids)
+        if error:
+            result["invalid"] += 1
+            _add_error(result, reader.line_num, error)
+            continue
+
+        batch.append((reader.line_num, *parsed))
+        if len(batch) >= batch_size:
+            import_batch(db, batch, result)
+            batch = []
+
+    if batch:
+        import_batch(db, batch, result)
+    return result
+
+
+# --- export ---
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_FIELDS = ["id", "email", "is_active", "created_at", "club_ids", "clubs", "categories"]
+
+
+def iter_export_rows(db: Session, include_inactive: bool = False, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yield every subscription as a plain dict with its active preferences.
+
+    Rows come from a server-side cursor chunk_size at a time, each chunk with its
+    preferences loaded by one selectin query per relationship. Club names come from
+    one lookup up front instead of a join per row.
+    """
+    club_names = dict(db.execute(select(models.User.id, models.User.club_name)).all())
+
+    query = select(models.Subscription).options(
+        selectinload(models.Subscription.club_subscriptions),
+        selectinload(models.Subscription.category_subscriptions),
+    )
+    if not include_inactive:
+        query = query.where(models.Subscription.is_active == True)
+    query = query.order_by(models.Subscription.created_at, models.Subscription.id)
+
+    for sub in db.execute(query.execution_options(yield_per=chunk_size)).scalars():
+        club_ids = [cs.club_id for cs in sub.club_subscriptions if cs.is_active]
+        yield {
+            "id": sub.id,
+            "email": sub.email,
+            "is_active": sub.is_active,
+            "created_at": sub.created_at.isoformat() if sub.created_at else None,
+            "club_ids": club_ids,
+            "clubs": [club_names.get(club_id, "Unknown") for club_id in club_ids],
+            "categories": [cat.category.value for cat in sub.category_subscriptions if cat.is_active],
+        }
+
+
+def iter_csv(rows: Iterable[dict], flush_every: int = 500) -> Iterator[str]:
+    """Render export rows as CSV text, a few hundred rows per chunk. Lists are ";"-joined."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for n, row in enumerate(rows, 1):
+        writer.writerow({
+            **row,
+            "club_ids": ";".join(row["club_ids"]),
+            "clubs": ";".join(row["clubs"]),
+            "categories": ";".join(row["categories"]),
+        })
+        if n % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def stream_export(fmt: str = "csv", include_inactive: bool = False) -> Iterator[str]:
+    """
+    Full export as text chunks, with its own session so it can outlive the request's
+    (StreamingResponse keeps iterating after the endpoint has returned).
+    """
+    db = SessionLocal()
+    try:
+        rows = iter_export_rows(db, include_inactive)
+        yield from (iter_ndjson(rows) if fmt == "ndjson" else iter_csv(rows))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage digest subscriptions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="import subscribers from a CSV file")
+    import_cmd.add_argument("path", help="CSV with email, club_ids and categories columns")
+    import_cmd.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    export_cmd = commands.add_parser("export", help="write all subscriptions to stdout or a file")
+    export_cmd.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    export_cmd.add_argument("--include-inactive", action="store_true")
+    export_cmd.add_argument("-o", "--output", help="file to write (default: stdout)")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        db = SessionLocal()
+        try:
+            with open(args.path, encoding="utf-8-sig", newline="") as f:
+                print(json.dumps(import_csv(db, f, args.batch_size), indent=2))
+        finally:
+            db.close()
+
+    elif args.command == "export":
+        out = open(args.output, "w", newline="") if args.output else sys.stdout
+        try:
+            for chunk in stream_export(args.format, args.include_inactive):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
@@ -0,0 +1,107 @@
+import os
+import sys
+import shutil
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# must be set before database.py is imported; load_dotenv() never overrides these
+_tmp = tempfile.mkdtemp(prefix="club-events-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["JWT_SECRET_KEY"] = "test-secret"
+os.environ["API_SECRET_KEY"] = "test-api-key"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_DIR"] = os.path.join(_tmp, "media")
+os.environ["LOCAL_STORAGE_URL"] = "http://testserver/media"
+os.environ["NEXTJS_APP_URL"] = "http://127.0.0.1:9"
+for name in ("SMTP_HOST", "SMTP_USER", "SMTP_PASSWORD", "FROM_EMAIL", "READ_REPLICA_URLS", "SUPABASE_URL"):
+    os.environ[name] = ""
+
+API_KEY = {"x-api-key": "test-api-key"}
+
+
+@pytest.fixture
+def db():
+    import database
+    import models
+    import main  # noqa: F401  creates the tables
+
+    session = database.SessionLocal()
+    yield session
+    session.close()
+    with database.engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    shutil.rmtree(os.environ["LOCAL_STORAGE_DIR"], ignore_errors=True)
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    import main
+
+    main.limiter.reset()  # rate limits (e.g. 5 logins a minute) apply per test
+    # not used as a context manager: startup hooks would start the background workers
+    return TestClient(main.api)
+
+
+def make_user(db, email, role="club", is_verified=True, club_name="Club"):
+    import models
+    import utils
+
+    user = models.User(
+        email=email, hashed_password=utils.hash_password("pw"),
+        club_name=club_name, role=role, is_verified=is_verified,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def login(client, email):
+    token = client.post("/login", data={"username": email, "password": "pw"}, headers=API_KEY).json()["access_token"]
+    return {**API_KEY, "Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_headers(client, db):
+    make_user(db, "admin@uni.edu", role="admin", club_name="Admin")
+    return login(client, "admin@uni.edu")
+
+
+@pytest.fixture
+def club(db):
+    return make_user(db, "club@uni.edu")
+
+
+def make_event(db, club, days_ahead=1, tags="", **kwargs):
+    import datetime
+    import secrets
+    import models
+
+    fields = dict(
+        slug=f"event-{secrets.token_hex(6)}", title="Event", description="About",
+        date=datetime.date.today() + datetime.timedelta(days=days_ahead),
+        start_time="18:00", end_time="19:00", duration=1.0,
+        location_type=models.LocationType.ON_CAMPUS, location="Hall",
+        tags=tags, club_id=club.id,
+    )
+    event = models.Event(**{**fields, **kwargs})
+    db.add(event)
+    db.commit()
+    return event
+
+
+def make_subscriber(db, email, clubs=(), categories=()):
+    import secrets
+    import models
+
+    sub = models.Subscription(email=email, token=secrets.token_urlsafe(16))
+    sub.club_subscriptions = [models.ClubSubscription(club_id=c.id, token=secrets.token_urlsafe(16)) for c in clubs]
+    sub.category_subscriptions = [models.CategorySubscription(category=c) for c in categories]
+    db.add(sub)
+    db.commit()
+    return sub
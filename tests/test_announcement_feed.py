@@ -0,0 +1,35 @@
+import datetime
+
+import models
+from conftest import API_KEY
+
+
+def make_announcement(db, club, created_at, **kwargs):
+    announcement = models.Announcement(
+        slug=f"a-{models.generate_uuid()}", title="News", body="Body",
+        club_id=club.id, created_at=created_at, **kwargs,
+    )
+    db.add(announcement)
+    db.commit()
+    return announcement.id
+
+
+def read_feed(client, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/announcements", params=params, headers=API_KEY).json()
+        ids.extend(a["id"] for a in body["data"])
+        cursor = body["nextCursor"]
+        if cursor is None:
+            return ids
+
+
+def test_cursor_pages_through_tied_timestamps(client, db, club):
+    tied = datetime.datetime(2026, 3, 1, 12, 0, 0)
+    pinned = make_announcement(db, club, tied, is_pinned=True)
+    same_time = sorted((make_announcement(db, club, tied) for _ in range(5)), reverse=True)
+    older = make_announcement(db, club, tied - datetime.timedelta(minutes=1))
+
+    for limit in (1, 2, 3):
+        assert read_feed(client, limit) == [pinned, *same_time, older]
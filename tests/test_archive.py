@@ -0,0 +1,60 @@
+import datetime
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+import archive
+import models
+from conftest import API_KEY, make_event
+
+
+def ids(response):
+    return [e["id"] for e in response.json()["data"]]
+
+
+def test_archived_events_come_back_with_history(client, db, club):
+    event = make_event(db, club, days_ahead=-(archive.EVENT_ARCHIVE_AFTER_DAYS + 5), tags="music,free", likes=3, view_count=7)
+    event_id, event_date, live_id = event.id, event.date, make_event(db, club).id
+    before = client.get(f"/events/{event_id}", headers=API_KEY).json()["data"]
+
+    assert archive.archive_events_batch(db) == 1
+    db.expire_all()
+    assert db.get(models.Event, event_id) is None
+
+    assert ids(client.get("/events", headers=API_KEY)) == [live_id]
+    with_history = client.get("/events", params={"include_history": True, "sort_order": "asc"}, headers=API_KEY).json()["data"]
+    assert [e["id"] for e in with_history] == [event_id, live_id]
+    assert with_history[0] == before
+
+    assert client.get(f"/events/{event_id}", headers=API_KEY).json()["data"] == before
+    assert ids(client.get(f"/clubs/{club.id}/events")) == [live_id, event_id]
+    assert ids(client.get(f"/clubs/{club.id}/events", params={"include_history": False})) == [live_id]
+    week = client.get("/events/weekly", params={"date": event_date.isoformat()}, headers=API_KEY)
+    assert ids(week) == [event_id]
+
+
+class RecordingSession:
+    """Just enough of a Postgres session for ensure_event_partitions."""
+
+    def __init__(self):
+        self.statements = []
+
+    def get_bind(self):
+        return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+
+def test_postgres_partition_ddl_compiles():
+    db = RecordingSession()
+    archive.ensure_event_partitions(db, {datetime.date(2025, 3, 1), datetime.date(2025, 4, 1), datetime.date(2025, 9, 1)})
+    assert db.statements == [
+        "CREATE TABLE IF NOT EXISTS events_archive_2025_fall PARTITION OF events_archive "
+        "FOR VALUES FROM ('2025-08-01') TO ('2026-01-01')",
+        "CREATE TABLE IF NOT EXISTS events_archive_2025_spring PARTITION OF events_archive "
+        "FOR VALUES FROM ('2025-01-01') TO ('2025-08-01')",
+    ]
+    ddl = str(CreateTable(models.EventArchive.__table__).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (date)" in ddl
+    assert "PRIMARY KEY (id, date)" in ddl
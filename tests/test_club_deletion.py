@@ -0,0 +1,66 @@
+import datetime
+
+from sqlalchemy import select
+
+import deletion
+import models
+from conftest import API_KEY, login, make_event, make_user
+
+
+def test_club_is_hidden_and_frozen_while_being_deleted(client, db, club, admin_headers):
+    club_headers = login(client, club.email)
+    event = make_event(db, club)
+    other = make_event(db, make_user(db, "other@uni.edu", club_name="Other"))
+    db.add(models.Announcement(
+        slug="news", title="News", body="Body", club_id=club.id, created_at=datetime.datetime.utcnow(),
+    ))
+    db.commit()
+
+    assert client.delete(f"/admin/clubs/{club.id}", headers=admin_headers).status_code == 202
+    assert client.delete(f"/admin/clubs/{club.id}", headers=admin_headers).status_code == 202
+
+    # content is gone from every public read before the outbox job runs
+    assert [e["id"] for e in client.get("/events", headers=API_KEY).json()["data"]] == [other.id]
+    assert client.get(f"/events/{event.id}", headers=API_KEY).status_code == 404
+    assert client.get(f"/clubs/{club.id}", headers=API_KEY).status_code == 404
+    assert club.id not in [c["id"] for c in client.get("/clubs", headers=API_KEY).json()["data"]]
+    assert client.get("/announcements", params={"search": "News"}, headers=API_KEY).json()["data"] == []
+
+    # not an unverified club awaiting review, and its status cannot change
+    pending = client.get("/admin/clubs", params={"status": "pending"}, headers=admin_headers).json()["data"]
+    assert club.id not in [c["id"] for c in pending]
+    status = client.patch(f"/admin/clubs/{club.id}/status", json={"isVerified": True}, headers=admin_headers)
+    assert status.status_code == 409
+    db.refresh(club)
+    assert club.is_verified is True
+
+    assert client.get("/users/me", headers=club_headers).status_code == 401
+
+    deletion.delete_club(db, club.id)
+    assert db.get(models.User, club.id) is None
+    assert db.get(models.ClubDeletion, club.id) is None
+    assert client.patch(f"/admin/clubs/{club.id}/status", json={"isVerified": True}, headers=admin_headers).status_code == 404
+
+
+def add_daily_stat(db, event_id):
+    db.add(models.EventDailyStat(event_id=event_id, day=datetime.date(2026, 1, 5), likes=1, views=2))
+    db.commit()
+
+
+def stat_event_ids(db):
+    return set(db.execute(select(models.EventDailyStat.event_id)).scalars())
+
+
+def test_deleting_events_drops_their_daily_stats(client, db, club):
+    other = make_event(db, make_user(db, "other@uni.edu", club_name="Other"))
+    deleted_alone, with_club = make_event(db, club), make_event(db, club)
+    for event in (other, deleted_alone, with_club):
+        add_daily_stat(db, event.id)
+    other_id, deleted_alone_id = other.id, deleted_alone.id
+
+    response = client.delete(f"/events/{deleted_alone_id}", headers=login(client, club.email))
+    assert response.status_code == 200
+    assert deleted_alone_id not in stat_event_ids(db)
+
+    deletion.delete_club(db, club.id, batch_size=1)
+    assert stat_event_ids(db) == {other_id}
@@ -0,0 +1,45 @@
+from sqlalchemy import select, func
+
+import models
+import stats
+from conftest import API_KEY, make_event
+
+
+def visitor(name):
+    return {**API_KEY, "x-visitor-id": name}
+
+
+def test_past_events_keep_counting_after_rollup(client, db, club):
+    event = make_event(db, club, days_ahead=-(stats.STATS_ROLLUP_AFTER_DAYS + 3))
+
+    client.get(f"/events/{event.id}", headers=visitor("v1"))
+    assert client.post(f"/event_like/{event.id}", headers=visitor("v1")).json()["data"]["likes"] == 1
+
+    assert stats.rollup_batch(db) == 1  # the view; likes stay raw until archiving
+    assert db.execute(select(func.count()).select_from(models.EventView)).scalar() == 0
+    assert [(d["likes"], d["views"]) for d in stats.daily_stats(db, event.id)] == [(1, 1)]
+
+    # toggling still deduplicates against the raw like
+    data = client.get(f"/events/{event.id}", headers=visitor("v1")).json()["data"]
+    assert data["hasLiked"] is True
+    response = client.post(f"/event_like/{event.id}", headers=visitor("v1"))
+    assert response.status_code == 200
+    assert response.json()["data"] == {"likes": 0, "hasLiked": False}
+    assert client.post(f"/event_like/{event.id}", headers=visitor("v2")).json()["data"]["likes"] == 1
+
+    # views are still counted, once per visitor since the last rollup
+    client.get(f"/events/{event.id}", headers=visitor("v2"))
+    client.get(f"/events/{event.id}", headers=visitor("v2"))
+    db.expire_all()
+    assert db.get(models.Event, event.id).view_count == 3
+
+
+def test_archiving_folds_likes(db, club):
+    event = make_event(db, club, days_ahead=-40)
+    db.add(models.EventLike(event_id=event.id, visitor_id="v1"))
+    db.commit()
+
+    assert stats.rollup_events(db, [event.id]) == 1
+    db.commit()
+    assert db.execute(select(func.count()).select_from(models.EventLike)).scalar() == 0
+    assert [(d["likes"], d["views"]) for d in stats.daily_stats(db, event.id)] == [(1, 0)]
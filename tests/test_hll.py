@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from hll import HyperLogLog
+
+
+def sketch_of(items, p=13):
+    sketch = HyperLogLog(p)
+    for item in items:
+        sketch.add(item)
+    return sketch
+
+
+def test_empty_and_small_counts():
+    assert HyperLogLog().count() == 0
+    assert sketch_of(["a", "a", "a"]).count() == 1
+    assert sketch_of(f"v{i}" for i in range(10)).count() == 10
+
+
+@pytest.mark.parametrize("p", [10, 13])
+@pytest.mark.parametrize("n", [100, 1_000, 20_000, 100_000])
+def test_estimate_within_error_bound(p, n):
+    # standard error is 1.04 / sqrt(m); allow 3 sigma, plus a little for tiny counts
+    bound = 3 * 1.04 / math.sqrt(1 << p)
+    estimate = sketch_of(f"visitor-{n}-{i}" for i in range(n)).count()
+    assert abs(estimate - n) <= bound * n + 2
+
+
+def test_merge_equals_union():
+    a = sketch_of(f"v{i}" for i in range(0, 6000))
+    b = sketch_of(f"v{i}" for i in range(4000, 10000))
+    union = sketch_of(f"v{i}" for i in range(10000))
+    a.merge(b)
+    assert a.registers == union.registers
+    a.merge(b)  # idempotent
+    assert a.count() == union.count()
+
+
+def test_serialization_round_trip():
+    sketch = sketch_of(f"v{i}" for i in range(5000))
+    data = sketch.to_bytes()
+    assert len(data) < sketch.m
+    restored = HyperLogLog.from_bytes(data)
+    assert (restored.p, restored.registers) == (sketch.p, sketch.registers)
+    with pytest.raises(ValueError):
+        HyperLogLog(13).merge(HyperLogLog(12))
+
+
+def test_flushes_from_several_processes_merge(db, club):
+    import models
+    import unique_views
+    from conftest import make_event
+
+    event = make_event(db, club)
+    event.view_count = 7  # exact views from before the switch
+    db.commit()
+
+    # two app processes saw overlapping visitors
+    first, second = unique_views.SketchBuffer(), unique_views.SketchBuffer()
+    for i in range(3000):
+        first.add(event.id, f"v{i}")
+    for i in range(2000, 5000):
+        second.add(event.id, f"v{i}")
+    unique_views.flush(db, first.drain())
+    unique_views.flush(db, second.drain())
+    unique_views.flush(db, second.drain())  # nothing new
+
+    db.expire_all()
+    row = db.get(models.EventViewSketch, event.id)
+    assert row.base_count == 7
+    assert abs(row.estimate - 5000) <= 0.035 * 5000
+    assert db.get(models.Event, event.id).view_count == 7 + row.estimate
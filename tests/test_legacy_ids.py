@@ -0,0 +1,34 @@
+from sqlalchemy import Column, MetaData, String, Table, create_engine, select
+
+import database
+import migrations
+import models
+from conftest import API_KEY, make_user
+
+
+def test_copy_records_legacy_ids(client, db, tmp_path):
+    user = make_user(db, "old@example.com")
+    row = {c.name: getattr(user, c.name) for c in models.User.__table__.columns}
+    db.delete(user)
+    db.commit()
+
+    # the old schema: ids were plain strings
+    source = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    meta = MetaData()
+    users = Table("users", meta, *(Column(c.name, String if c.name == "id" else c.type) for c in models.User.__table__.columns))
+    meta.create_all(source)
+    kept = "0b9e3b6c-8f43-4f8b-9a55-0c6d2c1f7e10"
+    with source.begin() as conn:
+        conn.execute(users.insert(), [{**row, "id": "club-1"}, {**row, "id": kept.upper(), "email": "uuid@example.com"}])
+
+    assert migrations.copy_table(source, db, users, models.User.__table__) == 2
+
+    new_id = str(database.as_uuid("club-1"))
+    aliases = db.execute(select(models.LegacyId.table_name, models.LegacyId.legacy_id, models.LegacyId.new_id)).all()
+    assert sorted(aliases) == sorted([("users", "club-1", new_id), ("users", kept.upper(), kept)])
+
+    # old ids keep resolving, and clients can translate them
+    assert client.get("/clubs/club-1", headers=API_KEY).json()["data"]["id"] == new_id
+    response = client.get("/legacy-ids/club-1", headers=API_KEY)
+    assert response.json() == {"success": True, "legacy_id": "club-1", "ids": {"users": new_id}}
+    assert client.get("/legacy-ids/club-2", headers=API_KEY).status_code == 404
@@ -0,0 +1,32 @@
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def local(tmp_path):
+    return storage.LocalStorage(str(tmp_path), "http://testserver/media")
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        storage.StorageBackend()
+
+
+def test_list_objects_pages_in_name_order(local, tmp_path):
+    urls = [local.upload(b"img", f"{i}.webp", "image/webp") for i in range(7)]
+    (tmp_path / "ab.webp").write_bytes(b"legacy")  # unsharded name next to shard dirs
+    names = sorted([local.filename_from_url(u) for u in urls] + ["ab.webp"])
+
+    assert list(local.iter_objects()) == names
+    pages = [local.list_objects(limit=3, offset=o) for o in (0, 3, 6)]
+    assert [o["name"] for page in pages for o in page] == names
+    assert local.list_objects(limit=3, offset=9) == []
+
+
+def test_list_objects_prefix(local):
+    name = local.filename_from_url(local.upload(b"img", "a.webp", "image/webp"))
+    local.upload(b"img", "b.webp", "image/webp")
+    assert list(local.iter_objects(name[:3])) == [name]
+    assert [o["name"] for o in local.list_objects(prefix=name[:6])] == [name]
+    assert local.list_objects(prefix="zz/") == []
@@ -0,0 +1,70 @@
+import uuid
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+import database
+import models
+from conftest import make_event, make_user
+
+
+def count(db, model):
+    return db.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_compact_uuid_round_trips(db):
+    hyphenated = str(uuid.uuid4())
+    user = make_user(db, "a@uni.edu")
+    db.execute(models.User.__table__.update().where(models.User.id == user.id).values(id=hyphenated.upper()))
+    db.commit()
+    db.expire_all()
+
+    assert db.get(models.User, hyphenated).id == hyphenated  # canonical, lower case
+    assert db.get(models.User, hyphenated.upper()).id == hyphenated
+    stored = db.execute(text("SELECT id FROM users")).scalar()
+    assert stored == uuid.UUID(hyphenated).bytes  # 16 bytes on SQLite
+
+
+def test_legacy_ids_map_to_a_stable_uuid(db):
+    user = make_user(db, "legacy@uni.edu")
+    db.execute(models.User.__table__.update().where(models.User.id == user.id).values(id="club-1"))
+    db.commit()
+    db.expire_all()
+
+    expected = str(uuid.uuid3(database.LEGACY_ID_NAMESPACE, "club-1"))
+    assert db.get(models.User, "club-1").id == expected
+    assert db.get(models.User, expected).id == expected
+
+
+def test_compact_uuid_bind_per_dialect():
+    value = uuid.uuid4()
+    column = database.CompactUUID()
+    assert column.process_bind_param(str(value), postgresql.dialect()) == value
+    assert column.process_bind_param(str(value), sqlite.dialect()) == value.bytes
+    assert column.process_result_value(value.bytes, sqlite.dialect()) == str(value)
+    assert column.process_bind_param(None, sqlite.dialect()) is None
+
+
+def test_foreign_keys_are_enforced(db):
+    assert db.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_deletes_cascade_in_the_database(db, club):
+    event = make_event(db, club)
+    db.add_all([
+        models.EventLike(event_id=event.id, visitor_id="v1"),
+        models.EventView(event_id=event.id, visitor_id="v1"),
+        models.EventViewSketch(event_id=event.id),
+        models.Announcement(slug="a", title="A", body="B", club_id=club.id, category=models.AnnouncementCategory.GENERAL),
+    ])
+    db.commit()
+
+    # a plain DELETE, so nothing but the database can remove the children
+    db.execute(delete(models.Event).where(models.Event.id == event.id))
+    db.commit()
+    assert [count(db, m) for m in (models.EventLike, models.EventView, models.EventViewSketch)] == [0, 0, 0]
+
+    make_event(db, club)
+    db.execute(delete(models.User).where(models.User.id == club.id))
+    db.commit()
+    assert [count(db, m) for m in (models.Event, models.Announcement)] == [0, 0]
@@ -0,0 +1,137 @@
+import datetime
+import time
+
+import pytest
+from sqlalchemy import select, update
+
+import models
+import outbox
+from database import SessionLocal
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setitem(outbox.HANDLERS, "test", lambda payloads: calls.append(payloads))
+    return calls
+
+
+def make_due(db):
+    db.execute(update(models.OutboxMessage).values(available_at=datetime.datetime.utcnow() - datetime.timedelta(seconds=1)))
+    db.commit()
+
+
+def test_retry_delay_backs_off_exponentially():
+    assert [outbox.retry_delay(n) for n in (1, 2, 3, 4)] == [2.0, 4.0, 8.0, 16.0]
+    assert outbox.retry_delay(100) == outbox.OUTBOX_RETRY_MAX
+
+
+def test_delivers_and_deletes(db, calls):
+    outbox.enqueue(db, "test", {"n": 1})
+    outbox.enqueue(db, "test", {"n": 2})
+    db.commit()
+
+    assert outbox.drain_once() == 2
+    assert sorted(p["n"] for p in calls[0]) == [1, 2]
+    assert db.execute(select(models.OutboxMessage)).first() is None
+
+
+def test_failed_batch_is_retried_with_backoff(db, monkeypatch):
+    failures = [RuntimeError("down"), RuntimeError("still down")]
+
+    def flaky(payloads):
+        if failures:
+            raise failures.pop(0)
+
+    monkeypatch.setitem(outbox.HANDLERS, "test", flaky)
+    outbox.enqueue(db, "test", {})
+    db.commit()
+
+    before = datetime.datetime.utcnow()
+    outbox.drain_once()
+    message = db.execute(select(models.OutboxMessage)).scalar_one()
+    assert (message.attempts, message.last_error) == (1, "down")
+    assert message.available_at >= before + datetime.timedelta(seconds=outbox.retry_delay(1))
+    assert outbox.drain_once() == 0  # not due yet
+
+    make_due(db)
+    outbox.drain_once()
+    db.expire_all()
+    message = db.execute(select(models.OutboxMessage)).scalar_one()
+    assert (message.attempts, message.last_error) == (2, "still down")
+    assert message.available_at >= before + datetime.timedelta(seconds=outbox.retry_delay(2))
+
+    make_due(db)
+    outbox.drain_once()
+    assert db.execute(select(models.OutboxMessage)).first() is None
+
+
+def test_gives_up_after_max_attempts(db, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+    outbox.enqueue(db, "unknown-kind", {})
+    db.commit()
+
+    outbox.drain_once()
+    make_due(db)
+    outbox.drain_once()
+    message = db.execute(select(models.OutboxMessage)).scalar_one()
+    assert message.status == models.OutboxStatus.FAILED
+    assert "No outbox handler" in message.last_error
+    make_due(db)
+    assert outbox.drain_once() == 0
+
+
+def test_claimed_messages_are_not_claimed_twice(db, calls):
+    outbox.enqueue(db, "test", {})
+    db.commit()
+
+    other = SessionLocal()
+    try:
+        lease, claimed = outbox.claim(other)
+        assert len(claimed) == 1
+        assert outbox.drain_once() == 0
+    finally:
+        other.close()
+    assert calls == []
+
+
+def test_handlers_run_outside_the_claim_transaction(db, monkeypatch):
+    def writes(payloads):
+        # nothing holds the claimed rows locked while handlers run
+        session = SessionLocal()
+        try:
+            session.execute(update(models.OutboxMessage).values(last_error="touched by handler"))
+            session.commit()
+        finally:
+            session.close()
+
+    monkeypatch.setitem(outbox.HANDLERS, "test", writes)
+    outbox.enqueue(db, "test", {})
+    db.commit()
+    assert outbox.drain_once() == 1
+    assert db.execute(select(models.OutboxMessage)).first() is None
+
+
+def test_burst_of_revalidations_sends_one_purge(db, monkeypatch):
+    import revalidation
+
+    sent = []
+    monkeypatch.setattr(revalidation.dispatcher, "window", 0.2)
+    monkeypatch.setattr(
+        revalidation.dispatcher.session, "post",
+        lambda url, params, timeout: sent.append(params["tags"]) or type("Response", (), {"status_code": 200})(),
+    )
+    revalidation.dispatcher.flush()  # e.g. like purges left pending by other tests
+    sent.clear()
+
+    # one commit and one drain per write, as outbox.wake() does after every commit
+    for tags in (["events"], ["events"], ["announcements"], ["events", "clubs"]):
+        outbox.enqueue_revalidation(db, tags)
+        db.commit()
+        assert outbox.drain_once() == 1
+
+    deadline = time.monotonic() + 2
+    while not sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.3)
+    assert sent == ["announcements,clubs,events"]
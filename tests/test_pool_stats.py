@@ -0,0 +1,82 @@
+import gc
+import weakref
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import database
+
+
+def test_in_memory_sqlite_keeps_its_pool():
+    engine = database.make_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    # a QueuePool would hand out a fresh, empty in-memory database here
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+
+    stats = database.POOL_STATS[engine].snapshot()
+    assert stats["checkouts"] == 2
+    assert stats["connects"] == 1
+    assert len(database.POOL_STATS[engine].holds) == 2
+
+
+def test_counts_overflow_and_survives_dispose(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    assert isinstance(engine.pool, QueuePool)
+    size = engine.pool.size()
+    conns = [engine.connect() for _ in range(size + 2)]
+    for conn in conns:
+        conn.close()
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    stats = database.POOL_STATS[engine].snapshot()
+    assert stats["checkouts"] == size + 3
+    assert stats["overflow_checkouts"] == 2
+    assert stats["connects"] == size + 3
+
+
+def test_pool_stats_endpoint(client, admin_headers):
+    pools = client.get("/admin/pool-stats", params={"reset": True}, headers=admin_headers).json()["pools"]
+    assert pools[0]["name"] == "primary"
+    assert pools[0]["checkouts"] > 0
+    assert pools[0]["wait_ms"]["max"] > 0  # the admin's request waited for its connection
+    assert client.get("/admin/pool-stats", headers=admin_headers).json()["pools"][0]["checkouts"] < pools[0]["checkouts"]
+
+
+def test_lazy_session_times_its_wait_and_counts_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.1)
+    stats = database.instrument_pool(engine)
+    factory = sessionmaker(bind=engine)
+
+    db = database.LazySession(factory)
+    db.rollback()  # needs no connection
+    assert stats.checkouts == 0
+    assert db.execute(text("SELECT 1")).scalar() == 1
+    assert len(stats.waits) == 1
+
+    blocked = database.LazySession(factory)
+    with pytest.raises(PoolTimeoutError):
+        blocked.execute(text("SELECT 1"))
+    blocked.close()
+    db.close()
+    assert stats.timeouts == 1
+    assert len(stats.waits) == 1  # timeouts are counted, not timed
+
+
+def test_disposed_engines_are_freed():
+    engine = database.make_engine("sqlite://")
+    with engine.connect():
+        pass
+    assert engine in database.POOL_STATS
+    ref = weakref.ref(engine)
+    engine.dispose()
+    del engine
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from revalidation import RevalidationDispatcher
+
+
+class FakeResponse:
+    status_code = 200
+    text = "ok"
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    dispatcher = RevalidationDispatcher("http://nextjs.test", "secret", window=0.05, low_priority_window=0.5)
+    dispatcher.sent = []
+    monkeypatch.setattr(dispatcher.session, "post", lambda url, params, timeout: dispatcher.sent.append(params["tags"]) or FakeResponse())
+    yield dispatcher
+    dispatcher.stop()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_window_coalesces_tags_into_one_purge(dispatcher):
+    dispatcher.schedule(["events"])
+    dispatcher.schedule(["events", "clubs"])
+    dispatcher.schedule(["announcements", ""])
+
+    wait_for(lambda: dispatcher.sent)
+    time.sleep(0.1)
+    assert dispatcher.sent == ["announcements,clubs,events"]
+    assert dispatcher.stats() == {
+        "requested": 3, "sent": 1, "failed": 0, "tags_sent": 3, "pending_tags": 0, "saved": 2,
+    }
+
+
+def test_low_priority_waits_for_its_own_window(dispatcher):
+    dispatcher.schedule(["events"], low_priority=True)
+    time.sleep(0.2)
+    assert dispatcher.sent == []
+    assert dispatcher.stats()["pending_tags"] == 1
+    assert dispatcher.stats()["saved"] == 0  # still pending, not saved
+
+    wait_for(lambda: dispatcher.sent)
+    assert dispatcher.sent == ["events"]
+
+
+def test_normal_write_pulls_low_priority_purge_forward(dispatcher):
+    dispatcher.schedule(["events"], low_priority=True)
+    dispatcher.schedule(["events"], low_priority=True)
+    dispatcher.schedule(["events", "clubs"])
+
+    start = time.monotonic()
+    wait_for(lambda: dispatcher.sent)
+    assert time.monotonic() - start < 0.4
+    assert dispatcher.sent == ["clubs,events"]
+    assert dispatcher.stats()["saved"] == 2
+
+
+def test_failed_purge_is_counted(dispatcher, monkeypatch):
+    class Failed(FakeResponse):
+        status_code = 500
+
+    monkeypatch.setattr(dispatcher.session, "post", lambda url, params, timeout: Failed())
+    assert dispatcher.purge(["events"]) is False
+    assert dispatcher.stats()["failed"] == 1
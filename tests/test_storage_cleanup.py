@@ -0,0 +1,40 @@
+import models
+import storage
+from conftest import make_user
+
+
+def test_cleanup_compares_references_page_by_page(db, monkeypatch):
+    backend = storage.get_backend()
+    urls = [backend.upload(b"img", f"{i}.webp", "image/webp") for i in range(5)]
+    club = make_user(db, "club@uni.edu")
+    club.logo_url, club.banner_url = urls[1], urls[3]
+    db.commit()
+
+    looked_up = []
+    referenced = storage.referenced_filenames
+    monkeypatch.setattr(storage, "referenced_filenames", lambda s, names: looked_up.append(len(names)) or referenced(s, names))
+
+    result = storage.cleanup_orphaned_images(db, page_size=2, batch_size=2)
+    assert result == {"total_in_storage": 5, "orphans_found": 3, "deleted": 3, "dry_run": False}
+    assert looked_up == [2, 2, 1]
+    assert sorted(o["name"] for o in backend.list_objects()) == sorted(backend.filename_from_url(u) for u in (urls[1], urls[3]))
+
+
+def test_cleanup_job_is_stored(client, admin_headers, db):
+    backend = storage.get_backend()
+    backend.upload(b"img", "orphan.webp", "image/webp")
+
+    job = client.post("/admin/cleanup-storage?dry_run=true", headers=admin_headers).json()
+    assert job["status"] == "queued"
+
+    # TestClient runs background tasks before returning
+    status = client.get(f"/admin/cleanup-storage/{job['job_id']}", headers=admin_headers).json()
+    assert status["status"] == "done"
+    assert status["result"]["orphans_found"] == 1
+    assert status["result"]["deleted"] == 0
+
+    assert client.get("/admin/cleanup-storage/not-a-job", headers=admin_headers).status_code == 404
+
+
+def test_missing_cleanup_job_is_skipped(db):
+    storage.run_cleanup_job(models.generate_uuid())  # e.g. purged before the task ran
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+import requests
+
+from storage_client import StorageClient, StorageError
+from storage_sink import StorageSink
+
+
+@pytest.fixture
+def sink():
+    with StorageSink() as sink:
+        yield sink
+
+
+def make_client(sink, **kwargs):
+    kwargs.setdefault("backoff_factor", 0)
+    return StorageClient(sink.url, sink.service_key, sink.bucket, **kwargs)
+
+
+def test_upload_list_delete(sink):
+    client = make_client(sink)
+    url = client.upload(b"png", "a.png", "image/png")
+    client.upload(b"png", "b.png", "image/png")
+
+    assert url == client.public_url("a.png")
+    assert client.filename_from_url(url) == "a.png"
+    assert requests.get(url).content == b"png"
+    assert [o["name"] for o in client.list_objects(limit=1, offset=1)] == ["b.png"]
+    assert client.delete(["a.png"])
+    assert list(sink.objects) == ["b.png"]
+
+
+def test_retries_transient_errors(sink):
+    sink.fail_with = [503, 502]
+    client = make_client(sink, max_retries=3)
+    client.upload(b"png", "a.png", "image/png")
+    assert sink.requests == 3
+    assert "a.png" in sink.objects
+
+
+def test_gives_up_after_max_retries(sink):
+    sink.fail_with = [503] * 5
+    client = make_client(sink, max_retries=2)
+    with pytest.raises(StorageError) as exc:
+        client.upload(b"png", "a.png", "image/png")
+    assert exc.value.status_code == 503
+    assert sink.requests == 3
+
+
+def test_client_errors_are_not_retried(sink):
+    client = StorageClient(sink.url, "wrong-key", sink.bucket, backoff_factor=0)
+    with pytest.raises(StorageError) as exc:
+        client.list_objects()
+    assert exc.value.status_code == 401
+    assert sink.requests == 1
+
+
+def test_backoff_between_retries(sink):
+    sink.fail_with = [503, 503, 503]
+    client = make_client(sink, max_retries=3, backoff_factor=0.1)
+    start = time.monotonic()
+    client.upload(b"png", "a.png", "image/png")
+    # urllib3 sleeps backoff_factor * 2 ** (n - 1) before the nth retry: 0.1 + 0.2 + 0.4
+    assert time.monotonic() - start >= 0.6
+
+
+def test_read_timeout(sink):
+    sink.delay = 0.5
+    client = make_client(sink, max_retries=0, timeouts={"list": (1, 0.1)})
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.list_objects()
+    assert time.monotonic() - start < 0.5
+
+
+def test_reuses_connection(sink):
+    client = make_client(sink)
+    for i in range(20):
+        client.upload(b"png", f"{i}.png", "image/png")
+    client.list_objects()
+    client.delete(["0.png"])
+    assert sink.requests == 22
+    assert sink.connections == 1
+
+
+def test_delete_reports_network_errors(sink):
+    sink.delay = 0.5
+    client = make_client(sink, max_retries=1, timeouts={"delete": (1, 0.1)})
+    assert client.delete(["a.png"]) is False
+    assert sink.requests == 2
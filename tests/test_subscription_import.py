@@ -0,0 +1,54 @@
+from sqlalchemy import select
+
+import models
+from conftest import make_subscriber
+
+
+def upload(client, headers, text, batch_size=2):
+    return client.post(
+        f"/admin/subscriptions/import?batch_size={batch_size}",
+        files={"file": ("subs.csv", text.encode(), "text/csv")},
+        headers=headers,
+    )
+
+
+def test_import_duplicate_and_invalid_rows(client, admin_headers, db, club):
+    old = make_subscriber(db, "old@uni.edu")
+    old.is_active = False
+    db.commit()
+
+    csv_text = (
+        "Email,club_ids,categories\n"
+        f"a@uni.edu,{club.id},workshop\n"
+        "a@uni.edu,,job\n"               # duplicate in the same batch
+        "not-an-email,,\n"
+        "b@uni.edu,,\n"
+        "a@uni.edu,,\n"                 # duplicate in a later batch
+        "c@uni.edu,no-such-club,\n"
+        "d@uni.edu,,astrology\n"
+        "old@uni.edu,,\n"
+    )
+    response = upload(client, admin_headers, csv_text)
+    assert response.status_code == 200
+    result = response.json()["data"]
+
+    assert result["rows"] == 8
+    assert (result["created"], result["reactivated"], result["unchanged"]) == (2, 1, 2)
+    assert (result["invalid"], result["failed"]) == (3, 0)
+    assert [(e["line"], e["error"]) for e in result["errors"]] == [
+        (4, "invalid email"),
+        (7, "unknown club id: no-such-club"),
+        (8, "unknown category: astrology"),
+    ]
+
+    db.expire_all()
+    emails = sorted(db.execute(select(models.Subscription.email).where(models.Subscription.is_active == True)).scalars())
+    assert emails == ["a@uni.edu", "b@uni.edu", "old@uni.edu"]
+    a = db.execute(select(models.Subscription).where(models.Subscription.email == "a@uni.edu")).scalar_one()
+    assert [cs.club_id for cs in a.club_subscriptions] == [club.id]
+    assert sorted(c.category.value for c in a.category_subscriptions) == ["job", "workshop"]
+
+
+def test_import_requires_email_column(client, admin_headers):
+    response = upload(client, admin_headers, "name\nAda\n")
+    assert response.status_code == 400
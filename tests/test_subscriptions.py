@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event, func, select
+
+import database
+import models
+from conftest import API_KEY, make_subscriber, make_user
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(database.engine, "after_cursor_execute", record)
+
+
+def club_rows(db):
+    db.expire_all()
+    return db.execute(
+        select(models.ClubSubscription.id, models.ClubSubscription.club_id, models.ClubSubscription.is_active)
+        .order_by(models.ClubSubscription.club_id)
+    ).all()
+
+
+def test_resubscribe_reactivates_rows(client, db):
+    clubs = [make_user(db, f"club{i}@uni.edu", club_name=f"Club {i}") for i in range(3)]
+    body = {"email": "student@uni.edu", "clubIds": [c.id for c in clubs], "categories": ["job"]}
+    assert client.post("/subscribe", json=body, headers=API_KEY).status_code == 200
+    subscribed = club_rows(db)
+    assert [row.is_active for row in subscribed] == [True] * 3
+
+    token = db.execute(select(models.Subscription.token)).scalar_one()
+    with count_queries() as statements:
+        assert client.delete(f"/unsubscribe/{token}").status_code == 200
+    assert [row.is_active for row in club_rows(db)] == [False] * 3
+    assert sum(s.startswith("UPDATE club_subscriptions") for s in statements) == 1
+
+    assert client.post("/subscribe", json=body, headers=API_KEY).status_code == 200
+    assert club_rows(db) == subscribed  # same rows, active again
+    assert db.execute(select(models.Subscription.is_active)).scalar_one() is True
+    assert len(db.execute(select(models.CategorySubscription)).all()) == 1
+
+
+def subscribe_many(db, n, clubs, start=0):
+    for i in range(start, start + n):
+        make_subscriber(db, f"student{i}@uni.edu", clubs=clubs, categories=[models.AnnouncementCategory.JOB])
+
+
+def test_admin_list_and_export_use_constant_queries(client, db, admin_headers):
+    clubs = [make_user(db, f"club{i}@uni.edu", club_name=f"Club {i}") for i in range(3)]
+
+    def queries(n):
+        subscribe_many(db, n, clubs, start=db.execute(select(func.count()).select_from(models.Subscription)).scalar())
+        with count_queries() as listing:
+            page = client.get("/admin/subscriptions", params={"page_size": 100}, headers=admin_headers).json()
+        with count_queries() as export:
+            lines = client.get("/admin/subscriptions/export", headers=admin_headers).text.strip().splitlines()
+        assert all(len(s["clubs"]) == 3 for s in page["data"])
+        return len(page["data"]), len(lines) - 1, len(listing), len(export)
+
+    few_rows, few_lines, few_listing, few_export = queries(2)
+    many_rows, many_lines, many_listing, many_export = queries(20)
+    assert (few_rows, few_lines, many_rows, many_lines) == (2, 2, 22, 22)
+    assert many_listing == few_listing
+    assert many_export == few_export
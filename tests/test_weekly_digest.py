@@ -0,0 +1,108 @@
+import uuid
+
+import pytest
+
+import weekly_digest
+from conftest import make_user, make_event, make_subscriber
+from smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+@pytest.fixture
+def week(db):
+    chess = make_user(db, "chess@uni.edu", club_name="Chess")
+    robots = make_user(db, "robots@uni.edu", club_name="Robots")
+    make_event(db, chess, title="Blitz night")
+    make_event(db, robots, title="Build day", tags="Workshop")
+    return chess, robots
+
+
+def test_dry_run_sends_one_digest_per_subscriber(db, week, sink):
+    chess, robots = week
+    for i in range(6):
+        make_subscriber(db, f"chess{i}@uni.edu", clubs=[chess])
+        make_subscriber(db, f"robots{i}@uni.edu", clubs=[robots])
+        make_subscriber(db, f"all{i}@uni.edu")
+
+    stats = weekly_digest.run_digest(sink=(sink.host, sink.port))
+    assert (stats["recipients"], stats["sent"], stats["failed"]) == (18, 18, 0)
+    assert stats["digests"] == 3  # chess only, robots only, everything
+    assert sink.messages == 18
+
+
+def test_messages_stream_with_per_recipient_links(db, week):
+    chess, robots = week
+    subs = [make_subscriber(db, "a@uni.edu", clubs=[chess]), make_subscriber(db, "b@uni.edu", categories=["workshop"])]
+    index = weekly_digest.EventIndex(weekly_digest.get_upcoming_events(db))
+
+    messages = list(weekly_digest.iter_digest_messages(iter(subs), index, skip={subs[1].id}))
+    assert [(email, sub_id) for email, _, sub_id in messages] == [("a@uni.edu", subs[0].id)]
+    assert f"/unsubscribe/{subs[0].token}" in messages[0][1]
+    assert "1 upcoming events" in messages[0][1]
+
+
+def test_bodies_cache_is_bounded(db, week):
+    index = weekly_digest.EventIndex(weekly_digest.get_upcoming_events(db))
+    bodies = weekly_digest.DigestBodies(index, maxsize=2)
+    for mask in (1, 2, 1, 3, 2, 1):
+        bodies.get(mask)
+    # 1, 2, (1 hit), 3 evicts 2, 2 evicts 1, 1 evicts 3
+    assert bodies.rendered == 5
+    assert len(bodies._bodies) == 2
+
+
+def test_run_with_failed_deliveries_is_not_finished(db):
+    subs = [make_subscriber(db, f"s{i}@uni.edu") for i in range(3)]
+    run = weekly_digest.get_or_create_run(db, "2026-W01")
+
+    recorder = weekly_digest.DeliveryRecorder(run.id)
+    recorder.record(subs[0].id, subs[0].email)
+    recorder.record(subs[1].id, subs[1].email, error="550 mailbox full")
+    recorder.close()
+    assert not weekly_digest.finish_run_if_complete(db, run)
+    assert run.total == 3
+
+    # a later shard or rerun sends the rest
+    recorder = weekly_digest.DeliveryRecorder(run.id)
+    recorder.record(subs[1].id, subs[1].email)
+    recorder.record(subs[2].id, subs[2].email)
+    recorder.close()
+    assert weekly_digest.finish_run_if_complete(db, run)
+    assert run.total == 3
+
+
+def test_shards_split_subscribers_in_sql(db):
+    subs = [make_subscriber(db, f"s{i}@uni.edu") for i in range(40)]
+    run = weekly_digest.get_or_create_run(db, "2026-W02")
+    recorder = weekly_digest.DeliveryRecorder(run.id)
+    recorder.record(subs[0].id, subs[0].email)
+    recorder.close()
+
+    seen = []
+    for index in range(3):
+        ids = [s.id for s in weekly_digest.iter_shard_subscribers(db, run.id, 3, index, chunk_size=4)]
+        assert ids == sorted(ids, key=lambda i: uuid.UUID(i).bytes)
+        assert all(weekly_digest.shard_of(i, 3) == index for i in ids)
+        to_send, skipped, active = weekly_digest.plan_shard(db, run.id, 3, index)
+        assert (to_send, active) == (len(ids), 40)
+        assert skipped == (weekly_digest.shard_of(subs[0].id, 3) == index)
+        seen.extend(ids)
+
+    assert sorted(seen) == sorted(s.id for s in subs[1:])
+
+
+def test_report_when_smtp_is_not_configured(db, monkeypatch):
+    monkeypatch.setattr(weekly_digest, "SMTP_HOST", "")
+    stats = weekly_digest.run_digest(trace_memory=True)
+    assert stats["error"] == "SMTP not configured"
+    assert stats["sent"] == 0
+    report = weekly_digest.format_report(stats)
+    assert "0.0 msg/s" in report
+    assert "error: SMTP not configured" in report
+
+    assert "error" in weekly_digest.main([])
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+
+import database
+import models
+from conftest import make_event
+
+
+@contextmanager
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(database.engine, "after_cursor_execute", record)
+    try:
+        yield executed
+    finally:
+        event.remove(database.engine, "after_cursor_execute", record)
+
+
+def stored(db, model, id):
+    """The row as stored, read past the session's identity map."""
+    table = model.__table__
+    return db.execute(select(*table.columns).where(table.c.id == id)).one()._asdict()
+
+
+def as_dict(obj):
+    return {c.key: getattr(obj, c.key) for c in obj.__table__.columns}
+
+
+def test_insert_returning_applies_defaults(db, club):
+    announcement = database.insert_returning(db, models.Announcement, {
+        "slug": "news", "title": "News", "body": "Body",
+        "category": models.AnnouncementCategory.GENERAL, "club_id": club.id,
+    })
+    assert object_session(announcement) is db
+    returned = as_dict(announcement)  # before commit expires it
+    assert returned["id"] and returned["created_at"] and returned["is_pinned"] is False
+    db.commit()
+    assert returned == stored(db, models.Announcement, returned["id"])
+
+
+def test_update_returning_matches_the_database(db, club):
+    event_id = make_event(db, club, title="Old").id
+
+    updated = database.update_returning(db, models.Event, [models.Event.id == event_id], {"title": "New", "likes": 4})
+    returned = as_dict(updated)  # before commit expires it
+    db.commit()
+    assert (returned["title"], returned["likes"]) == ("New", 4)
+    assert returned == stored(db, models.Event, event_id)
+
+
+def test_update_returning_without_values_reads_the_row(db, club):
+    event_id = make_event(db, club).id
+    with statements() as executed:
+        found = database.update_returning(db, models.Event, [models.Event.id == event_id], {})
+    assert found.id == event_id
+    assert [s.split()[0] for s in executed] == ["SELECT"]
+
+
+def test_update_returning_unknown_id_is_none(db):
+    missing = models.generate_uuid()
+    assert database.update_returning(db, models.User, [models.User.id == missing], {"club_name": "X"}) is None
+    assert database.update_returning(db, models.User, [models.User.id == missing], {}) is None
+
+
+def test_attach_sets_relationship_without_loading(db, club):
+    created = make_event(db, club)
+    db.expire(created, ["owner"])
+    database.attach(created, owner=club)
+    with statements() as executed:
+        assert created.owner is club
+    assert executed == []
+    assert not db.is_modified(created)
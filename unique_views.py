@@ -0,0 +1,252 @@
+"""
+Approximate unique-viewer counting.
+
+By default (VIEW_COUNTING=exact) every (event, visitor) pair gets a row in event_views,
+so viewing an event costs a lookup and an insert and the table grows with every visitor.
+With VIEW_COUNTING=hll views go into a HyperLogLog sketch per event instead (hll.py):
+~1.15% error at the default precision, at most 8 KB per event and usually a few KB
+or less once compressed, and nothing is written on the request path.
+
+Each process collects views in in-memory sketches and flushes them every
+VIEW_SKETCH_FLUSH_INTERVAL seconds: under a row lock the stored sketch is merged with
+the buffered one and Event.view_count becomes base_count + estimate, base_count being
+the exact count the event had when its sketch was created. Merging is idempotent, so
+any number of app processes can flush the same event. view_count lags by up to one
+flush interval, and daily stats have no per-day views for sketched events.
+
+Switching an existing deployment to hll, run the backfill once so visitors already in
+event_views are not counted again:
+    python unique_views.py backfill
+"""
+
+import os
+import logging
+import datetime
+import threading
+from typing import Optional
+
+from sqlalchemy import select, update, bindparam, func
+from dotenv import load_dotenv
+
+import models
+from hll import HyperLogLog, DEFAULT_PRECISION
+from database import SessionLocal, dialect_insert
+from background import PeriodicTask
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNTING = os.getenv("VIEW_COUNTING", "exact").lower()  # exact | hll
+VIEW_SKETCH_PRECISION = int(os.getenv("VIEW_SKETCH_PRECISION", str(DEFAULT_PRECISION)))
+VIEW_SKETCH_FLUSH_INTERVAL = float(os.getenv("VIEW_SKETCH_FLUSH_INTERVAL", "10"))
+VIEW_SKETCH_FLUSH_BATCH = 200  # events per transaction
+
+
+def approximate() -> bool:
+    return VIEW_COUNTING == "hll"
+
+
+class SketchBuffer:
+    """Per-event sketches of views seen by this process since the last flush."""
+
+    def __init__(self, precision: int = VIEW_SKETCH_PRECISION):
+        self.precision = precision
+        self._sketches: dict[str, HyperLogLog] = {}
+        self._lock = threading.Lock()
+
+    def add(self, event_id: str, visitor_id: str):
+        with self._lock:
+            sketch = self._sketches.get(event_id)
+            if sketch is None:
+                sketch = self._sketches[event_id] = HyperLogLog(self.precision)
+            sketch.add(visitor_id)
+
+    def drain(self) -> dict[str, HyperLogLog]:
+        with self._lock:
+            sketches, self._sketches = self._sketches, {}
+        return sketches
+
+    def restore(self, sketches: dict[str, HyperLogLog]):
+        """Put back sketches whose flush failed, merging with views buffered since."""
+        with self._lock:
+            for event_id, sketch in sketches.items():
+                current = self._sketches.get(event_id)
+                if current is None:
+                    self._sketches[event_id] = sketch
+                else:
+                    current.merge(sketch)
+
+    def __len__(self):
+        return len(self._sketches)
+
+
+buffer = SketchBuffer()
+
+
+def _set_view_counts(db, counts: dict[str, int]):
+    if counts:
+        table = models.Event.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("event_id")).values(view_count=bindparam("count")),
+            [{"event_id": event_id, "count": count} for event_id, count in counts.items()],
+        )
+
+
+def merge_sketches(db, sketches: dict[str, HyperLogLog]) -> int:
+    """
+    Merge sketches into the stored ones and update view_count, without committing.
+    Events that no longer exist (archived or deleted) are dropped. Returns events updated.
+    """
+    if not sketches:
+        return 0
+
+    current = dict(db.execute(
+        select(models.Event.id, models.Event.view_count).where(models.Event.id.in_(list(sketches)))
+    ).all())
+    if not current:
+        return 0
+
+    # another process may create the same row concurrently; either one wins and both merge into it
+    db.execute(
+        dialect_insert(db, models.EventViewSketch)
+        .values([{"event_id": event_id, "base_count": count, "estimate": 0} for event_id, count in current.items()])
+        .on_conflict_do_nothing(index_elements=["event_id"])
+    )
+
+    rows = db.execute(
+        select(models.EventViewSketch)
+        .where(models.EventViewSketch.event_id.in_(list(current)))
+        .order_by(models.EventViewSketch.event_id)  # consistent lock order across processes
+        .with_for_update()
+    ).scalars().all()
+
+    now = datetime.datetime.utcnow()
+    counts = {}
+    for row in rows:
+        sketch = sketches[row.event_id]
+        if row.sketch is not None:
+            stored = HyperLogLog.from_bytes(row.sketch)
+            if stored.p == sketch.p:
+                sketch.merge(stored)
+            else:
+                # precision changed: start over from the current count rather than mixing
+                logger.warning(f"Resetting view sketch of {row.event_id}: precision {stored.p} -> {sketch.p}")
+                row.base_count = current[row.event_id]
+
+        row.sketch = sketch.to_bytes()
+        row.estimate = sketch.count()
+        row.updated_at = now
+        counts[row.event_id] = row.base_count + row.estimate
+
+    db.flush()
+    _set_view_counts(db, counts)
+    return len(counts)
+
+
+def flush(db, sketches: Optional[dict[str, HyperLogLog]] = None) -> int:
+    """Persist buffered views, one committed transaction per VIEW_SKETCH_FLUSH_BATCH events."""
+    sketches = buffer.drain() if sketches is None else sketches
+    pending = list(sketches.items())
+    flushed = 0
+    while pending:
+        batch = dict(pending[:VIEW_SKETCH_FLUSH_BATCH])
+        try:
+            flushed += merge_sketches(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            buffer.restore(dict(pending))
+            raise
+        pending = pending[VIEW_SKETCH_FLUSH_BATCH:]
+    return flushed
+
+
+def flush_pending() -> int:
+    db = SessionLocal()
+    try:
+        return flush(db)
+    finally:
+        db.close()
+
+
+def _flush():
+    flushed = flush_pending()
+    if flushed:
+        logger.debug(f"Flushed view sketches of {flushed} events")
+
+
+worker = PeriodicTask("view-sketches", _flush, VIEW_SKETCH_FLUSH_INTERVAL)
+
+
+def backfill(db, batch_size: int = 5000) -> int:
+    """
+    Build sketches from the exact event_views rows, so switching to hll does not count
+    those visitors twice. Existing sketches are replaced. Returns events sketched.
+    """
+    raw_counts = dict(db.execute(
+        select(models.EventView.event_id, func.count()).group_by(models.EventView.event_id)
+    ).all())
+
+    sketches: dict[str, HyperLogLog] = {}
+    rows = db.execute(
+        select(models.EventView.event_id, models.EventView.visitor_id).execution_options(yield_per=batch_size)
+    )
+    for event_id, visitor_id in rows:
+        sketch = sketches.get(event_id)
+        if sketch is None:
+            sketch = sketches[event_id] = HyperLogLog(VIEW_SKETCH_PRECISION)
+        sketch.add(visitor_id)
+
+    current = dict(db.execute(
+        select(models.Event.id, models.Event.view_count).where(models.Event.id.in_(list(sketches)))
+    ).all()) if sketches else {}
+
+    now = datetime.datetime.utcnow()
+    values = [
+        {
+            "event_id": event_id,
+            "sketch": sketches[event_id].to_bytes(),
+            # views no longer in event_views (if any) stay counted exactly
+            "base_count": max(count - raw_counts[event_id], 0),
+            "estimate": sketches[event_id].count(),
+            "updated_at": now,
+        }
+        for event_id, count in current.items()
+    ]
+    for start in range(0, len(values), VIEW_SKETCH_FLUSH_BATCH):
+        stmt = dialect_insert(db, models.EventViewSketch).values(values[start:start + VIEW_SKETCH_FLUSH_BATCH])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["event_id"],
+            set_={name: getattr(stmt.excluded, name) for name in ("sketch", "base_count", "estimate", "updated_at")},
+        )
+        db.execute(stmt)
+    db.commit()
+    return len(values)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="HyperLogLog view sketches.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="build sketches from event_views before switching to VIEW_COUNTING=hll")
+    estimate = sub.add_parser("estimate", help="print an event's stored estimate")
+    estimate.add_argument("event_id")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            print(f"Sketched {backfill(db)} events")
+        else:
+            row = db.get(models.EventViewSketch, args.event_id)
+            if row is None:
+                print("No sketch for this event")
+            else:
+                size = len(row.sketch) if row.sketch else 0
+                print(f"{row.base_count} exact + ~{row.estimate} unique viewers ({size} bytes)")
+    finally:
+        db.close()
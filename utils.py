@@ -3,7 +3,6 @@ from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 import database, models, schemas
 import os
 from dotenv import load_dotenv
@@ -40,7 +39,7 @@ def create_access_token(data: dict):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: database.LazySession = Depends(database.get_db)):
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,7 +63,8 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     # 3. Fetch User from DB
     user = db.query(models.User).filter(models.User.id == user_id).first()
     
-    if user is None:
+    # a club being deleted (deletion.py) can no longer act
+    if user is None or db.get(models.ClubDeletion, user.id) is not None:
         raise credentials_exception
         
     return user
\ No newline at end of file
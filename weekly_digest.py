@@ -4,21 +4,51 @@ Weekly Digest Email Script
 Run this as a cron job (e.g., every Monday at 8 AM):
     0 8 * * 1 cd /app && python weekly_digest.py
 
+Large lists can be split into shards by subscription id, either all on this box:
+    python weekly_digest.py --shards 4
+or one shard per container (same --shards everywhere, a different --shard-index each):
+    python weekly_digest.py --shards 4 --shard-index 0
+
+To benchmark against a local SMTP sink without emailing anyone or recording deliveries
+(reports per-phase timings, messages per second and peak memory):
+    python weekly_digest.py --dry-run [--shards 4] [--trace-memory]
+    python weekly_digest.py --sink 127.0.0.1:1025
+
 Requires SMTP env vars:
     SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_FROM_EMAIL
     FRONTEND_URL (for links in the email)
+
+Optional:
+    SMTP_POOL_SIZE (concurrent SMTP sessions, default 4)
+    SMTP_MAX_PER_SECOND (send rate cap, default 10, 0 = unlimited)
+    SMTP_USE_TLS (STARTTLS, default true)
 """
 
 import os
+import sys
+import time
+import uuid
+import argparse
+import resource
+import tracemalloc
+import queue
 import smtplib
 import logging
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from sqlalchemy import select
-from database import SessionLocal
+from sqlalchemy import select, func, exists, cast, literal, false, String, Integer
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import IntegrityError
+import database
+from database import SessionLocal, dialect_insert
 import models
+import deletion
 
 load_dotenv()
 
@@ -32,6 +62,13 @@ SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM_EMAIL = os.getenv("SMTP_FROM_EMAIL", "")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))  # concurrent authenticated sessions
+SMTP_MAX_PER_SECOND = float(os.getenv("SMTP_MAX_PER_SECOND", "10"))  # 0 = no cap
+DIGEST_CHUNK_SIZE = int(os.getenv("DIGEST_CHUNK_SIZE", "500"))  # subscribers fetched per round trip
+DIGEST_CHECKPOINT_BATCH = int(os.getenv("DIGEST_CHECKPOINT_BATCH", "100"))  # delivery results per write
+DIGEST_BODY_CACHE_SIZE = int(os.getenv("DIGEST_BODY_CACHE_SIZE", "256"))  # compiled bodies kept, by event set
+
 
 def get_upcoming_events(db, days=7):
     """Get events happening in the next N days."""
@@ -42,19 +79,106 @@ def get_upcoming_events(db, days=7):
         select(models.Event)
         .where(models.Event.date >= today)
         .where(models.Event.date <= end_date)
+        .where(deletion.not_deleted(models.Event.club_id))
         .order_by(models.Event.date.asc())
     )
     return db.execute(query).scalars().all()
 
 
-def get_active_subscribers(db):
-    """Get all active subscribers."""
-    query = select(models.Subscription).where(models.Subscription.is_active == True)
-    return db.execute(query).scalars().all()
+def shard_of(subscription_id, shards):
+    """Stable shard number for a subscription id (same answer in every process and run)."""
+    return (uuid.UUID(subscription_id).int & 0xFFFF) % shards
+
+
+def id_bucket(db, column):
+    """
+    SQL for the last 16 bits of a CompactUUID column, as an integer: shard_of in the
+    database. Those bits are random in every id (uuid7, uuid4 and md5-based legacy ids),
+    so bucket % shards spreads subscribers evenly.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import BIT
+
+        # uuid text ends with the last 4 hex digits; 'x' || digits casts through bit(16)
+        return cast(cast(literal("x").concat(func.right(cast(column, String), 4)), BIT(16)), Integer)
+
+    # 16-byte blob: hex() it and add up the last 4 hex digits
+    digits = func.hex(column)
+    value = 0
+    for position in range(29, 33):
+        value = value * 16 + (func.instr("0123456789ABCDEF", func.substr(digits, position, 1)) - 1)
+    return value
+
+
+def shard_conditions(db, run_id=None, shards=1, shard_index=0, pending=True):
+    """WHERE clauses for this shard's active subscribers: still to send in run_id if pending, else already sent."""
+    conditions = [models.Subscription.is_active == True]
+    if shards > 1:
+        conditions.append(id_bucket(db, models.Subscription.id) % shards == shard_index)
+    if run_id is not None:
+        sent = exists().where(
+            models.DigestDelivery.run_id == run_id,
+            models.DigestDelivery.subscription_id == models.Subscription.id,
+            models.DigestDelivery.status == models.DeliveryStatus.SENT,
+        )
+        conditions.append(~sent if pending else sent)
+    elif not pending:
+        conditions.append(false())
+    return conditions
+
+
+def plan_shard(db, run_id=None, shards=1, shard_index=0):
+    """
+    Count this shard's share of the active subscribers, in the database.
+
+    Returns (to_send, skipped, active): how many of the shard's subscribers are still to
+    send in run_id, how many were already sent (skipped), and the number of active
+    subscribers overall. Nothing per subscriber is read here.
+    """
+    def count(conditions):
+        return db.execute(select(func.count()).select_from(models.Subscription).where(*conditions)).scalar()
+
+    to_send = count(shard_conditions(db, run_id, shards, shard_index))
+    skipped = count(shard_conditions(db, run_id, shards, shard_index, pending=False)) if run_id is not None else 0
+    active = count([models.Subscription.is_active == True])
+    return to_send, skipped, active
+
+
+def iter_shard_subscribers(db, run_id=None, shards=1, shard_index=0, chunk_size=DIGEST_CHUNK_SIZE):
+    """
+    Stream this shard's subscribers still to send, chunk by chunk in id order (keyset
+    pagination, so each chunk is one short indexed query), with both preference
+    relationships loaded by one selectin query each per chunk (3 queries per chunk
+    instead of 2N+1 total). Nothing holds on to a chunk once it has been consumed, so
+    memory stays flat.
+    """
+    conditions = shard_conditions(db, run_id, shards, shard_index)
+    last_id = None
+    while True:
+        query = (
+            select(models.Subscription)
+            .where(*conditions)
+            .options(
+                selectinload(models.Subscription.club_subscriptions),
+                selectinload(models.Subscription.category_subscriptions),
+            )
+            .order_by(models.Subscription.id)
+            .limit(chunk_size)
+        )
+        if last_id is not None:
+            query = query.where(models.Subscription.id > last_id)
+        chunk = db.execute(query).scalars().all()
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].id
 
 
 def filter_events_for_subscriber(events, subscriber):
-    """Filter events based on subscriber preferences (uses ClubSubscription relationship)."""
+    """
+    Filter events based on subscriber preferences (uses ClubSubscription relationship).
+    Reference implementation; the digest itself matches through EventIndex.
+    """
     sub_club_ids = set(
         cs.club_id for cs in subscriber.club_subscriptions if cs.is_active
     )
@@ -86,12 +210,89 @@ def filter_events_for_subscriber(events, subscriber):
     return filtered
 
 
-def build_email_html(events, unsubscribe_token):
-    """Build the HTML email body."""
-    unsubscribe_url = f"{FRONTEND_URL}/unsubscribe/{unsubscribe_token}"
+def event_tag_set(event):
+    return set(
+        t.strip().lower() for t in event.tags.split(",") if t.strip()
+    ) if event.tags else set()
 
-    if not events:
-        return f"""
+
+def subscriber_preferences(subscriber):
+    """(active club ids, active categories) as frozensets, the subscriber's matching signature."""
+    club_ids = frozenset(
+        cs.club_id for cs in subscriber.club_subscriptions if cs.is_active
+    )
+    categories = frozenset(
+        cs.category.value if hasattr(cs.category, 'value') else cs.category
+        for cs in subscriber.category_subscriptions if cs.is_active
+    )
+    return club_ids, categories
+
+
+class EventIndex:
+    """
+    The week's events indexed once for matching against many subscribers.
+
+    Each club id and each tag maps to a bitset (a Python int, bit i = events[i]).
+    A subscriber's matching events are the OR of the bitsets of their clubs and
+    categories, so matching costs a handful of integer ORs instead of re-splitting
+    every event's tags per subscriber. Masks are cached per preference signature,
+    and result lists per mask, so identical subscribers share both.
+
+    Gives exactly the same events, in the same order, as filter_events_for_subscriber.
+    """
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.all_mask = (1 << len(self.events)) - 1
+        self.by_club = defaultdict(int)
+        self.by_tag = defaultdict(int)
+
+        for i, event in enumerate(self.events):
+            bit = 1 << i
+            self.by_club[event.club_id] |= bit
+            for tag in event_tag_set(event):
+                self.by_tag[tag] |= bit
+
+        self._masks = {}
+        self._event_lists = {}
+
+    def mask_for(self, club_ids, categories):
+        # If no preferences set, send all events
+        if not club_ids and not categories:
+            return self.all_mask
+
+        key = (club_ids, categories)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = 0
+            for club_id in club_ids:
+                mask |= self.by_club.get(club_id, 0)
+            for category in categories:
+                mask |= self.by_tag.get(category, 0)
+            self._masks[key] = mask
+        return mask
+
+    def mask_for_subscriber(self, subscriber):
+        return self.mask_for(*subscriber_preferences(subscriber))
+
+    def events_for_mask(self, mask, cache=True):
+        events = self._event_lists.get(mask)
+        if events is None:
+            # bin() is "0b...", most significant bit first; reverse so position i is bit i
+            bits = bin(mask)[:1:-1]
+            all_events = self.events
+            events = [all_events[i] for i, bit in enumerate(bits) if bit == "1"]
+            if cache:
+                self._event_lists[mask] = events
+        return events
+
+    def events_for_subscriber(self, subscriber):
+        return self.events_for_mask(self.mask_for_subscriber(subscriber))
+
+
+# Email templates. Filled with str.format; {unsubscribe_url} is left as a placeholder
+# when a body is rendered once for a whole group of recipients.
+EMPTY_DIGEST_TEMPLATE = """
         <html><body style="font-family: Arial, sans-serif; color: #333;">
         <h2>This Week at Campus</h2>
         <p>No upcoming events this week. Check back soon!</p>
@@ -102,25 +303,22 @@ def build_email_html(events, unsubscribe_token):
         </body></html>
         """
 
-    event_rows = ""
-    for e in events:
-        event_url = f"{FRONTEND_URL}/events/{e.id}"
-        event_rows += f"""
+EVENT_ROW_TEMPLATE = """
         <tr>
             <td style="padding: 12px; border-bottom: 1px solid #eee;">
                 <a href="{event_url}" style="font-size: 16px; font-weight: bold; color: #1a73e8; text-decoration: none;">
-                    {e.title}
+                    {title}
                 </a>
                 <br>
                 <span style="color: #666; font-size: 14px;">
-                    {e.date.strftime('%A, %B %d')} &middot; {e.start_time} - {e.end_time}
-                    &middot; {e.location}
+                    {date} &middot; {start_time} - {end_time}
+                    &middot; {location}
                 </span>
             </td>
         </tr>
         """
 
-    return f"""
+DIGEST_TEMPLATE = """
     <html><body style="font-family: Arial, sans-serif; color: #333; max-width: 600px; margin: 0 auto;">
     <h2>This Week at Campus</h2>
     <p>Here are the upcoming events for this week:</p>
@@ -128,7 +326,7 @@ def build_email_html(events, unsubscribe_token):
         {event_rows}
     </table>
     <br>
-    <a href="{FRONTEND_URL}/events"
+    <a href="{frontend_url}/events"
        style="display: inline-block; padding: 10px 20px; background: #1a73e8; color: white; text-decoration: none; border-radius: 4px;">
         View All Events
     </a>
@@ -140,54 +338,643 @@ def build_email_html(events, unsubscribe_token):
     </body></html>
     """
 
+UNSUBSCRIBE_PLACEHOLDER = "\x00unsubscribe_url\x00"
+
+
+def unsubscribe_url_for(token):
+    return f"{FRONTEND_URL}/unsubscribe/{token}"
+
+
+def render_event_row(e):
+    return EVENT_ROW_TEMPLATE.format(
+        event_url=f"{FRONTEND_URL}/events/{e.id}",
+        title=e.title,
+        date=e.date.strftime('%A, %B %d'),
+        start_time=e.start_time,
+        end_time=e.end_time,
+        location=e.location,
+    )
+
+
+def compile_email_html(events, event_rows=None):
+    """
+    Render the body once and split it around the unsubscribe URL. The per-recipient
+    body is then just unsubscribe_url.join(parts).
+    event_rows optionally maps event id -> pre-rendered row, to share rows across bodies.
+    """
+    if not events:
+        html = EMPTY_DIGEST_TEMPLATE.format(unsubscribe_url=UNSUBSCRIBE_PLACEHOLDER)
+    else:
+        rows = "".join(
+            event_rows[e.id] if event_rows is not None else render_event_row(e)
+            for e in events
+        )
+        html = DIGEST_TEMPLATE.format(
+            event_rows=rows,
+            frontend_url=FRONTEND_URL,
+            unsubscribe_url=UNSUBSCRIBE_PLACEHOLDER,
+        )
+    return html.split(UNSUBSCRIBE_PLACEHOLDER)
+
+
+def build_email_html(events, unsubscribe_token):
+    """Build the HTML email body."""
+    return unsubscribe_url_for(unsubscribe_token).join(compile_email_html(events))
+
+
+def digest_subject(events):
+    return f"This Week at Campus - {len(events)} upcoming events"
+
+
+class DigestBodies:
+    """
+    Compiled (subject, body parts) per event mask, for the most recently used maxsize
+    masks. Subscribers stream past in id order, not grouped, so a body is rendered once
+    per distinct event set as long as those sets fit in the cache; past that, least
+    recently used bodies are dropped and re-rendered if they come up again. Event rows
+    are rendered once for the whole run.
+    """
+
+    def __init__(self, index, maxsize=DIGEST_BODY_CACHE_SIZE):
+        self.index = index
+        self.maxsize = maxsize
+        self.rendered = 0
+        self._event_rows = {e.id: render_event_row(e) for e in index.events}
+        self._bodies = OrderedDict()
+
+    def get(self, mask):
+        body = self._bodies.get(mask)
+        if body is not None:
+            self._bodies.move_to_end(mask)
+            return body
+        events = self.index.events_for_mask(mask, cache=False)
+        body = self._bodies[mask] = (digest_subject(events), compile_email_html(events, self._event_rows))
+        self.rendered += 1
+        if len(self._bodies) > self.maxsize:
+            self._bodies.popitem(last=False)
+        return body
+
+
+def iter_digest_messages(subscribers, index, bodies=None, skip=frozenset(), phases=None):
+    """
+    Yield (email, message, subscription_id) for every subscriber as they stream in,
+    chunk by chunk. Nothing per recipient is kept: only the ORM objects of the current
+    chunk and the bodies cache are alive. Subscription ids in skip (already sent this
+    week) are left out. With phases, matching time is added to phases["match"].
+    """
+    bodies = bodies or DigestBodies(index)
+    for sub in subscribers:
+        if sub.id in skip:
+            continue
+        start = time.perf_counter()
+        mask = index.mask_for_subscriber(sub)
+        if phases is not None:
+            phases["match"] += time.perf_counter() - start
+        subject, parts = bodies.get(mask)
+        html = unsubscribe_url_for(sub.token).join(parts)
+        yield sub.email, build_message(sub.email, subject, html), sub.id
+
 
-def send_email(to_email, subject, html_body):
-    """Send an email via SMTP."""
+# --- run checkpoints ---
+
+def iso_week_key(day=None):
+    year, week, _ = (day or datetime.now().date()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def get_or_create_run(db, week):
+    run = db.execute(select(models.DigestRun).where(models.DigestRun.week == week)).scalar()
+    if run:
+        return run
+    try:
+        run = models.DigestRun(week=week)
+        db.add(run)
+        db.commit()
+        return run
+    except IntegrityError:
+        # another process created it first
+        db.rollback()
+        return db.execute(select(models.DigestRun).where(models.DigestRun.week == week)).scalar_one()
+
+
+class DeliveryRecorder:
+    """
+    Records per-recipient results for a run, upserting them in batches through its own
+    session. Thread-safe, since results arrive from the SMTP worker threads. A crash
+    loses at most one unflushed batch, which a rerun sends again.
+    """
+
+    def __init__(self, run_id, batch_size=DIGEST_CHECKPOINT_BATCH):
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self._db = SessionLocal()
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def record(self, subscription_id, email, error=None):
+        row = {
+            "run_id": self.run_id,
+            "subscription_id": subscription_id,
+            "email": email,
+            "status": models.DeliveryStatus.SENT if error is None else models.DeliveryStatus.FAILED,
+            "last_error": None if error is None else str(error)[:1000],
+            "updated_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        stmt = dialect_insert(self._db, models.DigestDelivery)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["run_id", "subscription_id"],
+            set_={
+                "status": stmt.excluded.status,
+                "attempts": models.DigestDelivery.attempts + 1,
+                "last_error": stmt.excluded.last_error,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        try:
+            self._db.execute(stmt, rows)
+            self._db.commit()
+        except Exception as e:
+            self._db.rollback()
+            logger.error(f"Failed to record {len(rows)} digest deliveries: {e}")
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def build_message(to_email, subject, html_body):
+    """Build the MIME message for one recipient, as a string ready for sendmail."""
     msg = MIMEMultipart("alternative")
     msg["Subject"] = subject
     msg["From"] = SMTP_FROM_EMAIL
     msg["To"] = to_email
     msg.attach(MIMEText(html_body, "html"))
+    return msg.as_string()
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        server.sendmail(SMTP_FROM_EMAIL, to_email, msg.as_string())
 
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads. rate <= 0 disables it."""
 
-def run_digest():
-    if not all([SMTP_HOST, SMTP_USER, SMTP_PASSWORD, SMTP_FROM_EMAIL]):
-        logger.error("SMTP not configured. Set SMTP_HOST, SMTP_USER, SMTP_PASSWORD, SMTP_FROM_EMAIL")
-        return
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
 
-    db = SessionLocal()
-    try:
-        events = get_upcoming_events(db)
-        subscribers = get_active_subscribers(db)
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
-        logger.info(f"Found {len(events)} upcoming events, {len(subscribers)} active subscribers")
 
-        sent = 0
-        failed = 0
+class SMTPSenderPool:
+    """
+    A small pool of authenticated SMTP sessions shared by worker threads.
+
+    Each session does the connect/STARTTLS/login handshake once and is then reused for
+    many messages. A session that drops (timeout, 421, reset) is replaced and the
+    message retried once on the fresh connection. Throughput is capped by
+    max_per_second across the whole pool.
+    """
 
-        for sub in subscribers:
-            relevant_events = filter_events_for_subscriber(events, sub)
-            html = build_email_html(relevant_events, sub.token)
-            subject = f"This Week at Campus - {len(relevant_events)} upcoming events"
+    def __init__(
+        self,
+        host=None,
+        port=None,
+        user=None,
+        password=None,
+        from_email=None,
+        size=None,
+        max_per_second=None,
+        use_tls=None,
+    ):
+        self.host = host if host is not None else SMTP_HOST
+        self.port = port if port is not None else SMTP_PORT
+        self.user = user if user is not None else SMTP_USER
+        self.password = password if password is not None else SMTP_PASSWORD
+        self.from_email = from_email if from_email is not None else SMTP_FROM_EMAIL
+        self.size = size if size is not None else SMTP_POOL_SIZE
+        self.use_tls = use_tls if use_tls is not None else SMTP_USE_TLS
+        self.rate_limiter = RateLimiter(max_per_second if max_per_second is not None else SMTP_MAX_PER_SECOND)
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.connections_opened = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _discard(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def _release(self, server):
+        if server is not None:
+            self._idle.put(server)
+        self._slots.release()
+
+    @staticmethod
+    def _session_lost(error):
+        """True if the error means the connection is unusable (as opposed to a rejected message)."""
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code == 421
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        if isinstance(error, smtplib.SMTPException):
+            return False
+        return isinstance(error, OSError)
+
+    def send(self, to_email, message):
+        """Send one prepared message, reconnecting once if the session has gone stale."""
+        self.rate_limiter.wait()
+        server = self._acquire()
+        try:
+            try:
+                server.sendmail(self.from_email, to_email, message)
+            except Exception as e:
+                if not self._session_lost(e):
+                    raise
+                logger.warning(f"SMTP session dropped ({e}), reconnecting")
+                self._discard(server)
+                server = None
+                server = self._connect()
+                server.sendmail(self.from_email, to_email, message)
+        except Exception as e:
+            # a rejected message leaves the session usable (sendmail already sent RSET)
+            if server is not None and self._session_lost(e):
+                self._discard(server)
+                server = None
+            raise
+        finally:
+            self._release(server)
+
+    def send_many(self, jobs, on_result=None):
+        """
+        Send (to_email, message, tag) jobs concurrently with one thread per session.
+        jobs may be a lazy iterator; at most a few batches are in flight at once.
+        on_result(to_email, tag, error_or_None) is called from the worker threads.
+        """
+        in_flight = threading.BoundedSemaphore(self.size * 4)
 
+        def work(to_email, message, tag):
             try:
-                send_email(sub.email, subject, html)
-                sent += 1
-                logger.info(f"Sent digest to {sub.email} ({len(relevant_events)} events)")
+                self.send(to_email, message)
+                error = None
             except Exception as e:
-                failed += 1
-                logger.error(f"Failed to send to {sub.email}: {e}")
+                error = e
+            finally:
+                in_flight.release()
+            if on_result:
+                on_result(to_email, tag, error)
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="smtp") as pool:
+            for to_email, message, tag in jobs:
+                in_flight.acquire()
+                pool.submit(work, to_email, message, tag)
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def finish_run_if_complete(db, run):
+    """
+    Mark the run finished once every active subscriber has been sent this week's digest
+    (by any shard). Failed deliveries don't count, so a rerun retries them. run.total
+    is recomputed as sent + still to send by whichever shard checks last.
+    """
+    delivered = db.execute(
+        select(func.count()).select_from(models.DigestDelivery).where(
+            models.DigestDelivery.run_id == run.id,
+            models.DigestDelivery.status == models.DeliveryStatus.SENT,
+        )
+    ).scalar()
+    sent = exists().where(
+        models.DigestDelivery.run_id == run.id,
+        models.DigestDelivery.subscription_id == models.Subscription.id,
+        models.DigestDelivery.status == models.DeliveryStatus.SENT,
+    )
+    remaining = db.execute(
+        select(func.count()).select_from(models.Subscription).where(models.Subscription.is_active == True, ~sent)
+    ).scalar()
+    run.total = delivered + remaining
+    run.finished_at = datetime.utcnow() if remaining == 0 else None
+    db.commit()
+    return run.finished_at is not None
+
+
+def timed(iterable, phases, name):
+    """Yield from iterable, adding the time spent producing each item to phases[name]."""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            phases[name] += time.perf_counter() - start
+        yield item
+
+
+@contextmanager
+def timed_phase(phases, name):
+    """Add the elapsed time of the with-block to phases[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] += time.perf_counter() - start
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
 
-        logger.info(f"Digest complete: {sent} sent, {failed} failed")
+
+def finish_stats(stats, started, trace_memory=False):
+    """Fill in the timing and memory fields every report has, also for runs that stopped early."""
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    stats["messages_per_second"] = round(stats["sent"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    stats["peak_rss_mb"] = peak_rss_mb()
+    if trace_memory:
+        traced = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        stats["traced_peak_mb"] = round(traced / (1024 * 1024), 1)
+        tracemalloc.stop()
+    for name in stats["phases"]:
+        stats["phases"][name] = round(stats["phases"][name], 3)
+    return stats
+
+
+def run_digest(shards=1, shard_index=0, sink=None, trace_memory=False):
+    """
+    Send this week's digest to one shard of the subscribers (all of them by default).
+
+    Shards split subscribers by a stable hash of the subscription id, so N processes or
+    containers can run with the same --shards N and different --shard-index values and
+    never send to the same person. They share the week's run row and checkpoints, and
+    the send rate cap is divided between them.
+
+    With sink=(host, port) this is a dry run: the full pipeline runs against that SMTP
+    server (no TLS, no login, no rate cap) and no run or delivery rows are written.
+    Returns this shard's stats, including per-phase timings and peak memory, plus "error"
+    if it could not run at all.
+    """
+    phases = {"plan": 0.0, "load": 0.0, "match": 0.0, "render": 0.0, "send": 0.0}
+    stats = {"recipients": 0, "digests": 0, "sent": 0, "failed": 0, "skipped": 0, "seconds": 0.0, "phases": phases}
+    dry_run = sink is not None
+
+    if not dry_run and not all([SMTP_HOST, SMTP_USER, SMTP_PASSWORD, SMTP_FROM_EMAIL]):
+        logger.error("SMTP not configured. Set SMTP_HOST, SMTP_USER, SMTP_PASSWORD, SMTP_FROM_EMAIL")
+        stats["error"] = "SMTP not configured"
+        return finish_stats(stats, time.monotonic(), trace_memory)
+
+    label = f"Digest shard {shard_index + 1}/{shards}" if shards > 1 else "Digest"
+    if dry_run:
+        label += " (dry run)"
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.monotonic()
+
+    db = SessionLocal()
+    try:
+        week = iso_week_key()
+        run = None if dry_run else get_or_create_run(db, week)
+        run_id = None if run is None else run.id
+
+        with timed_phase(phases, "plan"):
+            events = get_upcoming_events(db)
+            to_send, skipped, active = plan_shard(db, run_id, shards, shard_index)
+
+        logger.info(f"{label}: found {len(events)} upcoming events, {active} active subscribers")
+
+        index = EventIndex(events)
+        bodies = DigestBodies(index)
+        stats["recipients"] = to_send
+        stats["skipped"] = skipped
+        logger.info(f"{label} {week}: {skipped} already sent, {stats['recipients']} to send")
+
+        if run is not None:
+            run.finished_at = None
+            db.commit()
+
+        stats_lock = threading.Lock()
+        recorder = None if dry_run else DeliveryRecorder(run.id)
+
+        def on_result(to_email, subscription_id, error):
+            with stats_lock:
+                if error is None:
+                    stats["sent"] += 1
+                else:
+                    stats["failed"] += 1
+            if recorder is not None:
+                recorder.record(subscription_id, to_email, error)
+            if error is not None:
+                logger.error(f"Failed to send to {to_email}: {error}")
+            elif not dry_run:
+                logger.info(f"Sent digest to {to_email}")
+
+        if dry_run:
+            sender = SMTPSenderPool(
+                host=sink[0], port=sink[1], user="", password="",
+                from_email=SMTP_FROM_EMAIL or "digest@example.com", max_per_second=0, use_tls=False,
+            )
+        else:
+            sender = SMTPSenderPool(max_per_second=SMTP_MAX_PER_SECOND / shards)
+
+        start = time.perf_counter()
+        try:
+            with sender:
+                # subscribers are loaded, matched and rendered lazily on this thread while workers send
+                subscribers = timed(iter_shard_subscribers(db, run_id, shards, shard_index), phases, "load")
+                messages = timed(iter_digest_messages(subscribers, index, bodies, phases=phases), phases, "render")
+                sender.send_many(messages, on_result)
+        finally:
+            if recorder is not None:
+                recorder.close()
+        # loading and matching happen inside the render generator; report them separately
+        phases["render"] -= phases["load"] + phases["match"]
+        phases["send"] = time.perf_counter() - start - phases["render"] - phases["load"] - phases["match"]
+        stats["digests"] = bodies.rendered
+
+        if run is not None:
+            finish_run_if_complete(db, run)
 
     finally:
         db.close()
 
+    finish_stats(stats, started, trace_memory)
+    logger.info(f"{label} complete: {stats['sent']} sent, {stats['failed']} failed in {stats['seconds']}s")
+    return stats
+
+
+def format_report(stats):
+    """Human-readable summary of a run's stats (one shard or combined)."""
+    phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stats["phases"].items())
+    lines = [
+        f"recipients: {stats['recipients']} ({stats['digests']} digest bodies rendered, {stats['skipped']} skipped)",
+        f"sent: {stats['sent']}, failed: {stats['failed']}",
+        f"wall time: {stats['seconds']:.2f}s, {stats['messages_per_second']:.1f} msg/s",
+        f"phases: {phases}",
+        f"peak RSS: {stats['peak_rss_mb']:.1f} MB",
+    ]
+    if "traced_peak_mb" in stats:
+        lines.append(f"peak traced Python heap: {stats['traced_peak_mb']:.1f} MB")
+    if "error" in stats:
+        lines.append(f"error: {stats['error']}")
+    return "\n".join(lines)
+
+
+def _init_shard_worker():
+    # connections inherited from the parent must not be shared with it
+    database.engine.dispose(close=False)
+
+
+def _run_shard(args):
+    return run_digest(*args)
+
+
+def run_sharded(shards, processes=None, sink=None, trace_memory=False):
+    """Run every shard in a local process pool and return the combined stats."""
+    processes = processes or min(shards, os.cpu_count() or 1)
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_shard_worker) as pool:
+        results = list(pool.map(_run_shard, [(shards, i, sink, trace_memory) for i in range(shards)]))
+
+    totals = {key: sum(r[key] for r in results) for key in ("recipients", "digests", "sent", "failed", "skipped")}
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    totals["messages_per_second"] = round(totals["sent"] / totals["seconds"], 1) if totals["seconds"] else 0.0
+    # shards run side by side, so the slowest shard bounds each phase; memory is per process
+    totals["phases"] = {name: max(r["phases"][name] for r in results) for name in results[0]["phases"]}
+    totals["peak_rss_mb"] = max(r["peak_rss_mb"] for r in results)
+    if trace_memory:
+        totals["traced_peak_mb"] = max(r["traced_peak_mb"] for r in results)
+    errors = sorted({r["error"] for r in results if "error" in r})
+    if errors:
+        totals["error"] = "; ".join(errors)
+
+    logger.info(
+        f"Digest complete across {shards} shards / {processes} processes: "
+        f"{totals['sent']} sent, {totals['failed']} failed in {totals['seconds']}s"
+    )
+    return totals
+
+
+def parse_host_port(value):
+    host, _, port = value.rpartition(":")
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError("expected host:port")
+    return host, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send the weekly digest email.")
+    parser.add_argument("--shards", type=int, default=1, help="split subscribers into N shards")
+    parser.add_argument(
+        "--shard-index", type=int, default=None,
+        help="run only this shard (0-based), e.g. one per container; omit to run all shards here",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None,
+        help="worker processes when running all shards locally (default: min(shards, cores))",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="run the whole pipeline against an in-process SMTP sink; nothing is emailed or recorded",
+    )
+    parser.add_argument(
+        "--sink", type=parse_host_port, default=None, metavar="HOST:PORT",
+        help="dry run against this SMTP sink instead (e.g. python smtp_sink.py); implies --dry-run",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="also report the peak Python heap via tracemalloc (slows the run down)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.shard_index is not None and not 0 <= args.shard_index < args.shards:
+        parser.error("--shard-index must be between 0 and shards - 1")
+
+    local_sink = None
+    sink = args.sink
+    if args.dry_run and sink is None:
+        from smtp_sink import SMTPSink
+
+        local_sink = SMTPSink().start()
+        sink = (local_sink.host, local_sink.port)
+
+    try:
+        if args.shard_index is not None:
+            stats = run_digest(args.shards, args.shard_index, sink, args.trace_memory)
+        elif args.shards > 1:
+            stats = run_sharded(args.shards, args.processes, sink, args.trace_memory)
+        else:
+            stats = run_digest(sink=sink, trace_memory=args.trace_memory)
+    finally:
+        if local_sink is not None:
+            local_sink.stop()
+
+    logger.info("Digest report:\n" + format_report(stats))
+    if local_sink is not None:
+        logger.info(f"SMTP sink received {local_sink.messages} messages, {local_sink.bytes_received} bytes")
+    return stats
+
 
 if __name__ == "__main__":
-    run_digest()
+    sys.exit(1 if "error" in main() else 0)